@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+analysis_server.py - 文体分析の常駐サーバーとクライアント
+
+サーバーは Unix ソケットで待ち受け、Janome の辞書・読み込み済みコーパス・
+計算済みの統計をメモリに保持したまま、1行1リクエストの JSON に答える。
+クライアントはサーバーに接続できなければ同じ処理をプロセス内で実行する。
+
+使用方法:
+    python3 analysis_server.py serve [--idle-timeout 3600]   # サーバー起動
+    python3 analysis_server.py stats                          # 文体統計
+    python3 analysis_server.py score draft.md                 # 下書きをコーパスと比較
+    python3 analysis_server.py lint draft.md                  # 下書きのNG表現を検査
+    python3 analysis_server.py search "キーワード" [--limit 10]
+    python3 analysis_server.py refresh | ping | stop
+
+プロトコル:
+    リクエスト: {"op": "stats"} / {"op": "score", "text": "..."} / {"op": "lint", "text": "..."} /
+               {"op": "search", "query": "...", "limit": 10} / {"op": "refresh"} /
+               {"op": "ping"} / {"op": "shutdown"}
+    レスポンス: {"ok": true, "result": ...} または {"ok": false, "error": "..."}
+
+依存パッケージ:
+    analysis_service.py と同じ（クライアントだけなら標準ライブラリのみ）
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+DEFAULT_CORPUS_DIR = Path(__file__).parent.parent / "corpus"
+DEFAULT_SOCKET_PATH = Path(__file__).parent.parent / ".cache" / "analysis.sock"
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+
+def _json_default(value):
+    # numpy のスカラーなどは Python の値に変換する
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+def encode_message(message: Dict) -> bytes:
+    return json.dumps(message, ensure_ascii=False, default=_json_default).encode('utf-8') + b'\n'
+
+
+class AnalysisRequestHandler(socketserver.StreamRequestHandler):
+    """1接続で複数のリクエスト（1行1JSON）を順に処理する"""
+
+    def handle(self):
+        server: AnalysisServer = self.server
+        while True:
+            line = self.rfile.readline(MAX_REQUEST_BYTES + 1)
+            if not line:
+                return
+            server.touch()
+            if len(line) > MAX_REQUEST_BYTES:
+                self.wfile.write(encode_message({'ok': False, 'error': 'request too large'}))
+                return
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                self.wfile.write(encode_message({'ok': False, 'error': f"invalid JSON: {e}"}))
+                continue
+
+            if request.get('op') == 'shutdown':
+                self.wfile.write(encode_message({'ok': True, 'result': 'shutting down'}))
+                threading.Thread(target=server.shutdown, daemon=True).start()
+                return
+            self.wfile.write(encode_message(server.service.handle(request)))
+
+
+class AnalysisServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """AnalysisService を共有する Unix ソケットサーバー"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, corpus_dir: Path, idle_timeout: float = 0):
+        from analysis_service import AnalysisService
+
+        self.socket_path = Path(socket_path)
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.service = AnalysisService(corpus_dir)
+        self.idle_timeout = idle_timeout
+        self.last_activity = time.monotonic()
+        super().__init__(str(self.socket_path), AnalysisRequestHandler)
+        os.chmod(self.socket_path, 0o600)
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+    def watch_idle(self):
+        """idle_timeout 秒リクエストが無ければ停止する"""
+        while True:
+            time.sleep(min(self.idle_timeout, 30))
+            if time.monotonic() - self.last_activity >= self.idle_timeout:
+                print(f"{self.idle_timeout:.0f}秒間リクエストが無いため停止します", file=sys.stderr)
+                self.shutdown()
+                return
+
+    def serve(self):
+        # 起動時にコーパスを読み込み、統計を温めておく
+        started = time.perf_counter()
+        changes = self.service.refresh()
+        self.service.style_stats()
+        print(f"analysis server: {self.socket_path} ({changes['articles']}記事, "
+              f"{time.perf_counter() - started:.1f}秒で準備完了)", file=sys.stderr)
+        if self.idle_timeout:
+            threading.Thread(target=self.watch_idle, daemon=True).start()
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            try:
+                self.socket_path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def server_running(socket_path: Path) -> bool:
+    """ソケットに接続できるか確認"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1.0)
+            sock.connect(str(socket_path))
+        return True
+    except OSError:
+        return False
+
+
+class AnalysisClient:
+    """サーバーに問い合わせ、接続できなければプロセス内で実行するクライアント"""
+
+    def __init__(self, socket_path: Path = DEFAULT_SOCKET_PATH, corpus_dir: Path = DEFAULT_CORPUS_DIR,
+                 fallback: bool = True, timeout: float = 120.0):
+        self.socket_path = Path(socket_path)
+        self.corpus_dir = Path(corpus_dir)
+        self.fallback = fallback
+        self.timeout = timeout
+        self._local = None
+        self.used_server: Optional[bool] = None
+
+    def request(self, op: str, **params) -> Dict:
+        message = dict(params, op=op)
+        sock = self._connect()
+        if sock is not None:
+            self.used_server = True
+            with sock:
+                return self._send(sock, message)
+        if not self.fallback:
+            raise ConnectionError(f"サーバーが起動していません: {self.socket_path}")
+        self.used_server = False
+        if op == 'shutdown':
+            return {'ok': False, 'error': 'server is not running'}
+        if self._local is None:
+            from analysis_service import AnalysisService
+            self._local = AnalysisService(self.corpus_dir)
+        return json.loads(json.dumps(self._local.handle(message), default=_json_default))
+
+    def _connect(self) -> Optional[socket.socket]:
+        """接続できなければ None（接続後のタイムアウトなどはフォールバックせず例外にする）"""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(self.socket_path))
+        except (FileNotFoundError, ConnectionRefusedError):
+            sock.close()
+            return None
+        sock.settimeout(self.timeout)
+        return sock
+
+    def _send(self, sock: socket.socket, message: Dict) -> Dict:
+        sock.sendall(encode_message(message))
+        with sock.makefile('rb') as f:
+            line = f.readline()
+        if not line:
+            raise ConnectionError("サーバーが応答せずに接続を閉じました")
+        return json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='文体分析の常駐サーバーとクライアント')
+    parser.add_argument('command', choices=['serve', 'stats', 'score', 'lint', 'search', 'refresh', 'ping', 'stop'])
+    parser.add_argument('argument', nargs='?', help='score・lint: 下書きファイル（- で標準入力） / search: 検索語')
+    parser.add_argument('--socket', type=Path, default=DEFAULT_SOCKET_PATH,
+                        help='ソケットのパス (デフォルト: .cache/analysis.sock)')
+    parser.add_argument('--corpus-dir', type=Path, default=DEFAULT_CORPUS_DIR,
+                        help='コーパスのディレクトリ (デフォルト: corpus)')
+    parser.add_argument('--idle-timeout', type=float, default=3600,
+                        help='serve: この秒数リクエストが無ければ停止（0 で無期限, デフォルト: 3600）')
+    parser.add_argument('--limit', type=int, default=10, help='search: 最大件数 (デフォルト: 10)')
+    parser.add_argument('--no-fallback', action='store_true',
+                        help='サーバーが起動していない場合にプロセス内で実行せずエラーにする')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        if server_running(args.socket):
+            print(f"サーバーは既に起動しています: {args.socket}", file=sys.stderr)
+            return 1
+        if args.socket.exists():
+            # 前回異常終了したときのソケットファイル
+            args.socket.unlink()
+        AnalysisServer(args.socket, args.corpus_dir, args.idle_timeout).serve()
+        return 0
+
+    client = AnalysisClient(args.socket, args.corpus_dir, fallback=not args.no_fallback)
+    try:
+        response = run_command(client, args, parser)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if client.used_server is False:
+        print("(サーバー未起動のためプロセス内で実行)", file=sys.stderr)
+    print(json.dumps(response, ensure_ascii=False, indent=2))
+    return 0 if response.get('ok') else 1
+
+
+def run_command(client: AnalysisClient, args, parser) -> Dict:
+    """サブコマンドをリクエストに変換して送る"""
+    if args.command in ('score', 'lint'):
+        if not args.argument:
+            parser.error(f'{args.command} には下書きファイルを指定してください')
+        text = sys.stdin.read() if args.argument == '-' else Path(args.argument).read_text(encoding='utf-8')
+        return client.request(args.command, text=text)
+    if args.command == 'search':
+        if not args.argument:
+            parser.error('search には検索語を指定してください')
+        return client.request('search', query=args.argument, limit=args.limit)
+    if args.command == 'stop':
+        return client.request('shutdown')
+    return client.request(args.command)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
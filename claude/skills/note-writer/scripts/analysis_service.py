@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+analysis_service.py - コーパスをメモリに保持して文体統計・下書き採点・検索に答えるサービス
+
+analysis_server.py の常駐サーバーと、サーバーが起動していない場合のクライアント
+（プロセス内実行）の両方から使う。記事はファイルの mtime・サイズで照合し、
+追加・変更・削除された記事だけを読み直す。統計は記事に変化があった場合のみ再計算する。
+
+使用方法:
+    from analysis_service import AnalysisService
+
+    service = AnalysisService(corpus_dir)
+    service.handle({'op': 'stats'})
+    service.handle({'op': 'score', 'text': draft})
+    service.handle({'op': 'lint', 'text': draft})
+    service.handle({'op': 'search', 'query': 'DX', 'limit': 10})
+    service.handle({'op': 'refresh'})
+
+依存パッケージ:
+    pip install pyyaml
+    pip install janome  # 任意: 下書き採点に品詞の比率を加える
+"""
+
+import math
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from corpus_layout import list_articles
+from policy_lint import PolicyEngine
+from analyze_style import (
+    JANOME_AVAILABLE,
+    StyleAnalyzer,
+    StyleDriftTracker,
+    article_style_metrics,
+    article_summary,
+    distribution_stats,
+    sentence_lengths,
+    split_frontmatter,
+)
+
+SNIPPET_CHARS = 40
+
+
+class CorpusIndex:
+    """corpus/articles/*.md をメモリに保持し、変更された記事だけ読み直す"""
+
+    def __init__(self, articles_dir: Path):
+        self.articles_dir = Path(articles_dir)
+        self.entries: Dict[str, Dict] = {}
+        self.version = 0
+
+    def refresh(self) -> Dict[str, List[str]]:
+        """ファイルを stat で照合し、追加・変更・削除された記事名を返す"""
+        changes = {'added': [], 'changed': [], 'removed': []}
+        seen = set()
+        for filepath in list_articles(self.articles_dir):
+            st = filepath.stat()
+            key = filepath.relative_to(self.articles_dir).as_posix()
+            seen.add(key)
+            entry = self.entries.get(key)
+            if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+                continue
+            changes['changed' if entry else 'added'].append(key)
+            self.entries[key] = self._load(filepath, st)
+
+        for key in set(self.entries) - seen:
+            del self.entries[key]
+            changes['removed'].append(key)
+
+        if any(changes.values()):
+            self.version += 1
+        return changes
+
+    @staticmethod
+    def _load(filepath: Path, st) -> Dict:
+        meta, body = split_frontmatter(filepath.read_text(encoding='utf-8'))
+        content = body.strip()
+        return {
+            'path': str(filepath),
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'article_id': meta.get('article_id'),
+            'day_number': meta.get('day_number'),
+            'title': meta.get('title', filepath.stem),
+            'content': content,
+            **article_summary(content),
+            'metrics': article_style_metrics(content),
+            'pos_ratios': None,  # 形態素解析は採点で必要になったときに計算する
+        }
+
+
+class AnalysisService:
+    """文体統計・下書き採点・コーパス検索を提供する（スレッドセーフ）"""
+
+    def __init__(self, corpus_dir: Path):
+        self.corpus_dir = Path(corpus_dir)
+        self.references_dir = self.corpus_dir.parent / 'references'
+        self.index = CorpusIndex(self.corpus_dir / 'articles')
+        # Janome の辞書読み込みは重いので1回だけ
+        self.analyzer = StyleAnalyzer(self.corpus_dir)
+        self._stats: Optional[Dict] = None
+        self._stats_version = -1
+        self._lock = threading.RLock()
+        self.started_at = time.time()
+        self.requests = 0
+
+    def handle(self, request: Dict) -> Dict:
+        """JSON リクエストを処理し、{'ok': bool, 'result' | 'error'} を返す"""
+        op = request.get('op')
+        handlers = {
+            'ping': lambda: {'pong': True, 'articles': len(self.index.entries),
+                             'uptime': round(time.time() - self.started_at, 1),
+                             'requests': self.requests},
+            'refresh': self.refresh,
+            'stats': self.style_stats,
+            'score': lambda: self.score_draft(request.get('text', '')),
+            'lint': lambda: self.lint_draft(request.get('text', '')),
+            'search': lambda: self.search(request.get('query', ''), int(request.get('limit', 10))),
+        }
+        if op not in handlers:
+            return {'ok': False, 'error': f"unknown op: {op}"}
+        with self._lock:
+            self.requests += 1
+            try:
+                if op != 'refresh':
+                    # 毎回 stat だけ確認し、変わった記事があれば読み直す
+                    self.index.refresh()
+                return {'ok': True, 'result': handlers[op]()}
+            except Exception as e:
+                return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+    def refresh(self) -> Dict:
+        changes = self.index.refresh()
+        return {key: len(names) for key, names in changes.items()} | {'articles': len(self.index.entries)}
+
+    def style_stats(self) -> Dict:
+        """コーパス全体の文体統計（記事に変化がなければ前回の結果を返す）"""
+        if self._stats is not None and self._stats_version == self.index.version:
+            return self._stats
+
+        self.analyzer.articles = list(self.index.entries.values())
+        metrics = [e['metrics'] for e in self.analyzer.articles]
+        self._stats = {
+            'articles': len(self.analyzer.articles),
+            'sentence_length': self.analyzer.analyze_sentence_length(),
+            'paragraph': self.analyzer.analyze_paragraph_pattern(),
+            'expressions': self.analyzer.analyze_frequent_expressions(),
+            'headings': self.analyzer.analyze_heading_structure(),
+            'metrics': {m: self._mean_std([x[m] for x in metrics]) for m in StyleDriftTracker.METRICS},
+        }
+        self._stats_version = self.index.version
+        return self._stats
+
+    @staticmethod
+    def _mean_std(values: List[float]) -> Dict[str, float]:
+        if not values:
+            return {'mean': 0.0, 'std': 0.0}
+        mean = sum(values) / len(values)
+        std = math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+        return {'mean': mean, 'std': std}
+
+    def _pos_ratios(self, text: str) -> Dict[str, float]:
+        """品詞（名詞・動詞・形容詞・助詞）の比率"""
+        counts = {'名詞': 0, '動詞': 0, '形容詞': 0, '助詞': 0}
+        total = 0
+        for token in self.analyzer.tokenizer.tokenize(text):
+            total += 1
+            pos = token.part_of_speech.split(',')[0]
+            if pos in counts:
+                counts[pos] += 1
+        return {pos: count / total if total else 0.0 for pos, count in counts.items()}
+
+    def score_draft(self, text: str) -> Dict:
+        """下書きの文体メトリクスをコーパスの分布と比べる
+
+        各メトリクスの z スコア（記事ごとの値の平均・標準偏差に対する偏差）と、
+        |z| の平均から 0〜100 の一致度を返す。
+        """
+        stats = self.style_stats()
+        draft = article_style_metrics(text.strip())
+        comparisons = {}
+        for metric, dist in stats['metrics'].items():
+            z = (draft[metric] - dist['mean']) / dist['std'] if dist['std'] else 0.0
+            comparisons[metric] = {'value': round(draft[metric], 4), 'corpus_mean': round(dist['mean'], 4),
+                                   'z': round(z, 2)}
+
+        if JANOME_AVAILABLE and self.analyzer.tokenizer is not None:
+            corpus_ratios = []
+            for entry in self.index.entries.values():
+                if entry['pos_ratios'] is None:
+                    entry['pos_ratios'] = self._pos_ratios(entry['content'])
+                corpus_ratios.append(entry['pos_ratios'])
+            draft_ratios = self._pos_ratios(text)
+            for pos, value in draft_ratios.items():
+                dist = self._mean_std([r[pos] for r in corpus_ratios])
+                z = (value - dist['mean']) / dist['std'] if dist['std'] else 0.0
+                comparisons[f"pos_{pos}"] = {'value': round(value, 4), 'corpus_mean': round(dist['mean'], 4),
+                                            'z': round(z, 2)}
+
+        lengths = sentence_lengths(text)
+        draft_dist = distribution_stats([lengths])
+        mean_abs_z = sum(abs(c['z']) for c in comparisons.values()) / len(comparisons) if comparisons else 0.0
+        return {
+            'score': round(max(0.0, 100.0 - 25.0 * mean_abs_z), 1),
+            'sentences': draft_dist['count'],
+            'sentence_length': {'avg': draft_dist['avg'], 'median': draft_dist['median'],
+                                'corpus_avg': stats['sentence_length'].get('avg', 0)},
+            'metrics': comparisons,
+        }
+
+    def lint_draft(self, text: str) -> Dict:
+        """下書きを content_policy.md・style_guide.md のNG表現で検査する（ルールはファイルが変わるまで使い回す）"""
+        return PolicyEngine.load(self.references_dir).lint(text)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """本文・タイトルに query を含む記事を出現回数順に返す"""
+        if not query:
+            return []
+        needle = query.lower()
+        results = []
+        for entry in self.index.entries.values():
+            haystack = entry['content'].lower()
+            hits = haystack.count(needle) + entry['title'].lower().count(needle)
+            if not hits:
+                continue
+            snippets = []
+            start = haystack.find(needle)
+            while start != -1 and len(snippets) < 3:
+                lo = max(0, start - SNIPPET_CHARS)
+                hi = min(len(entry['content']), start + len(query) + SNIPPET_CHARS)
+                snippets.append(entry['content'][lo:hi].replace('\n', ' '))
+                start = haystack.find(needle, hi)
+            results.append({
+                'article_id': entry['article_id'],
+                'day_number': entry['day_number'],
+                'title': entry['title'],
+                'path': entry['path'],
+                'hits': hits,
+                'snippets': snippets,
+            })
+        results.sort(key=lambda r: (-r['hits'], r['day_number'] or 0))
+        return results[:limit]
@@ -4,20 +4,31 @@ analyze_style.py - 既存記事から文体パターンを抽出し、style_guid
 
 使用方法:
     python3 analyze_style.py
+    python3 analyze_style.py --timeseries drift.csv [--window 7]
+    python3 analyze_style.py --profile [all|light|cprofile,stacks,memory]
 
 出力:
     references/style_guide.md を更新（または新規作成）
 
 依存パッケージ:
     pip install janome pyyaml
+    pip install numpy  # 任意: 分布統計・文字種判定のベクトル計算
 """
 
 import os
 import re
-import glob
+import argparse
+import json
+import bisect
+from array import array
 from pathlib import Path
 from collections import Counter
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Sequence, Iterable, Optional
+
+import profiling
+from corpus_layout import list_articles
+from phrase_discovery import PhraseDiscovery
+from readability_metrics import corpus_metrics, format_table as format_readability_table
 
 # オプション: 形態素解析用（インストールされていない場合はスキップ）
 try:
@@ -28,6 +39,362 @@ except ImportError:
     print("Warning: janome not installed. Some analysis features will be limited.")
     print("Install with: pip install janome")
 
+# オプション: 統計量のベクトル計算用（無ければ純Pythonで同じ値を計算）
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# 接続詞パターン
+CONNECTORS = [
+    'そして', 'しかし', 'でも', 'ただ', 'つまり', 'なぜなら',
+    '一方で', '例えば', 'むしろ', 'ところが', 'だから', 'また',
+    'さらに', '要するに', '結局', 'そこで', 'このように'
+]
+
+# 文長ヒストグラムの区間（文字数の下限。最後の区間は上限なし）
+SENTENCE_LENGTH_BINS = [0, 10, 20, 30, 40, 60, 80, 100, 150, 200]
+PERCENTILES = [10, 25, 75, 90]
+
+
+def sentence_lengths(content: str) -> array:
+    """本文を文に分割し、各文の文字数を配列で返す（文字列は保持しない）"""
+    # 文を分割（。！？で区切る）
+    lengths = array('I')
+    for s in re.split(r'[。！？\n]', content):
+        n = len(s.strip())
+        if n > 5:
+            lengths.append(n)
+    return lengths
+
+
+def paragraph_sentence_counts(content: str) -> array:
+    """空行区切りの段落ごとに文数を配列で返す（見出しは除く）"""
+    counts = array('I')
+    for p in re.split(r'\n\s*\n', content):
+        if p.strip() and not p.strip().startswith('#'):
+            # 段落内の文数をカウント
+            sentence_count = sum(1 for s in re.split(r'[。！？]', p) if s.strip())
+            if sentence_count > 0:
+                counts.append(sentence_count)
+    return counts
+
+
+ENDING_PATTERNS = {
+    'です': r'です[。\n]',
+    'ます': r'ます[。\n]',
+    'でした': r'でした[。\n]',
+    'ました': r'ました[。\n]',
+    'だ': r'[^し]だ[。\n]',
+    'である': r'である[。\n]',
+}
+FIRST_PERSON = {
+    '私': ['私は', '私の', '私が'],
+    '僕': ['僕は', '僕の', '僕が'],
+}
+
+
+def expression_counts(content: str) -> Dict:
+    """接続詞・語尾・一人称の出現回数（記事ごとに数えて合計すれば全文を連結せずに済む）"""
+    return {
+        'connectors': {c: content.count(c) for c in CONNECTORS if c in content},
+        'endings': {name: len(re.findall(pattern, content)) for name, pattern in ENDING_PATTERNS.items()},
+        'first_person': {name: sum(content.count(w) for w in words) for name, words in FIRST_PERSON.items()},
+    }
+
+
+def article_summary(content: str) -> Dict:
+    """1記事分の集計用の値（文長・段落の配列、表現の出現回数、見出し数、導入）
+
+    本文の文字列は含めないため、全記事分を保持してもコーパスの大きさに比例しない。
+    """
+    opening = ''
+    for p in content.split('\n\n'):
+        # 最初の段落の最初の100文字
+        if p.strip() and not p.strip().startswith('#'):
+            opening = p.strip()[:100]
+            break
+    return {
+        'sentence_lengths': sentence_lengths(content),
+        'paragraph_sentences': paragraph_sentence_counts(content),
+        'expressions': expression_counts(content),
+        'h2': len(re.findall(r'^## ', content, re.MULTILINE)),
+        'h3': len(re.findall(r'^### ', content, re.MULTILINE)),
+        'opening': opening,
+    }
+
+
+def _percentile_sorted(values: Sequence[int], q: float) -> float:
+    """ソート済み配列の線形補間パーセンタイル（numpy.percentile と同じ定義）"""
+    pos = (len(values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def distribution_stats(arrays: Sequence[array], bins: Sequence[int] = SENTENCE_LENGTH_BINS) -> Dict:
+    """記事ごとの数値配列をまとめて分布統計を計算
+
+    平均・最小・最大・中央値（ソート後の len//2 番目）は従来の定義のまま、
+    パーセンタイルとヒストグラムを追加する。
+    """
+    total = sum(len(a) for a in arrays)
+    if total == 0:
+        return {'avg': 0, 'min': 0, 'max': 0, 'median': 0, 'count': 0,
+                'percentiles': {p: 0 for p in PERCENTILES},
+                'histogram': [0] * len(bins)}
+
+    if NUMPY_AVAILABLE:
+        values = np.sort(np.concatenate([np.frombuffer(a, dtype=np.uint32) for a in arrays if len(a)]))
+        percentiles = np.percentile(values, PERCENTILES)
+        # bins[i] <= v < bins[i+1] の件数（最後の区間は上限なし）
+        edges = np.searchsorted(values, np.asarray(bins), side='left')
+        histogram = np.diff(np.append(edges, total)).tolist()
+        return {
+            'avg': int(values.sum(dtype=np.int64)) / total,
+            'min': int(values[0]),
+            'max': int(values[-1]),
+            'median': int(values[total // 2]),
+            'count': total,
+            'percentiles': {p: float(v) for p, v in zip(PERCENTILES, percentiles)},
+            'histogram': [int(c) for c in histogram],
+        }
+
+    values = array('I')
+    for a in arrays:
+        values.extend(a)
+    values = sorted(values)
+    edges = [bisect.bisect_left(values, b) for b in bins] + [total]
+    return {
+        'avg': sum(values) / total,
+        'min': values[0],
+        'max': values[-1],
+        'median': values[total // 2],
+        'count': total,
+        'percentiles': {p: _percentile_sorted(values, p) for p in PERCENTILES},
+        'histogram': [edges[i + 1] - edges[i] for i in range(len(bins))],
+    }
+
+
+def split_frontmatter(text: str) -> Tuple[Dict, str]:
+    """frontmatter と本文を分離（pyyaml が無い場合は key: value 行のみ解釈）"""
+    if not text.startswith('---'):
+        return {}, text
+    parts = text.split('---', 2)
+    if len(parts) < 3:
+        return {}, text
+
+    meta = {}
+    try:
+        import yaml
+        meta = yaml.safe_load(parts[1]) or {}
+    except ImportError:
+        for line in parts[1].splitlines():
+            m = re.match(r'^(\w+):\s*(.*)$', line)
+            if m:
+                value = m.group(2).strip().strip("'\"")
+                meta[m.group(1)] = int(value) if value.isdigit() else value
+    except Exception:
+        meta = {}
+    return meta, parts[2]
+
+
+def article_style_metrics(content: str) -> Dict:
+    """1記事分の文体メトリクスを計算"""
+    lengths = sentence_lengths(content)
+    chars = max(len(content), 1)
+    polite = len(re.findall(r'(?:です|ます|でした|ました)[。\n]', content))
+    plain = len(re.findall(r'(?:[^し]だ|である)[。\n]', content))
+    connectors = sum(content.count(c) for c in CONNECTORS)
+    headings = len(re.findall(r'^#{2,3} ', content, re.MULTILINE))
+    return {
+        'chars': len(content),
+        'sentences': len(lengths),
+        'avg_sentence_length': sum(lengths) / len(lengths) if lengths else 0.0,
+        'desu_masu_ratio': polite / (polite + plain) if polite + plain else 0.0,
+        'connectors_per_1k': connectors * 1000 / chars,
+        'headings_per_1k': headings * 1000 / chars,
+    }
+
+
+class StyleDriftTracker:
+    """記事ごとの文体メトリクスをキャッシュし、day_number 順の推移を計算するクラス
+
+    キャッシュはファイルの mtime とサイズで照合し、追加・変更された記事だけを
+    再計算する。refresh(touched) で記事を指定した場合は、その記事だけを照合して
+    変更分をジャーナル（1行1記事の追記）に書き、キャッシュ全体は書き直さない。
+    """
+
+    CACHE_FILENAME = '.style_metrics.json'
+    JOURNAL_FILENAME = '.style_metrics.journal'
+    CACHE_VERSION = 1
+    METRICS = ['avg_sentence_length', 'desu_masu_ratio', 'connectors_per_1k', 'headings_per_1k']
+
+    def __init__(self, corpus_dir: Path):
+        self.corpus_dir = Path(corpus_dir)
+        self.cache_path = self.corpus_dir / self.CACHE_FILENAME
+        self.journal_path = self.corpus_dir / self.JOURNAL_FILENAME
+        self.articles_dir = self.corpus_dir / "articles"
+        self.entries: Dict[str, Dict] = {}
+        self.journal_lines = 0
+        self.journal_broken = False
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        """キャッシュを読み、ジャーナルの変更を順に反映する"""
+        self.journal_lines = 0
+        if not self.cache_path.exists():
+            return {}
+        try:
+            data = json.loads(self.cache_path.read_text(encoding='utf-8'))
+            if data.get('version') != self.CACHE_VERSION:
+                return {}
+            entries = data.get('articles', {})
+        except (OSError, ValueError):
+            return {}
+        try:
+            with open(self.journal_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 書き込み途中で中断された行以降は捨て、次の保存でキャッシュにまとめ直す
+                        self.journal_broken = True
+                        break
+                    if record['entry'] is None:
+                        entries.pop(record['key'], None)
+                    else:
+                        entries[record['key']] = record['entry']
+                    self.journal_lines += 1
+        except OSError:
+            pass
+        return entries
+
+    def _save_cache(self):
+        data = {'version': self.CACHE_VERSION, 'articles': self.entries}
+        tmp_path = self.cache_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp_path, self.cache_path)
+        self.journal_path.unlink(missing_ok=True)
+        self.journal_lines = 0
+        self.journal_broken = False
+
+    def _append_journal(self, changes: Dict[str, Optional[Dict]]):
+        """変更された記事だけをジャーナルに追記（記事数より長くなったらキャッシュにまとめる）"""
+        if self.journal_broken or self.journal_lines + len(changes) > max(len(self.entries), 64):
+            self._save_cache()
+            return
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            for key, entry in changes.items():
+                f.write(json.dumps({'key': key, 'entry': entry}, ensure_ascii=False, sort_keys=True) + '\n')
+        self.journal_lines += len(changes)
+
+    def _compute(self, filepath: Path, st) -> Dict:
+        meta, body = split_frontmatter(filepath.read_text(encoding='utf-8'))
+        entry = {
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'day_number': meta.get('day_number'),
+            'publish_datetime': str(meta.get('publish_datetime') or ''),
+        }
+        entry.update(article_style_metrics(body.strip()))
+        return entry
+
+    def refresh(self, touched: Optional[Iterable[Path]] = None) -> int:
+        """キャッシュを読み込み、変更された記事だけ再計算する（再計算件数を返す）
+
+        2回目以降はメモリ上のエントリを使うため、常駐プロセスからも安く呼べる。
+        touched（更新・削除された記事ファイル）を渡すと、それ以外の記事は stat もしない。
+        キャッシュがまだ無い場合は全記事を照合する。
+        """
+        cached = self.entries or self._load_cache()
+        if touched is not None and cached:
+            return self._refresh_touched(cached, touched)
+
+        entries = {}
+        recomputed = 0
+        for filepath in list_articles(self.articles_dir):
+            st = filepath.stat()
+            key = filepath.relative_to(self.articles_dir).as_posix()
+            entry = cached.get(key)
+            if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+                entries[key] = entry
+                continue
+            entries[key] = self._compute(filepath, st)
+            recomputed += 1
+
+        changed = (recomputed > 0 or set(entries) != set(cached)
+                   or self.journal_lines > 0 or self.journal_broken)
+        self.entries = entries
+        if changed:
+            self._save_cache()
+        return recomputed
+
+    def _refresh_touched(self, cached: Dict[str, Dict], touched: Iterable[Path]) -> int:
+        self.entries = cached
+        changes: Dict[str, Optional[Dict]] = {}
+        for filepath in touched:
+            filepath = Path(filepath)
+            try:
+                key = filepath.relative_to(self.articles_dir).as_posix()
+            except ValueError:
+                continue
+            try:
+                st = filepath.stat()
+            except FileNotFoundError:
+                if self.entries.pop(key, None) is not None:
+                    changes[key] = None
+                continue
+            entry = self.entries.get(key)
+            if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+                continue
+            self.entries[key] = changes[key] = self._compute(filepath, st)
+        if changes:
+            self._append_journal(changes)
+        return sum(1 for entry in changes.values() if entry is not None)
+
+    def series(self, window: int = 7) -> List[Dict]:
+        """day_number 順に並べ、各メトリクスの移動平均（直近 window 記事）を付与"""
+        if window < 1:
+            raise ValueError(f"window は1以上を指定してください: {window}")
+        rows = sorted(
+            (e for e in self.entries.values() if e.get('day_number') is not None),
+            key=lambda e: e['day_number']
+        )
+        result = []
+        sums = {m: 0.0 for m in self.METRICS}
+        for i, entry in enumerate(rows):
+            for m in self.METRICS:
+                sums[m] += entry[m]
+                if i >= window:
+                    sums[m] -= rows[i - window][m]
+            n = min(i + 1, window)
+            row = {
+                'day_number': entry['day_number'],
+                'publish_datetime': entry['publish_datetime'],
+            }
+            for m in self.METRICS:
+                row[m] = round(entry[m], 4)
+                row[f"{m}_rolling"] = round(sums[m] / n, 4)
+            result.append(row)
+        return result
+
+    @staticmethod
+    def write_series(rows: List[Dict], output_path: Path):
+        """推移を CSV または JSON（拡張子で判定）に書き出す"""
+        output_path = Path(output_path)
+        if output_path.suffix == '.json':
+            output_path.write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding='utf-8')
+            return
+
+        import csv
+        with open(output_path, 'w', encoding='utf-8', newline='') as f:
+            if not rows:
+                return
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+
 
 class StyleAnalyzer:
     """既存記事の文体を分析するクラス"""
@@ -37,103 +404,82 @@ class StyleAnalyzer:
         self.articles: List[Dict] = []
         self.tokenizer = Tokenizer() if JANOME_AVAILABLE else None
 
+    @staticmethod
+    def read_content(filepath: Path) -> str:
+        """記事ファイルの本文（frontmatter を除去）"""
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+        if content.startswith('---'):
+            parts = content.split('---', 2)
+            if len(parts) >= 3:
+                content = parts[2]
+        return content.strip()
+
     def load_articles(self) -> int:
-        """corpus/articles/ から全記事を読み込む"""
-        pattern = self.corpus_dir / "articles" / "*.md"
-        files = glob.glob(str(pattern))
-
-        for filepath in files:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-                # frontmatter を除去
-                if content.startswith('---'):
-                    parts = content.split('---', 2)
-                    if len(parts) >= 3:
-                        content = parts[2]
-                self.articles.append({
-                    'path': filepath,
-                    'content': content.strip()
-                })
+        """corpus/articles/ から全記事を読み込む（本文は集計用の値に変換して捨てる）"""
+        # マニフェストがあればディレクトリを走査せずに列挙する
+        for filepath in list_articles(self.corpus_dir / "articles"):
+            self.articles.append({'path': filepath, **article_summary(self.read_content(filepath))})
 
         return len(self.articles)
 
-    def analyze_sentence_length(self) -> Dict:
-        """文長統計を計算"""
-        all_sentences = []
+    def iter_contents(self) -> Iterable[str]:
+        """本文を1記事ずつ返す（保持していない記事はファイルから読み直す）"""
         for article in self.articles:
-            # 文を分割（。！？で区切る）
-            sentences = re.split(r'[。！？\n]', article['content'])
-            sentences = [s.strip() for s in sentences if s.strip() and len(s.strip()) > 5]
-            all_sentences.extend(sentences)
+            content = article.get('content')
+            yield content if content is not None else self.read_content(article['path'])
 
-        if not all_sentences:
+    def analyze_sentence_length(self) -> Dict:
+        """文長統計を計算"""
+        stats = distribution_stats([a['sentence_lengths'] for a in self.articles])
+        if stats['count'] == 0:
             return {'avg': 0, 'min': 0, 'max': 0, 'median': 0}
 
-        lengths = [len(s) for s in all_sentences]
-        lengths.sort()
+        stats['total_sentences'] = stats.pop('count')
+        return stats
 
-        return {
-            'avg': sum(lengths) / len(lengths),
-            'min': min(lengths),
-            'max': max(lengths),
-            'median': lengths[len(lengths) // 2],
-            'total_sentences': len(all_sentences)
-        }
+    def analyze_article_distributions(self) -> List[Dict]:
+        """記事ごとの文長分布を計算"""
+        results = []
+        for article in self.articles:
+            stats = distribution_stats([article['sentence_lengths']])
+            results.append({
+                'path': article['path'],
+                'sentences': stats['count'],
+                'avg': stats['avg'],
+                'median': stats['median'],
+                'p90': stats['percentiles'][90],
+                'paragraphs': len(article['paragraph_sentences']),
+            })
+        return results
 
     def analyze_paragraph_pattern(self) -> Dict:
         """段落構成パターンを分析"""
-        paragraph_lengths = []
-        for article in self.articles:
-            # 空行で段落を分割
-            paragraphs = re.split(r'\n\s*\n', article['content'])
-            for p in paragraphs:
-                if p.strip() and not p.strip().startswith('#'):
-                    # 段落内の文数をカウント
-                    sentences = re.split(r'[。！？]', p)
-                    sentence_count = len([s for s in sentences if s.strip()])
-                    if sentence_count > 0:
-                        paragraph_lengths.append(sentence_count)
-
-        if not paragraph_lengths:
+        stats = distribution_stats([a['paragraph_sentences'] for a in self.articles], bins=[1, 2, 3, 4, 6])
+        if stats['count'] == 0:
             return {'avg_sentences_per_paragraph': 0}
 
         return {
-            'avg_sentences_per_paragraph': sum(paragraph_lengths) / len(paragraph_lengths),
-            'total_paragraphs': len(paragraph_lengths)
+            'avg_sentences_per_paragraph': stats['avg'],
+            'total_paragraphs': stats['count'],
+            'median_sentences_per_paragraph': stats['median'],
+            'percentiles': stats['percentiles'],
         }
 
     def analyze_frequent_expressions(self) -> Dict:
         """頻出表現を抽出"""
-        # 接続詞パターン
-        connectors = [
-            'そして', 'しかし', 'でも', 'ただ', 'つまり', 'なぜなら',
-            '一方で', '例えば', 'むしろ', 'ところが', 'だから', 'また',
-            'さらに', '要するに', '結局', 'そこで', 'このように'
-        ]
-
-        connector_counts = Counter()
-        all_text = ' '.join([a['content'] for a in self.articles])
-
-        for conn in connectors:
-            count = all_text.count(conn)
-            if count > 0:
-                connector_counts[conn] = count
-
-        # 語尾パターン
-        ending_patterns = {
-            'です': len(re.findall(r'です[。\n]', all_text)),
-            'ます': len(re.findall(r'ます[。\n]', all_text)),
-            'でした': len(re.findall(r'でした[。\n]', all_text)),
-            'ました': len(re.findall(r'ました[。\n]', all_text)),
-            'だ': len(re.findall(r'[^し]だ[。\n]', all_text)),
-            'である': len(re.findall(r'である[。\n]', all_text)),
-        }
-
-        # 一人称
-        first_person = {
-            '私': all_text.count('私は') + all_text.count('私の') + all_text.count('私が'),
-            '僕': all_text.count('僕は') + all_text.count('僕の') + all_text.count('僕が'),
-        }
+        # 記事ごとの出現回数を合計する（接続詞は CONNECTORS の順に数え、同数の並びを保つ）
+        connector_counts = Counter({conn: 0 for conn in CONNECTORS})
+        ending_patterns = {name: 0 for name in ENDING_PATTERNS}
+        first_person = {name: 0 for name in FIRST_PERSON}
+        for article in self.articles:
+            counts = article['expressions']
+            connector_counts.update(counts['connectors'])
+            for name, n in counts['endings'].items():
+                ending_patterns[name] += n
+            for name, n in counts['first_person'].items():
+                first_person[name] += n
+        connector_counts = +connector_counts
 
         return {
             'connectors': dict(connector_counts.most_common(10)),
@@ -141,16 +487,20 @@ class StyleAnalyzer:
             'first_person': first_person
         }
 
+    def analyze_characteristic_phrases(self, top: int = 10) -> Dict:
+        """n-gram の統計から特徴的なフレーズ・文頭・文末表現を抽出"""
+        min_df = 2 if len(self.articles) >= 4 else 1
+        discovery = PhraseDiscovery(min_df=min_df)
+        return discovery.run(self.iter_contents, top=top)
+
+    def analyze_readability(self) -> Dict:
+        """文字種の比率・漢字の連続・読点の分布を計算"""
+        return corpus_metrics(self.iter_contents())
+
     def analyze_heading_structure(self) -> Dict:
         """見出し構造を分析"""
-        h2_counts = []
-        h3_counts = []
-
-        for article in self.articles:
-            h2 = len(re.findall(r'^## ', article['content'], re.MULTILINE))
-            h3 = len(re.findall(r'^### ', article['content'], re.MULTILINE))
-            h2_counts.append(h2)
-            h3_counts.append(h3)
+        h2_counts = [article['h2'] for article in self.articles]
+        h3_counts = [article['h3'] for article in self.articles]
 
         return {
             'avg_h2_per_article': sum(h2_counts) / len(h2_counts) if h2_counts else 0,
@@ -159,24 +509,19 @@ class StyleAnalyzer:
 
     def analyze_opening_patterns(self) -> List[str]:
         """導入パターンを抽出"""
-        openings = []
-        for article in self.articles:
-            # 最初の段落を取得
-            paragraphs = article['content'].split('\n\n')
-            for p in paragraphs:
-                if p.strip() and not p.strip().startswith('#'):
-                    # 最初の100文字を取得
-                    opening = p.strip()[:100]
-                    openings.append(opening)
-                    break
+        openings = [article['opening'] for article in self.articles if article['opening']]
         return openings[:5]  # 最初の5つのみ返す
 
-    def generate_style_guide(self) -> str:
-        """分析結果からstyle_guide.mdを生成"""
+    def generate_style_guide(self, drift_window: int = 7) -> str:
+        """分析結果からstyle_guide.mdを生成（drift_window は文体推移の移動平均の記事数）"""
         sentence_stats = self.analyze_sentence_length()
         paragraph_stats = self.analyze_paragraph_pattern()
         expressions = self.analyze_frequent_expressions()
         headings = self.analyze_heading_structure()
+        per_article = self.analyze_article_distributions()
+        phrases = self.analyze_characteristic_phrases()
+        readability = self.analyze_readability()
+        drift = self.analyze_style_drift(drift_window)
 
         # 一人称の判定
         first_person = '私' if expressions['first_person']['私'] > expressions['first_person']['僕'] else '僕'
@@ -213,13 +558,15 @@ class StyleAnalyzer:
 - 最小: {sentence_stats['min']}文字, 最大: {sentence_stats['max']}文字
 - 中央値: {sentence_stats['median']}文字
 - 分析文数: {sentence_stats['total_sentences']}文
-
+{self._format_sentence_distribution(sentence_stats, per_article)}
+{self._format_readability(readability)}
 ### 段落構成
 - 平均: {paragraph_stats['avg_sentences_per_paragraph']:.1f}文/段落
 - 改行頻度: 高め（読みやすさ重視）
 
 ---
 
+{self._format_style_drift(drift, drift_window)}
 ## 特徴的表現
 
 ### 頻出接続詞・つなぎ言葉
@@ -230,9 +577,8 @@ class StyleAnalyzer:
         guide += f"""
 ### 強調表現
 - **太字** を効果的に使用
-- 「これが重要で」
-- 「〜なんです」
 
+{self._format_characteristic_phrases(phrases)}
 ---
 
 ## 記事構成パターン
@@ -280,10 +626,111 @@ class StyleAnalyzer:
 """
         return guide
 
-    def run(self, output_path: str = None):
+    def analyze_style_drift(self, window: int = 7) -> List[Dict]:
+        """day_number 順の文体推移（移動平均）を計算"""
+        tracker = StyleDriftTracker(self.corpus_dir)
+        tracker.refresh()
+        return tracker.series(window)
+
+    @staticmethod
+    def _format_style_drift(series: List[Dict], window: int) -> str:
+        """文体推移の要約（最初と最新の移動平均の比較）を Markdown に整形"""
+        if len(series) <= window:
+            return ''
+
+        first, last = series[window - 1], series[-1]
+        labels = [
+            ('avg_sentence_length', '平均文長（文字）', '{:.1f}'),
+            ('desu_masu_ratio', 'です・ます率', '{:.0%}'),
+            ('connectors_per_1k', '接続詞（1000字あたり）', '{:.1f}'),
+            ('headings_per_1k', '見出し（1000字あたり）', '{:.2f}'),
+        ]
+        lines = [
+            '### 文体の推移',
+            f"直近{window}記事の移動平均: Day{series[0]['day_number']}〜{first['day_number']} → "
+            f"Day{series[-window]['day_number']}〜{last['day_number']}",
+            '',
+            '| 指標 | 初期 | 最新 | 変化 |',
+            '|------|------|------|------|',
+        ]
+        for key, label, fmt in labels:
+            a, b = first[f"{key}_rolling"], last[f"{key}_rolling"]
+            shown_a, shown_b = fmt.format(a), fmt.format(b)
+            # 表示桁で同じ値なら横ばいとする（丸める前の差で矢印を付けない）
+            arrow = '→' if shown_a == shown_b else ('↑' if b > a else '↓')
+            lines.append(f"| {label} | {shown_a} | {shown_b} | {arrow} |")
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _format_characteristic_phrases(phrases: Dict) -> str:
+        """自動抽出したフレーズ・文頭・文末表現を Markdown に整形"""
+        sections = [
+            ('phrases', '特徴的なフレーズ（自動抽出）', '{text}'),
+            ('openers', 'よく使う文頭', '{text}〜'),
+            ('endings', 'よく使う文末', '〜{text}'),
+        ]
+        lines = []
+        for key, title, fmt in sections:
+            items = phrases.get(key, [])
+            if not items:
+                continue
+            lines += [f"### {title}"]
+            for item in items:
+                lines.append(f"- 「{fmt.format(text=item['text'])}」({item['count']}回 / {item['articles']}記事)")
+            lines.append('')
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _format_sentence_distribution(sentence_stats: Dict, per_article: List[Dict]) -> str:
+        """文長のパーセンタイル・ヒストグラム・記事別分布を Markdown に整形"""
+        if not sentence_stats.get('total_sentences'):
+            return ''
+
+        p = sentence_stats['percentiles']
+        lines = [
+            f"- パーセンタイル: p10={p[10]:.0f} / p25={p[25]:.0f} / p75={p[75]:.0f} / p90={p[90]:.0f}文字",
+            '',
+            '#### 文長の分布',
+            '',
+            '| 文字数 | 文数 | 割合 |',
+            '|--------|------|------|',
+        ]
+        total = sentence_stats['total_sentences']
+        bins = SENTENCE_LENGTH_BINS
+        for i, count in enumerate(sentence_stats['histogram']):
+            label = f"{bins[i]}-{bins[i + 1] - 1}" if i + 1 < len(bins) else f"{bins[i]}以上"
+            lines.append(f"| {label} | {count} | {count / total * 100:.1f}% |")
+
+        article_avgs = sorted(a['avg'] for a in per_article if a['sentences'])
+        if article_avgs:
+            lines += [
+                '',
+                '#### 記事ごとの平均文長',
+                f"- 最短: {article_avgs[0]:.1f}文字 / 中央: {article_avgs[len(article_avgs) // 2]:.1f}文字"
+                f" / 最長: {article_avgs[-1]:.1f}文字",
+            ]
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _format_readability(readability: Dict) -> str:
+        """文字種・読みやすさの指標の分布を Markdown に整形"""
+        if not readability['sentences']:
+            return ''
+
+        lines = [
+            '### 文字種・読みやすさ',
+            f"{readability['articles']}記事 / {readability['sentences']}文の分布"
+            '（文ごと: 1文の中での値、記事ごと: 記事全体の値）',
+            '',
+            format_readability_table(readability),
+        ]
+        return '\n'.join(lines)
+
+    def run(self, output_path: str = None, drift_window: int = 7):
         """分析を実行してstyle_guide.mdを生成"""
         print(f"Loading articles from {self.corpus_dir}...")
-        count = self.load_articles()
+        with profiling.phase('load_articles'):
+            count = self.load_articles()
         print(f"Loaded {count} articles")
 
         if count == 0:
@@ -291,18 +738,43 @@ class StyleAnalyzer:
             return
 
         print("Analyzing style patterns...")
-        guide = self.generate_style_guide()
+        with profiling.phase('analyze'):
+            guide = self.generate_style_guide(drift_window)
 
         if output_path is None:
             output_path = self.corpus_dir.parent / "references" / "style_guide.md"
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(guide)
+        with profiling.phase('write'):
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(guide)
 
         print(f"Style guide generated: {output_path}")
 
 
+def positive_int(value: str) -> int:
+    """argparse 用: 1以上の整数"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"1以上の整数を指定してください: {value}")
+    return number
+
+
 def main():
+    parser = argparse.ArgumentParser(description='既存記事から文体パターンを抽出し、style_guide.md を生成')
+    parser.add_argument(
+        '--timeseries',
+        type=Path,
+        help='day_number 順の文体推移を CSV/JSON（拡張子で判定）に出力して終了'
+    )
+    parser.add_argument(
+        '--window',
+        type=positive_int,
+        default=7,
+        help='推移の移動平均に使う記事数（--timeseries と style_guide.md の文体の推移, デフォルト: 7)'
+    )
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+
     # スクリプトのディレクトリからの相対パスでcorpusを探す
     script_dir = Path(__file__).parent.parent
     corpus_dir = script_dir / "corpus"
@@ -312,8 +784,18 @@ def main():
         print("Please run fetch_note_articles.py first.")
         return
 
-    analyzer = StyleAnalyzer(corpus_dir)
-    analyzer.run()
+    with profiling.session(args, 'analyze_style'):
+        if args.timeseries:
+            with profiling.phase('timeseries'):
+                tracker = StyleDriftTracker(corpus_dir)
+                recomputed = tracker.refresh()
+                rows = tracker.series(args.window)
+                StyleDriftTracker.write_series(rows, args.timeseries)
+            print(f"Style drift series written: {args.timeseries} ({len(rows)} articles, {recomputed} recomputed)")
+            return
+
+        analyzer = StyleAnalyzer(corpus_dir)
+        analyzer.run(drift_window=args.window)
 
 
 if __name__ == "__main__":
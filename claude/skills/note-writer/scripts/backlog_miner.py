@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+backlog_miner.py - 記事中の「書くと約束した」言及を拾い、未執筆テーマの候補にする
+
+「そんな話はまた今度」「そのうち書きます」などの言い回しを1つの正規表現にまとめて
+記事の各行に当て、前後の文・見出し・day 番号を記録する。前回の実行時点の
+チェックポイント（.cache/backlog_miner.json）と mtime・サイズ・ハッシュを照合し、
+追加・変更された記事だけを読み直す。
+
+候補は references/backlog_promises.json にまとめる。status が candidate 以外の項目
+（curated / rejected など、人が確認したもの）は書き換えも削除もしない。
+backlog_themes.md の「言及元」と一致する候補には theme を付ける。status は candidate の
+ままにし、走査のたびに付け直す（言及元を消したテーマの theme も外れる）。
+
+使用方法:
+    python3 backlog_miner.py            # 追加・変更された記事だけ走査して候補を更新
+    python3 backlog_miner.py --full     # チェックポイントを使わず全記事を走査
+    python3 backlog_miner.py --list     # 未確認の候補を表示
+
+出力:
+    references/backlog_promises.json
+        {"version": 1, "entries": [{id, status, article_id, day_number, title, heading,
+                                    sentence, phrase, pattern, line, first_seen, theme?}, ...]}
+
+依存パッケージ:
+    なし（標準ライブラリのみ）
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from corpus_layout import list_articles
+
+CHECKPOINT_VERSION = 1
+SCRIPT_DIR = Path(__file__).parent.parent
+DEFAULT_CHECKPOINT_PATH = SCRIPT_DIR / ".cache" / "backlog_miner.json"
+DEFAULT_BACKLOG_PATH = SCRIPT_DIR / "references" / "backlog_promises.json"
+
+# 約束の言い回し（id, パターン）。「いずれも」「今日は深掘りします」のような
+# その場で書いている文は拾わないよう、先送りを表す語と組み合わせる
+PROMISE_PATTERNS = [
+    ('mata_kondo', r'また今度'),
+    ('sonouchi', r'そのうち(?:書|まとめ|紹介|話し|お話し)'),
+    ('izure', r'いずれ(?!も|か|に)[^。！？\n]{0,12}?(?:書|考え|まとめ|紹介|話し|お話し|触れ)'),
+    ('betsu_kikai', r'(?:別|また)の機会に'),
+    ('kikai_areba', r'機会があれば[^。！？\n]{0,12}?(?:書|まとめ|紹介|話し|お話し|触れ)'),
+    ('aratamete', r'改めて(?:書|まとめ|紹介|お話し|記事に)[^。！？\n]{0,6}?(?:ます|たい)'),
+    ('jikai', r'次回(?:以降)?(?:に|で|は)?[^。！？\n]{0,12}?(?:書|まとめ|紹介|話し|お話し|触れ|深掘り)'),
+    ('betsu_kiji', r'別の記事(?:で|に)'),
+]
+PROMISE_RE = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in PROMISE_PATTERNS))
+PATTERN_SIGNATURE = hashlib.sha1(PROMISE_RE.pattern.encode('utf-8')).hexdigest()[:12]
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+SENTENCE_END_RE = re.compile(r'[。！？!?]')
+FOOTER_MARK = '**原文URL**'
+SOURCE_RE = re.compile(r'Day\s*(\d+)\s*「([^」]+)」')
+
+
+def _atomic_write_json(filepath: Path, data):
+    """一時ファイルに書き込んでから置き換える"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _sentence_around(line: str, start: int, end: int) -> str:
+    """マッチを含む1文（行内の句点で区切り、強調記号を除く）"""
+    head = max((m.end() for m in SENTENCE_END_RE.finditer(line, 0, start)), default=0)
+    tail = SENTENCE_END_RE.search(line, end)
+    stop = tail.end() if tail else len(line)
+    if stop < len(line) and line[stop] in '）)」':
+        stop += 1
+    sentence = line[head:stop]
+    sentence = sentence.replace('**', '').replace('\\', '').strip()
+    # 括弧書きの約束は括弧の中だけにする
+    for opening, closing in (('（', '）'), ('(', ')')):
+        if sentence.startswith(opening) and sentence.count(opening) > sentence.count(closing) - sentence.endswith(closing):
+            sentence = sentence[1:]
+        if sentence.endswith(closing) and sentence.count(closing) > sentence.count(opening):
+            sentence = sentence[:-1]
+    return sentence.strip()
+
+
+def scan_article(text: str) -> Dict:
+    """記事1本の約束を探す
+
+    Returns:
+        {'article_id', 'day_number', 'title', 'promises': [{sentence, phrase, pattern, heading, line}]}
+    """
+    lines = text.splitlines()
+    meta = {}
+    body_start = 0
+    if lines and lines[0] == '---':
+        for i, line in enumerate(lines[1:], 1):
+            if line == '---':
+                body_start = i + 1
+                break
+            m = re.match(r'^(\w+):\s*(.*)$', line)
+            if m:
+                meta[m.group(1)] = m.group(2).strip().strip("'\"")
+
+    title = meta.get('title', '')
+    heading = ''
+    in_code = False
+    promises = []
+    for lineno, line in enumerate(lines[body_start:], body_start + 1):
+        if line.startswith(FOOTER_MARK):
+            break
+        if line.strip().startswith('```'):
+            in_code = not in_code
+            continue
+        if in_code:
+            continue
+        m = HEADING_RE.match(line)
+        if m:
+            if len(m.group(1)) > 1 or not title:
+                heading = m.group(2).replace('**', '')
+            continue
+        for match in PROMISE_RE.finditer(line):
+            promises.append({
+                'sentence': _sentence_around(line, match.start(), match.end()),
+                'phrase': match.group(0),
+                'pattern': match.lastgroup,
+                'heading': heading,
+                'line': lineno,
+            })
+
+    day_number = meta.get('day_number')
+    return {
+        'article_id': meta.get('article_id', ''),
+        'day_number': int(day_number) if day_number and day_number.isdigit() else None,
+        'title': title,
+        'promises': promises,
+    }
+
+
+def entry_id(article_id: str, sentence: str) -> str:
+    """記事IDと文から作る候補のID（行番号がずれても変わらない）"""
+    return f"{article_id}-{hashlib.sha1(sentence.encode('utf-8')).hexdigest()[:8]}"
+
+
+def load_theme_sources(references_dir: Path) -> List[Dict]:
+    """backlog_themes.md の「言及元」（Day N「引用」）とテーマ名"""
+    from reference_docs import load_backlog_themes
+    if not (Path(references_dir) / "backlog_themes.md").exists():
+        return []
+    sources = []
+    for theme in load_backlog_themes(references_dir):
+        for m in SOURCE_RE.finditer(theme.get('言及元', '')):
+            sources.append({'day_number': int(m.group(1)), 'quote': m.group(2), 'theme': theme['title']})
+    return sources
+
+
+class BacklogMiner:
+    """チェックポイント以降に追加・変更された記事から約束を拾い、バックログに統合する"""
+
+    def __init__(self, articles_dir: Path, backlog_path: Path = DEFAULT_BACKLOG_PATH,
+                 checkpoint_path: Optional[Path] = DEFAULT_CHECKPOINT_PATH,
+                 references_dir: Optional[Path] = None):
+        self.articles_dir = Path(articles_dir)
+        self.backlog_path = Path(backlog_path)
+        self.checkpoint_path = checkpoint_path
+        self.references_dir = Path(references_dir) if references_dir else self.backlog_path.parent
+        self.files: Dict[str, Dict] = {}
+        self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not self.checkpoint_path.exists():
+            return
+        try:
+            data = json.loads(self.checkpoint_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        # パターンを変えたときは全記事を走査し直す
+        if (data.get('version') == CHECKPOINT_VERSION and data.get('patterns') == PATTERN_SIGNATURE
+                and data.get('articles_dir') == str(self.articles_dir.resolve())):
+            self.files = data['files']
+
+    def _save_checkpoint(self, scanned_at: datetime):
+        if not self.checkpoint_path:
+            return
+        _atomic_write_json(self.checkpoint_path, {
+            'version': CHECKPOINT_VERSION,
+            'patterns': PATTERN_SIGNATURE,
+            'articles_dir': str(self.articles_dir.resolve()),
+            'scanned_at': scanned_at.isoformat(),
+            'files': self.files,
+        })
+
+    def load_backlog(self) -> List[Dict]:
+        if not self.backlog_path.exists():
+            return []
+        return json.loads(self.backlog_path.read_text(encoding='utf-8'))['entries']
+
+    def changed_articles(self) -> Dict[str, List[str]]:
+        """{'scan': [変更・追加された記事の相対パス], 'removed': [...]}（内容が同じなら走査しない）"""
+        changes = {'scan': [], 'removed': []}
+        seen = set()
+        for filepath in list_articles(self.articles_dir):
+            key = filepath.relative_to(self.articles_dir).as_posix()
+            seen.add(key)
+            st = filepath.stat()
+            entry = self.files.get(key)
+            if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+                continue
+            sha256 = hashlib.sha256(filepath.read_bytes()).hexdigest()
+            if entry and entry['sha256'] == sha256:
+                # touch されただけ
+                entry.update(mtime_ns=st.st_mtime_ns, size=st.st_size)
+                continue
+            changes['scan'].append(key)
+        changes['removed'] = sorted(set(self.files) - seen)
+        return changes
+
+    def run(self, full: bool = False, scanned_at: Optional[datetime] = None) -> Dict[str, int]:
+        """走査してバックログを更新する"""
+        scanned_at = scanned_at or datetime.now()
+        if full:
+            self.files = {}
+        changes = self.changed_articles()
+        stats = {'scanned': len(changes['scan']), 'removed': len(changes['removed']),
+                 'added': 0, 'dropped': 0, 'kept': 0}
+
+        found: Dict[str, List[Dict]] = {}
+        for key in changes['scan']:
+            filepath = self.articles_dir / key
+            raw = filepath.read_bytes()
+            article = scan_article(raw.decode('utf-8'))
+            st = filepath.stat()
+            self.files[key] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                               'sha256': hashlib.sha256(raw).hexdigest(), 'article_id': article['article_id']}
+            found[article['article_id']] = [dict(p, article_id=article['article_id'], day_number=article['day_number'],
+                                                 title=article['title']) for p in article['promises']]
+        gone = {self.files.pop(key)['article_id'] for key in changes['removed']}
+
+        entries = self.load_backlog()
+        if found or gone:
+            entries = self.merge(entries, found, gone, scanned_at, stats)
+            _atomic_write_json(self.backlog_path, {'version': 1, 'entries': entries})
+        self._save_checkpoint(scanned_at)
+        stats['candidates'] = sum(1 for e in entries if e['status'] == 'candidate')
+        return stats
+
+    def merge(self, entries: List[Dict], found: Dict[str, List[Dict]], gone: set,
+              scanned_at: datetime, stats: Dict[str, int]) -> List[Dict]:
+        """走査した記事の候補を入れ替える（確認済みの項目はそのまま残す）"""
+        rescanned = set(found) | gone
+        # 確認済みの項目と、走査していない記事の候補はそのまま残す
+        merged = [e for e in entries if e['status'] != 'candidate' or e['article_id'] not in rescanned]
+        known_ids = {e['id'] for e in merged}
+        previous = {e['id']: e for e in entries if e['status'] == 'candidate' and e['article_id'] in rescanned}
+
+        sources = load_theme_sources(self.references_dir)
+        for article_id, promises in found.items():
+            for promise in promises:
+                pid = entry_id(article_id, promise['sentence'])
+                if pid in known_ids:
+                    continue
+                old = previous.pop(pid, None)
+                entry = {'id': pid, 'status': 'candidate', **promise,
+                         'first_seen': old['first_seen'] if old else scanned_at.isoformat()}
+                # 言及元との一致は自動の判定のため、人が確認するまでは candidate のままにする
+                theme = next((s['theme'] for s in sources
+                              if s['day_number'] == promise['day_number'] and s['quote'] in promise['sentence']), None)
+                if theme:
+                    entry['theme'] = theme
+                stats['kept' if old else 'added'] += 1
+                merged.append(entry)
+                known_ids.add(pid)
+        stats['dropped'] += len(previous)
+        merged.sort(key=lambda e: (e.get('day_number') or 0, e['article_id'], e.get('line') or 0))
+        return merged
+
+
+def print_candidates(entries: List[Dict]):
+    candidates = [e for e in entries if e['status'] == 'candidate']
+    print(f"未確認の候補: {len(candidates)}件")
+    for e in candidates:
+        day = f"Day{e['day_number']}" if e.get('day_number') else e['article_id']
+        heading = f" / {e['heading']}" if e.get('heading') else ''
+        theme = f" → テーマ「{e['theme']}」" if e.get('theme') else ''
+        print(f"- {day}「{e['sentence']}」（{e['title']}{heading}）{theme}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='記事中の「また今度」などの約束を未執筆テーマ候補として抽出')
+    parser.add_argument('--articles-dir', type=Path, default=SCRIPT_DIR / 'corpus' / 'articles',
+                        help='記事ディレクトリ (デフォルト: corpus/articles)')
+    parser.add_argument('--backlog', type=Path, default=DEFAULT_BACKLOG_PATH,
+                        help='候補の出力先 (デフォルト: references/backlog_promises.json)')
+    parser.add_argument('--checkpoint', type=Path, default=DEFAULT_CHECKPOINT_PATH,
+                        help='チェックポイント (デフォルト: .cache/backlog_miner.json)')
+    parser.add_argument('--references-dir', type=Path, default=SCRIPT_DIR / 'references',
+                        help='backlog_themes.md のあるディレクトリ (デフォルト: references)')
+    parser.add_argument('--full', action='store_true', help='チェックポイントを使わず全記事を走査')
+    parser.add_argument('--list', action='store_true', help='走査せずに未確認の候補を表示')
+    args = parser.parse_args()
+
+    miner = BacklogMiner(args.articles_dir, args.backlog, args.checkpoint, args.references_dir)
+    if not args.list:
+        stats = miner.run(full=args.full)
+        print(f"走査 {stats['scanned']}記事（削除 {stats['removed']}） / 追加 {stats['added']}件・"
+              f"削除 {stats['dropped']}件 / 未確認の候補 {stats['candidates']}件")
+    if args.list or stats['added']:
+        print_candidates(miner.load_backlog())
+
+
+if __name__ == "__main__":
+    main()
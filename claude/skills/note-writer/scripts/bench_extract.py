@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+bench_extract.py - メタデータ抽出の高速パスとDOM解析を比較するベンチマーク
+
+使用方法:
+    python3 bench_extract.py page1.html page2.html ... [--repeat 20]
+    python3 bench_extract.py recorded_pages/ [--repeat 20]
+    python3 bench_extract.py ../tests/fixtures/pages/
+
+    保存済みの記事ページ・プロフィールページを読み込み、ページの種類ごとに
+    高速パスと BeautifulSoup による抽出の結果が一致することを確認したうえで、
+    1ページあたりの処理時間を表示する。
+
+        記事ページ:       extract_json_ld / extract_json_ld_dom
+        プロフィール:     extract_article_list_from_profile / extract_article_list_from_profile_dom
+                          （記事キーの並びで比較）
+
+    ファイル名が profile で始まるページ、または JSON-LD が無く noteKeys・__NEXT_DATA__ を
+    含むページをプロフィールページとして扱う。
+
+依存パッケージ:
+    pip install beautifulsoup4 lxml
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from fetch_note_articles import ArticleParser
+
+
+def collect_pages(paths: List[Path]) -> List[Path]:
+    """引数のファイル・ディレクトリからHTMLファイルを集める"""
+    pages = []
+    for path in paths:
+        if path.is_dir():
+            pages.extend(sorted(p for p in path.iterdir() if p.suffix in ('.html', '.htm')))
+        else:
+            pages.append(path)
+    return pages
+
+
+# ページの種類ごとの (高速パス, DOM解析, 比較用に結果を正規化する関数)
+EXTRACTORS = {
+    'article': (ArticleParser.extract_json_ld, ArticleParser.extract_json_ld_dom, lambda r: r),
+    'profile': (ArticleParser.extract_article_list_from_profile,
+                ArticleParser.extract_article_list_from_profile_dom,
+                lambda r: [a['key'] for a in r]),
+}
+
+
+def page_kind(page: Path, raw: bytes) -> str:
+    """記事ページかプロフィールページか"""
+    if page.name.startswith('profile'):
+        return 'profile'
+    if not ArticleParser.JSON_LD_RE.search(raw) and (
+            ArticleParser.NEXT_DATA_RE.search(raw) or b'initialLatestNoteData' in raw):
+        return 'profile'
+    return 'article'
+
+
+def bench(func, data, repeat: int) -> float:
+    """1回あたりの平均秒数"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(data)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='メタデータ抽出の高速パスとDOM解析を比較')
+    parser.add_argument('paths', nargs='+', type=Path, help='保存済みHTMLファイルまたはディレクトリ')
+    parser.add_argument('--repeat', type=int, default=20, help='各ページの繰り返し回数 (デフォルト: 20)')
+    args = parser.parse_args()
+
+    pages = collect_pages(args.paths)
+    if not pages:
+        print("HTMLファイルが見つかりません。")
+        return 1
+
+    mismatches = 0
+    totals = {kind: [0, 0.0, 0.0] for kind in EXTRACTORS}  # ページ数, fast, dom
+    print(f"{'page':40s} {'kind':>8s} {'bytes':>9s} {'fast(ms)':>9s} {'dom(ms)':>9s} {'speedup':>8s}")
+    for page in pages:
+        raw = page.read_bytes()
+        # DOM 側には高速パスと同じく文字コードの判定を済ませた str を渡す
+        text = raw.decode('utf-8', 'replace')
+        kind = page_kind(page, raw)
+        fast_func, dom_func, normalize = EXTRACTORS[kind]
+        if normalize(fast_func(raw)) != normalize(dom_func(text)):
+            mismatches += 1
+            print(f"  ✗ 結果が一致しません: {page.name}")
+
+        fast = bench(fast_func, raw, args.repeat)
+        dom = bench(dom_func, text, args.repeat)
+        totals[kind][0] += 1
+        totals[kind][1] += fast
+        totals[kind][2] += dom
+        print(f"{page.name[:40]:40s} {kind:>8s} {len(raw):9d} {fast * 1000:9.2f} {dom * 1000:9.2f} "
+              f"{dom / fast if fast else 0:7.1f}x")
+
+    print()
+    for kind, (count, total_fast, total_dom) in totals.items():
+        if count:
+            print(f"合計 {kind} ({count}ページ): fast {total_fast * 1000:.1f}ms / dom {total_dom * 1000:.1f}ms "
+                  f"({total_dom / total_fast if total_fast else 0:.1f}x)")
+    print(f"不一致 {mismatches}件")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
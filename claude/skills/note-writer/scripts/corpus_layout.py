@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+corpus_layout.py - 記事・画像ディレクトリの配置（flat / sharded）とマニフェストによるパス解決
+
+    flat:    articles/day0001_<id>.md           images/<id>/image_1.png
+    sharded: articles/<著者>/<年>/<月>/day0001_<id>.md
+             images/<著者>/<年>/<月>/<id>/image_1.png
+
+articles/.manifest.json に記事ID → 記事・画像の相対パスを記録し、読み手は
+ディレクトリを走査せずにマニフェストから記事ファイルを列挙する。マニフェストが
+無い場合は従来どおり articles/*.md を列挙する（flat のまま読める）。
+
+使用方法:
+    python3 corpus_layout.py migrate --layout sharded [--dry-run]   # 配置を変更
+    python3 corpus_layout.py migrate --layout flat                  # flat に戻す（マニフェストは残す）
+    python3 corpus_layout.py rebuild                                # ファイルを走査してマニフェストを作り直す
+    python3 corpus_layout.py status
+
+    from corpus_layout import list_articles
+    for filepath in list_articles(articles_dir):
+        ...
+
+出力:
+    corpus/articles/.manifest.json
+    migrate は記事・画像を移動し、記事内の画像リンクと .fetch_state.json のパスも書き換える
+
+依存パッケージ:
+    pip install pyyaml  # 任意: フロントマターの解析（無ければ key: value 行のみ解釈）
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# オプション: 取得状態ファイルのプロセス間ロック（無い環境ではロックしない）
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+LAYOUTS = ('flat', 'sharded')
+MANIFEST_FILENAME = '.manifest.json'
+FETCH_STATE_FILENAME = '.fetch_state.json'
+UNKNOWN_AUTHOR = 'unknown'
+
+
+@contextlib.contextmanager
+def state_lock(output_dir: Path):
+    """取得状態・画像キュー・マニフェストを読み直して更新する間の排他ロック
+
+    本文の取得と --drain-images・migrate を別プロセスで同時に実行しても、
+    互いの更新を上書きしないようにする。
+    """
+    if not FCNTL_AVAILABLE:
+        yield
+        return
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / '.fetch_state.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _atomic_write_text(filepath: Path, text: str):
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _author_key(author: Optional[str]) -> str:
+    """ディレクトリ名に使える著者名（note.com のユーザー名を想定）"""
+    key = re.sub(r'[^\w.-]', '_', author or '').strip('._')
+    return key or UNKNOWN_AUTHOR
+
+
+def _month_parts(published) -> Tuple[str, str]:
+    """公開日時（datetime / ISO文字列）から (年, 月)"""
+    if isinstance(published, datetime):
+        return f"{published.year:04d}", f"{published.month:02d}"
+    m = re.match(r'(\d{4})-(\d{2})', str(published or ''))
+    if m:
+        return m.group(1), m.group(2)
+    return '0000', '00'
+
+
+class CorpusLayout:
+    """記事・画像の配置とマニフェストを管理する"""
+
+    def __init__(self, articles_dir: Path, image_dir: Optional[Path] = None):
+        self.articles_dir = Path(articles_dir)
+        self.image_dir = Path(image_dir) if image_dir else self.articles_dir.parent / 'images'
+        self.manifest_path = self.articles_dir / MANIFEST_FILENAME
+        self.layout = 'flat'
+        # 記事ID -> {'path', 'images', 'author', 'month'}（マニフェストが無ければ None）
+        self.articles: Optional[Dict[str, dict]] = None
+        self.load()
+
+    @property
+    def indexed(self) -> bool:
+        return self.articles is not None
+
+    def load(self):
+        """マニフェストを読み込む（無い・壊れている場合はディレクトリを走査する従来の動作）"""
+        if not self.manifest_path.exists():
+            self.layout, self.articles = 'flat', None
+            return
+        try:
+            data = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+            self.layout = data.get('layout', 'flat')
+            self.articles = data.get('articles', {})
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: マニフェストを読み込めません ({self.manifest_path.name}): {e}")
+            self.layout, self.articles = 'flat', None
+
+    def save(self):
+        """マニフェストをアトミックに保存"""
+        data = {'version': 1, 'layout': self.layout, 'articles': self.articles or {}}
+        _atomic_write_text(self.manifest_path,
+                           json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True) + '\n')
+
+    def article_paths(self) -> List[Path]:
+        """記事ファイルの一覧（マニフェストがあれば走査しない）"""
+        if self.articles is None:
+            return sorted(self.articles_dir.glob('*.md')) if self.articles_dir.exists() else []
+        return [self.articles_dir / entry['path']
+                for entry in sorted(self.articles.values(), key=lambda e: e['path'])]
+
+    def resolve(self, article_id: str) -> Optional[Path]:
+        """記事IDからファイルパス（マニフェストに無ければ None）"""
+        entry = (self.articles or {}).get(article_id)
+        return self.articles_dir / entry['path'] if entry else None
+
+    def shard(self, author: Optional[str], published) -> str:
+        year, month = _month_parts(published)
+        return f"{_author_key(author)}/{year}/{month}"
+
+    def article_relpath(self, filename: str, author: Optional[str], published,
+                        layout: Optional[str] = None) -> str:
+        """記事ファイルの articles/ からの相対パス"""
+        if (layout or self.layout) == 'sharded':
+            return f"{self.shard(author, published)}/{filename}"
+        return filename
+
+    def image_relpath(self, article_id: str, author: Optional[str], published,
+                      layout: Optional[str] = None) -> str:
+        """記事の画像ディレクトリの images/ からの相対パス"""
+        if (layout or self.layout) == 'sharded':
+            return f"{self.shard(author, published)}/{article_id}"
+        return article_id
+
+    @staticmethod
+    def link_prefix(article_relpath: str) -> str:
+        """記事ファイルから images/ への相対リンク（flat なら ../images）"""
+        depth = len(PurePosixPath(article_relpath).parts)
+        return '../' * depth + 'images'
+
+    def register(self, article_id: str, article_relpath: str, image_relpath: str,
+                 author: Optional[str], published):
+        """記事の配置をマニフェストに記録（マニフェストが無い flat 配置では何もしない）"""
+        if self.articles is None:
+            return
+        year, month = _month_parts(published)
+        self.articles[article_id] = {
+            'path': article_relpath,
+            'images': image_relpath,
+            'author': _author_key(author),
+            'month': f"{year}-{month}",
+        }
+
+    def rebuild(self, default_author: str = UNKNOWN_AUTHOR) -> int:
+        """articles/ 以下を走査してマニフェストを作り直す（登録件数を返す）"""
+        articles = {}
+        for filepath in sorted(self.articles_dir.rglob('*.md')):
+            meta = read_frontmatter(filepath)
+            article_id = meta.get('article_id')
+            if not article_id:
+                continue
+            author = author_of(meta, default_author)
+            published = meta.get('publish_datetime') or meta.get('publish_date')
+            relpath = filepath.relative_to(self.articles_dir).as_posix()
+            image_rel = self.image_relpath(article_id, author, published,
+                                           layout='sharded' if '/' in relpath else 'flat')
+            year, month = _month_parts(published)
+            articles[article_id] = {'path': relpath, 'images': image_rel,
+                                    'author': _author_key(author), 'month': f"{year}-{month}"}
+        self.articles = articles
+        self.layout = 'sharded' if any('/' in e['path'] for e in articles.values()) else 'flat'
+        self.save()
+        return len(articles)
+
+    def migrate(self, target: str, default_author: str = UNKNOWN_AUTHOR,
+                dry_run: bool = False) -> Dict[str, int]:
+        """記事・画像を target の配置に移動し、リンク・取得状態・マニフェストを書き換える
+
+        記事ごとに 画像ディレクトリの移動 → 記事の書き換え（新しい場所にアトミックに書いて
+        古いファイルを削除）の順で行うため、中断しても再実行すれば続きから揃う。
+        """
+        if target not in LAYOUTS:
+            raise ValueError(f"不明な配置: {target}")
+        # revision_store は corpus_layout を使うため、ここで読み込む
+        from revision_store import RevisionStore
+
+        stats = {'articles': 0, 'moved': 0, 'image_dirs': 0, 'links': 0}
+        state_path = self.articles_dir / FETCH_STATE_FILENAME
+        history = RevisionStore(self.articles_dir.parent / 'history', self.articles_dir)
+
+        with state_lock(self.articles_dir):
+            state = {}
+            if state_path.exists():
+                state = json.loads(state_path.read_text(encoding='utf-8'))
+            state_articles = state.get('articles', {})
+            articles = {}
+
+            # 中断後の再実行でも両方の配置のファイルを拾えるよう、移行時だけは走査する
+            for filepath in sorted(self.articles_dir.rglob('*.md')):
+                meta = read_frontmatter(filepath)
+                article_id = meta.get('article_id')
+                if not article_id:
+                    continue
+                stats['articles'] += 1
+                author = author_of(meta, default_author)
+                published = meta.get('publish_datetime') or meta.get('publish_date')
+                old_rel = filepath.relative_to(self.articles_dir).as_posix()
+                new_rel = self.article_relpath(filepath.name, author, published, layout=target)
+                old_images = self.image_relpath(article_id, author, published,
+                                                layout='sharded' if target == 'flat' else 'flat')
+                new_images = self.image_relpath(article_id, author, published, layout=target)
+                year, month = _month_parts(published)
+                articles[article_id] = {'path': new_rel, 'images': new_images,
+                                        'author': _author_key(author), 'month': f"{year}-{month}"}
+                if old_rel == new_rel:
+                    continue
+
+                stats['moved'] += 1
+                old_link = f"{self.link_prefix(old_rel)}/{old_images}/"
+                new_link = f"{self.link_prefix(new_rel)}/{new_images}/"
+                if dry_run:
+                    print(f"  {old_rel} → {new_rel}")
+                    continue
+
+                src_dir, dst_dir = self.image_dir / old_images, self.image_dir / new_images
+                if src_dir.is_dir() and not dst_dir.exists():
+                    dst_dir.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(src_dir, dst_dir)
+                    stats['image_dirs'] += 1
+
+                text = filepath.read_text(encoding='utf-8')
+                stats['links'] += text.count(old_link)
+                new_text = text.replace(old_link, new_link)
+                _atomic_write_text(self.articles_dir / new_rel, new_text)
+                history.amend(article_id, text, new_text, path=new_rel)
+                filepath.unlink()
+
+                entry = state_articles.get(article_id)
+                if entry:
+                    entry['filename'] = new_rel
+                    entry['images'] = {url: path.replace(old_link, new_link)
+                                       for url, path in entry.get('images', {}).items()}
+
+            if dry_run:
+                return stats
+            if state_articles:
+                _atomic_write_text(state_path, json.dumps(state, ensure_ascii=False, indent=2,
+                                                          sort_keys=True) + '\n')
+            self.layout = target
+            self.articles = articles
+            self.save()
+            self._remove_empty_dirs(self.articles_dir)
+            if self.image_dir.exists():
+                self._remove_empty_dirs(self.image_dir)
+        return stats
+
+    @staticmethod
+    def _remove_empty_dirs(root: Path):
+        for dirpath, _, _ in os.walk(root, topdown=False):
+            # 子ディレクトリを先に消しているため、その場で中身を確認する
+            if Path(dirpath) != root and not os.listdir(dirpath):
+                try:
+                    os.rmdir(dirpath)
+                except OSError:
+                    pass
+
+
+def read_frontmatter(filepath: Path) -> Dict:
+    """フロントマターだけを読む（本文全体は読まない）"""
+    lines = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        if f.readline().rstrip('\n') != '---':
+            return {}
+        for line in f:
+            if line.rstrip('\n') == '---':
+                break
+            lines.append(line)
+    try:
+        import yaml
+        return yaml.safe_load(''.join(lines)) or {}
+    except ImportError:
+        meta = {}
+        for line in lines:
+            m = re.match(r'^(\w+):\s*(.*)$', line)
+            if m:
+                meta[m.group(1)] = m.group(2).strip().strip("'\"")
+        return meta
+    except Exception:
+        return {}
+
+
+def author_of(meta: Dict, default: str = UNKNOWN_AUTHOR) -> str:
+    """フロントマターから著者のキー（original_url のユーザー名）を得る"""
+    parts = urlparse(str(meta.get('original_url') or '')).path.strip('/').split('/')
+    return parts[0] if parts and parts[0] else default
+
+
+def list_articles(articles_dir: Path) -> List[Path]:
+    """記事ファイルの一覧（マニフェストがあれば走査せず、無ければ articles/*.md）"""
+    return CorpusLayout(articles_dir).article_paths()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='記事・画像ディレクトリの配置を管理')
+    script_dir = Path(__file__).parent.parent
+    parser.add_argument('command', choices=['migrate', 'rebuild', 'status'])
+    parser.add_argument('--layout', choices=LAYOUTS, default='sharded', help='migrate: 移行先の配置')
+    parser.add_argument('--articles-dir', type=Path, default=script_dir / 'corpus' / 'articles',
+                        help='記事ディレクトリ (デフォルト: corpus/articles)')
+    parser.add_argument('--image-dir', type=Path, default=None,
+                        help='画像ディレクトリ (デフォルト: 記事ディレクトリと同じ階層の images)')
+    parser.add_argument('--author', default=UNKNOWN_AUTHOR,
+                        help='original_url から著者を判定できない記事の著者名')
+    parser.add_argument('--dry-run', action='store_true', help='migrate: 移動内容を表示するだけ')
+    args = parser.parse_args()
+
+    layout = CorpusLayout(args.articles_dir, args.image_dir)
+    if args.command == 'migrate':
+        print(f"配置を移行: {layout.layout} → {args.layout}{'（ドライラン）' if args.dry_run else ''}")
+        stats = layout.migrate(args.layout, args.author, dry_run=args.dry_run)
+        print(f"記事 {stats['articles']}件 / 移動 {stats['moved']}件 / 画像ディレクトリ {stats['image_dirs']}件 / "
+              f"リンク書き換え {stats['links']}箇所")
+    elif args.command == 'rebuild':
+        count = layout.rebuild(args.author)
+        print(f"マニフェストを再作成しました: {count}記事 ({layout.layout})")
+    else:
+        if layout.indexed:
+            authors = sorted({e['author'] for e in layout.articles.values()})
+            print(f"配置: {layout.layout} / マニフェスト: {len(layout.articles)}記事 / 著者: {', '.join(authors)}")
+        else:
+            print(f"配置: flat（マニフェストなし） / {len(layout.article_paths())}記事")
+
+
+if __name__ == "__main__":
+    main()
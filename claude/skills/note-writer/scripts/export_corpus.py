@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+export_corpus.py - corpus/articles を列指向データセットとして書き出す
+
+使用方法:
+    python3 export_corpus.py [--output-dir corpus/export] [--paragraphs] [--format auto|parquet|jsonl]
+
+出力:
+    <output-dir>/articles/publish_month=YYYY-MM/data.parquet（または data.jsonl）
+    <output-dir>/paragraphs/publish_month=YYYY-MM/data.parquet（--paragraphs 指定時）
+
+    Hive 形式のパーティションなので、DuckDB なら
+        SELECT * FROM read_parquet('corpus/export/articles/*/*.parquet', hive_partitioning=1)
+    pandas なら pd.read_parquet('corpus/export/articles') でそのまま読める。
+
+    記事は1件ずつ読み込んで一定件数ごとに書き出すため、メモリ使用量は記事数に
+    依存しない。前回から追加・変更・削除された記事を含むパーティションだけを
+    書き直す。
+
+依存パッケージ:
+    pip install pyyaml
+    pip install pyarrow  # 任意: Parquet 出力（無い場合は JSONL）
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import yaml
+
+from corpus_layout import list_articles
+
+# オプション: Parquet 出力用
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+STATE_FILENAME = '.export_state.json'
+STATE_VERSION = 1
+BATCH_SIZE = 64
+
+ARTICLE_FIELDS = [
+    ('article_id', 'string'),
+    ('day_number', 'int'),
+    ('title', 'string'),
+    ('author', 'string'),
+    ('publish_date', 'string'),
+    ('publish_datetime', 'string'),
+    ('date_modified', 'string'),
+    ('original_url', 'string'),
+    ('status', 'string'),
+    ('category', 'string'),
+    ('tags', 'list'),
+    ('source_file', 'string'),
+    ('body', 'string'),
+    ('char_count', 'int'),
+    ('headings', 'list'),
+    ('image_count', 'int'),
+    ('paragraph_count', 'int'),
+]
+
+PARAGRAPH_FIELDS = [
+    ('article_id', 'string'),
+    ('day_number', 'int'),
+    ('paragraph_index', 'int'),
+    ('heading', 'string'),
+    ('text', 'string'),
+    ('char_count', 'int'),
+]
+
+IMAGE_RE = re.compile(r'!\[[^\]]*\]\([^)]+\)|<img\s', re.IGNORECASE)
+HEADING_RE = re.compile(r'^(#{2,6})\s+(.+?)\s*$', re.MULTILINE)
+
+
+def _arrow_schema(fields: List[Tuple[str, str]]):
+    types = {'string': pa.string(), 'int': pa.int64(), 'list': pa.list_(pa.string())}
+    return pa.schema([(name, types[kind]) for name, kind in fields])
+
+
+def read_article(filepath: Path) -> Tuple[Dict, str]:
+    """frontmatter と本文を読み込む"""
+    content = filepath.read_text(encoding='utf-8')
+    meta: Dict = {}
+    match = re.match(r'^---\n(.*?)\n---\n?', content, re.DOTALL)
+    if match:
+        meta = yaml.safe_load(match.group(1)) or {}
+        content = content[match.end():]
+    return meta, content.strip()
+
+
+def partition_of(meta: Dict) -> str:
+    """公開月をパーティションキーにする"""
+    publish_date = str(meta.get('publish_date') or '')
+    if re.match(r'^\d{4}-\d{2}', publish_date):
+        return publish_date[:7]
+    return 'unknown'
+
+
+def split_paragraphs(body: str) -> Iterator[Tuple[Optional[str], str]]:
+    """見出しを除いた段落を (直前の見出し, 段落) で返す"""
+    heading = None
+    for block in re.split(r'\n\s*\n', body):
+        block = block.strip()
+        if not block:
+            continue
+        m = re.match(r'^#{1,6}\s+(.+)$', block)
+        if m and '\n' not in block:
+            heading = m.group(1).strip()
+            continue
+        yield heading, block
+
+
+def article_row(filepath: Path, meta: Dict, body: str) -> Dict:
+    """記事1件分の行を作る"""
+    tags = meta.get('tags') or []
+    paragraphs = sum(1 for _ in split_paragraphs(body))
+    row = {
+        'article_id': str(meta.get('article_id') or filepath.stem),
+        'day_number': meta.get('day_number'),
+        'title': meta.get('title'),
+        'author': meta.get('author'),
+        'publish_date': meta.get('publish_date'),
+        'publish_datetime': meta.get('publish_datetime'),
+        'date_modified': meta.get('date_modified'),
+        'original_url': meta.get('original_url'),
+        'status': meta.get('status'),
+        'category': meta.get('category'),
+        'tags': [str(t) for t in (tags if isinstance(tags, list) else [tags])],
+        'source_file': filepath.name,
+        'body': body,
+        'char_count': len(body),
+        'headings': [m.group(2) for m in HEADING_RE.finditer(body)],
+        'image_count': len(IMAGE_RE.findall(body)),
+        'paragraph_count': paragraphs,
+    }
+    for name, kind in ARTICLE_FIELDS:
+        if kind == 'string' and row[name] is not None:
+            row[name] = str(row[name])
+    return row
+
+
+def paragraph_rows(row: Dict) -> Iterator[Dict]:
+    """記事の段落テーブル用の行を作る"""
+    for idx, (heading, text) in enumerate(split_paragraphs(row['body'])):
+        yield {
+            'article_id': row['article_id'],
+            'day_number': row['day_number'],
+            'paragraph_index': idx,
+            'heading': heading,
+            'text': text,
+            'char_count': len(text),
+        }
+
+
+class PartitionWriter:
+    """1パーティション分のファイルへバッチ単位で書き込む"""
+
+    def __init__(self, path: Path, fields: List[Tuple[str, str]], fmt: str):
+        self.path = path
+        self.fields = fields
+        self.format = fmt
+        self.batch: List[Dict] = []
+        self.rows = 0
+        self.tmp_path = path.with_name(f".{path.name}.tmp")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if fmt == 'parquet':
+            self.schema = _arrow_schema(fields)
+            self.writer = pq.ParquetWriter(str(self.tmp_path), self.schema, compression='zstd')
+        else:
+            self.writer = open(self.tmp_path, 'w', encoding='utf-8')
+
+    def write(self, row: Dict):
+        self.batch.append(row)
+        if len(self.batch) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        if self.format == 'parquet':
+            columns = {name: [r[name] for r in self.batch] for name, _ in self.fields}
+            self.writer.write_table(pa.Table.from_pydict(columns, schema=self.schema))
+        else:
+            for r in self.batch:
+                self.writer.write(json.dumps(r, ensure_ascii=False) + '\n')
+        self.rows += len(self.batch)
+        self.batch = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+
+
+class CorpusExporter:
+    """記事コーパスをパーティション単位で差分エクスポートするクラス"""
+
+    def __init__(self, articles_dir: Path, output_dir: Path, fmt: str = 'auto',
+                 include_paragraphs: bool = False):
+        self.articles_dir = Path(articles_dir)
+        self.output_dir = Path(output_dir)
+        if fmt == 'auto':
+            fmt = 'parquet' if PYARROW_AVAILABLE else 'jsonl'
+        if fmt == 'parquet' and not PYARROW_AVAILABLE:
+            raise RuntimeError("pyarrow がインストールされていません (pip install pyarrow)")
+        self.format = fmt
+        self.include_paragraphs = include_paragraphs
+        self.state_path = self.output_dir / STATE_FILENAME
+
+    @property
+    def extension(self) -> str:
+        return '.parquet' if self.format == 'parquet' else '.jsonl'
+
+    def load_state(self) -> Dict:
+        if not self.state_path.exists():
+            return {}
+        try:
+            state = json.loads(self.state_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+        # 出力形式や段落テーブルの有無が変わった場合は全体を書き直す
+        if (state.get('version') != STATE_VERSION or state.get('format') != self.format
+                or state.get('paragraphs') != self.include_paragraphs):
+            return {}
+        return state
+
+    def save_state(self, files: Dict[str, Dict]):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        data = {'version': STATE_VERSION, 'format': self.format,
+                'paragraphs': self.include_paragraphs, 'files': files}
+        tmp_path = self.state_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp_path, self.state_path)
+
+    def scan(self, previous: Dict[str, Dict]) -> Tuple[Dict[str, Dict], set]:
+        """記事ファイルを走査し、書き直しが必要なパーティションを求める"""
+        files: Dict[str, Dict] = {}
+        dirty = set()
+        for filepath in list_articles(self.articles_dir):
+            st = filepath.stat()
+            # articles/ からの相対パス（flat 配置ではファイル名そのもの）
+            name = filepath.relative_to(self.articles_dir).as_posix()
+            prev = previous.get(name)
+            if prev and prev['mtime_ns'] == st.st_mtime_ns and prev['size'] == st.st_size:
+                files[name] = prev
+                continue
+            meta, _ = read_article(filepath)
+            partition = partition_of(meta)
+            files[name] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'partition': partition}
+            dirty.add(partition)
+            if prev:
+                dirty.add(prev['partition'])
+
+        for name, prev in previous.items():
+            if name not in files:
+                dirty.add(prev['partition'])
+        return files, dirty
+
+    def _partition_path(self, table: str, partition: str) -> Path:
+        return self.output_dir / table / f"publish_month={partition}" / f"data{self.extension}"
+
+    def write_partition(self, partition: str, filenames: List[str]) -> int:
+        """1パーティションを記事1件ずつ読み込みながら書き直す"""
+        if not filenames:
+            for table in ('articles', 'paragraphs'):
+                shutil.rmtree(self._partition_path(table, partition).parent, ignore_errors=True)
+            return 0
+
+        article_writer = PartitionWriter(self._partition_path('articles', partition),
+                                         ARTICLE_FIELDS, self.format)
+        paragraph_writer = (PartitionWriter(self._partition_path('paragraphs', partition),
+                                            PARAGRAPH_FIELDS, self.format)
+                            if self.include_paragraphs else None)
+        for name in sorted(filenames):
+            filepath = self.articles_dir / name
+            meta, body = read_article(filepath)
+            row = article_row(filepath, meta, body)
+            article_writer.write(row)
+            if paragraph_writer:
+                for p_row in paragraph_rows(row):
+                    paragraph_writer.write(p_row)
+        article_writer.close()
+        if paragraph_writer:
+            paragraph_writer.close()
+        return article_writer.rows
+
+    def run(self) -> Dict:
+        """差分エクスポートを実行"""
+        previous = self.load_state()
+        if not previous:
+            # 形式が変わった・初回は古い出力を消して全件書き出す
+            for table in ('articles', 'paragraphs'):
+                shutil.rmtree(self.output_dir / table, ignore_errors=True)
+        files, dirty = self.scan(previous.get('files', {}))
+
+        by_partition: Dict[str, List[str]] = {}
+        for name, info in files.items():
+            by_partition.setdefault(info['partition'], []).append(name)
+
+        rows = 0
+        for partition in sorted(dirty):
+            rows += self.write_partition(partition, by_partition.get(partition, []))
+
+        self.save_state(files)
+        return {
+            'format': self.format,
+            'articles': len(files),
+            'partitions': len(by_partition),
+            'rewritten_partitions': sorted(dirty),
+            'rewritten_rows': rows,
+        }
+
+
+def main():
+    script_dir = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description='corpus/articles を列指向データセットとして書き出す')
+    parser.add_argument('--articles-dir', type=Path, default=script_dir / 'corpus' / 'articles',
+                        help='記事ディレクトリ (デフォルト: corpus/articles)')
+    parser.add_argument('--output-dir', type=Path, default=script_dir / 'corpus' / 'export',
+                        help='出力先 (デフォルト: corpus/export)')
+    parser.add_argument('--format', choices=['auto', 'parquet', 'jsonl'], default='auto',
+                        help='出力形式 (デフォルト: auto = pyarrow があれば parquet)')
+    parser.add_argument('--paragraphs', action='store_true', help='段落単位のテーブルも出力')
+    args = parser.parse_args()
+
+    exporter = CorpusExporter(args.articles_dir, args.output_dir, args.format, args.paragraphs)
+    result = exporter.run()
+    print(f"Exported {result['articles']} articles ({result['format']}) to {args.output_dir}")
+    if result['rewritten_partitions']:
+        print(f"  Rewritten partitions: {', '.join(result['rewritten_partitions'])} ({result['rewritten_rows']} rows)")
+    else:
+        print("  No changes since last export")
+
+
+if __name__ == "__main__":
+    main()
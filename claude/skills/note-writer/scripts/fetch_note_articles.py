@@ -7,23 +7,47 @@ note.comアカウントから全記事を取得し、Markdown形式に変換し
 """
 
 import argparse
+import contextlib
+import hashlib
 import json
 import logging
+import os
+import queue
+import random
 import re
+import signal
+import sys
+import tempfile
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from urllib.parse import urljoin, urlparse
 
 import requests
 from bs4 import BeautifulSoup
+from lxml import etree
 import html2text
 from slugify import slugify
 import yaml
 from dateutil import parser as date_parser
 
+import profiling
+from corpus_layout import LAYOUTS, CorpusLayout, read_frontmatter, state_lock
+from http_transport import BoundedResponse, HTTPTransport, ResponseTooLarge, TransportConfig
+from page_archive import PageArchive
+from revision_store import RevisionStore
+
+# オプション: ピークRSSの取得（/proc が無い環境用）
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
 
 # ログ設定
 logging.basicConfig(
@@ -56,12 +80,427 @@ class ArticleDetail(Article):
     date_modified: Optional[str] = None  # ISO 8601形式の更新日時
 
 
+def atomic_write_bytes(filepath: Path, data: bytes):
+    """一時ファイルに書き込んでから置き換える（途中で中断しても壊れたファイルを残さない）"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_text(filepath: Path, text: str):
+    """テキストをUTF-8でアトミックに書き込む"""
+    atomic_write_bytes(filepath, text.encode('utf-8'))
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """プロセスのピークRSS（バイト）"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    if RESOURCE_AVAILABLE:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS はバイト、Linux はKB
+        return peak if sys.platform == 'darwin' else peak * 1024
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """ピークRSSをリセットする（Linux のみ。記事ごとのピークを測るため）"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class FetchStateStore:
+    """取得状態のサイドカーファイル管理
+
+    fetched_at などの揮発的なタイムスタンプと、記事内容のハッシュ・画像の
+    URL→ローカルパス対応を Markdown 本体とは別の JSON に保持する。
+    """
+
+    FILENAME = '.fetch_state.json'
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self.path = output_dir / self.FILENAME
+        self.articles: Dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        """サイドカーファイルを読み込む（無い・壊れている場合は空で開始）"""
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            self.articles = data.get('articles', {})
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"取得状態ファイルを読み込めません ({self.path.name}): {e}")
+            self.articles = {}
+
+    def save(self):
+        """サイドカーファイルをアトミックに保存"""
+        data = {'version': 1, 'articles': self.articles}
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True) + '\n')
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """ロックを取って読み直し、ブロック内の変更を保存する"""
+        with state_lock(self.output_dir):
+            self.load()
+            yield self
+            self.save()
+
+    def get(self, article_id: str) -> dict:
+        """記事の取得状態を返す（未記録なら空dict）"""
+        return self.articles.get(article_id, {})
+
+    def is_unchanged(self, article_id: str, content_hash: str, filepath: Path) -> bool:
+        """前回保存時とハッシュが一致し、画像もすべて取得済みで、ファイルも残っているか"""
+        state = self.get(article_id)
+        return (state.get('content_hash') == content_hash and self.images_complete(article_id)
+                and filepath.exists())
+
+    def record(self, article_id: str, content_hash: str, filename: str,
+               fetched_at: datetime, image_map: Optional[Dict[str, str]] = None,
+               images_complete: bool = True):
+        """保存した記事の状態を記録
+
+        images_complete=False（ローカルに置けなかった画像がある）の記事は、
+        ハッシュが一致しても次回スキップしない。
+        """
+        state = self.articles.setdefault(article_id, {})
+        state.setdefault('created', fetched_at.strftime('%Y-%m-%d'))
+        state['content_hash'] = content_hash
+        if images_complete:
+            state.pop('images_complete', None)
+        else:
+            state['images_complete'] = False
+        state['filename'] = filename
+        state['fetched_at'] = fetched_at.isoformat()
+        state['verified_at'] = fetched_at.isoformat()
+        if image_map is not None:
+            state['images'] = image_map
+
+    def record_rebuild(self, article_id: str, content_hash: str, filename: str):
+        """アーカイブから作り直した記事のハッシュだけを更新（取得日時は変えない）"""
+        state = self.articles.setdefault(article_id, {})
+        state['content_hash'] = content_hash
+        state['filename'] = filename
+
+    def mark_verified(self, article_id: str, verified_at: datetime):
+        """変更なしを確認した時刻だけを更新"""
+        self.articles.setdefault(article_id, {})['verified_at'] = verified_at.isoformat()
+
+    def merge_images(self, article_id: str, image_map: Dict[str, str]):
+        """後からダウンロードした画像の URL→ローカルパスを追加"""
+        state = self.articles.setdefault(article_id, {})
+        state['images'] = {**state.get('images', {}), **image_map}
+
+    def mark_images_complete(self, article_id: str):
+        """画像キューを処理し終えた記事を、次回から内容ハッシュでスキップできるようにする"""
+        self.articles.setdefault(article_id, {}).pop('images_complete', None)
+
+    def images_complete(self, article_id: str) -> bool:
+        """前回保存時に画像がすべてローカルに揃っていたか"""
+        return self.get(article_id).get('images_complete', True)
+
+
+class ImageQueue:
+    """--images deferred で後回しにした画像の待ち行列
+
+    記事ごとに未取得の画像URLを articles/.pending_images.json に保持する。
+    --drain-images（または常駐モードのポーリング後）が取り出してダウンロードし、
+    記事ファイル内のリンクをローカルパスに書き換える。
+    """
+
+    FILENAME = '.pending_images.json'
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self.path = output_dir / self.FILENAME
+        self.articles: Dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        """キューを読み込む（無い・壊れている場合は空で開始）"""
+        if not self.path.exists():
+            self.articles = {}
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            self.articles = data.get('articles', {})
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"画像キューを読み込めません ({self.path.name}): {e}")
+            self.articles = {}
+
+    def save(self):
+        """キューをアトミックに保存（空になったらファイルを削除）"""
+        if not self.articles:
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+            return
+        data = {'version': 1, 'articles': self.articles}
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True) + '\n')
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """ロックを取って読み直し、ブロック内の変更を保存する"""
+        with state_lock(self.output_dir):
+            self.load()
+            yield self
+            self.save()
+
+    def enqueue(self, article_id: str, filename: str, urls: List[str], queued_at: datetime):
+        """記事の未取得画像を登録（前回の登録は置き換える）"""
+        if not urls:
+            self.articles.pop(article_id, None)
+            return
+        self.articles[article_id] = {
+            'filename': filename,
+            'urls': list(urls),
+            'queued_at': queued_at.isoformat(),
+            'attempts': 0,
+        }
+
+    def complete(self, article_id: str, done_urls: List[str], attempted: bool) -> List[str]:
+        """取得できた画像をキューから除き、残りの URL を返す
+
+        attempted が True（中断されずに全画像を試した）の場合は試行回数を数え、
+        MAX_ATTEMPTS 回失敗した画像は諦めてリモートURLのまま残す。
+        """
+        entry = self.articles.get(article_id)
+        if entry is None:
+            return []
+        remaining = [url for url in entry['urls'] if url not in done_urls]
+        if remaining and attempted:
+            entry['attempts'] = entry.get('attempts', 0) + 1
+            if entry['attempts'] >= self.MAX_ATTEMPTS:
+                logger.warning(f"  ✗ {len(remaining)}枚の画像を{self.MAX_ATTEMPTS}回取得できなかったため"
+                               f"リモートURLのままにします ({article_id})")
+                remaining = []
+        if remaining:
+            entry['urls'] = remaining
+        else:
+            del self.articles[article_id]
+        return remaining
+
+    def pending_images(self) -> int:
+        return sum(len(entry['urls']) for entry in self.articles.values())
+
+
+class FetchScheduler:
+    """記事の処理順の優先度付けと時間予算（--deadline）の管理
+
+    新規記事 → 前回時間切れで残った記事 → 更新された記事（dateModified の新しい順）
+    → 更新確認のための再取得（最後に確認した日時が古い順）の順に処理する。
+    時間切れで処理できなかった記事は articles/.fetch_remaining.json に記録し、
+    次回はそこから優先して処理する。
+    """
+
+    FILENAME = '.fetch_remaining.json'
+    # 記事1件の所要時間の初期見積もり（秒）。実測が取れたらその平均を使う
+    DEFAULT_ARTICLE_SECONDS = 5.0
+    # 既存記事の更新確認に使うのは予算のこの割合まで（残りは本文の取得に回す）
+    PROBE_BUDGET_RATIO = 0.5
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self.path = output_dir / self.FILENAME
+        self.articles: Dict[str, dict] = {}
+        self.deadline: Optional[float] = None
+        self.started = time.monotonic()
+        self.durations: List[float] = []
+        self.load()
+
+    def load(self):
+        """残りの記録を読み込む（無い・壊れている場合は空で開始）"""
+        if not self.path.exists():
+            self.articles = {}
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            self.articles = data.get('articles', {})
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"残りの記録を読み込めません ({self.path.name}): {e}")
+            self.articles = {}
+
+    def save(self):
+        """アトミックに保存（残りが無くなったらファイルを削除）"""
+        if not self.articles:
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+            return
+        data = {'version': 1, 'articles': self.articles}
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True) + '\n')
+
+    def start(self, deadline: Optional[float] = None):
+        """時間予算の計測を始める（deadline は秒。None なら無制限）"""
+        self.deadline = deadline
+        self.started = time.monotonic()
+        self.durations = []
+
+    def time_left(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - (time.monotonic() - self.started)
+
+    def can_probe(self) -> bool:
+        """既存記事の更新確認をまだ続けてよいか"""
+        if self.deadline is None:
+            return True
+        return time.monotonic() - self.started < self.deadline * self.PROBE_BUDGET_RATIO
+
+    def can_start_article(self) -> bool:
+        """次の記事を予算内に処理し終えられる見込みがあるか"""
+        left = self.time_left()
+        if left is None:
+            return True
+        estimate = (sum(self.durations) / len(self.durations) if self.durations
+                    else self.DEFAULT_ARTICLE_SECONDS)
+        return left >= estimate
+
+    def observe(self, seconds: float):
+        """記事1件の所要時間を記録（以降の見積もりに使う）"""
+        self.durations.append(seconds)
+
+    @staticmethod
+    def _timestamp(value) -> float:
+        if not value:
+            return 0.0
+        try:
+            return date_parser.parse(value).timestamp()
+        except (ValueError, OverflowError):
+            return 0.0
+
+    def probe_order(self, articles: List[Article], local_articles: Dict[str, dict],
+                    state: FetchStateStore) -> List[Article]:
+        """メタデータを確認する順（新規 → 前回の残り → 最後の確認が古い順）"""
+        def priority(article: Article):
+            if article.id not in local_articles:
+                return (0, 0.0)
+            if article.id in self.articles:
+                return (1, 0.0)
+            return (2, self._timestamp(state.get(article.id).get('verified_at')))
+        return sorted(articles, key=priority)
+
+    def order(self, entries: List[dict], state: FetchStateStore) -> List[dict]:
+        """計画の記事を処理する順に並べる（スキップは時間がかからないので先頭）"""
+        def priority(entry: dict):
+            article_id = entry['article']['id']
+            if entry['action'] == 'skip':
+                return (0, 0.0)
+            if entry['action'] == 'new':
+                return (1, -self._timestamp(entry['article']['publish_at']))
+            if article_id in self.articles:
+                return (2, 0.0)
+            if entry['reason'] == 'date-modified-changed':
+                return (3, -self._timestamp(entry['date_modified']))
+            return (4, self._timestamp(state.get(article_id).get('verified_at')))
+        return sorted(entries, key=priority)
+
+    def record(self, remaining: List[dict], finished: List[str], recorded_at: datetime):
+        """処理できなかった記事を記録し、処理を終えた記事を記録から外す"""
+        with state_lock(self.output_dir):
+            self.load()
+            for article_id in finished:
+                self.articles.pop(article_id, None)
+            for entry in remaining:
+                self.articles[entry['article']['id']] = {
+                    'action': entry['action'],
+                    'reason': entry['reason'],
+                    'day_number': entry['day_number'],
+                    'recorded_at': recorded_at.isoformat(),
+                }
+            self.save()
+
+
 class ArticleParser:
     """HTML解析とデータ抽出"""
 
+    # DOMを組み立てずに <script> ブロックだけを切り出す高速パス用
+    JSON_LD_RE = re.compile(
+        rb'<script\b[^>]*\btype\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script\s*>',
+        re.IGNORECASE | re.DOTALL
+    )
+    NEXT_DATA_RE = re.compile(
+        rb'<script\b[^>]*\bid\s*=\s*["\']__NEXT_DATA__["\'][^>]*>(.*?)</script\s*>',
+        re.IGNORECASE | re.DOTALL
+    )
+
+    @staticmethod
+    def _to_bytes(html) -> bytes:
+        return html if isinstance(html, bytes) else html.encode('utf-8')
+
     @staticmethod
-    def extract_json_ld(html: str) -> dict:
-        """JSON-LDスキーマデータを抽出"""
+    def _select_blog_posting(data) -> Optional[dict]:
+        """JSON-LDデータからBlogPostingを選ぶ"""
+        if isinstance(data, dict):
+            # @graphがある場合（Schema.org構造）
+            if '@graph' in data:
+                for item in data['@graph']:
+                    if isinstance(item, dict) and item.get('@type') == 'BlogPosting':
+                        return item
+            # 直接BlogPostingの場合
+            elif data.get('@type') == 'BlogPosting':
+                return data
+        elif isinstance(data, list):
+            for item in data:
+                if isinstance(item, dict) and item.get('@type') == 'BlogPosting':
+                    return item
+        return None
+
+    @staticmethod
+    def extract_json_ld(html) -> dict:
+        """JSON-LDスキーマデータを抽出
+
+        まず生のHTML（str / bytes）から正規表現で script ブロックを切り出し、
+        見つからない・解析できない場合のみ BeautifulSoup で探す。
+        """
+        blocks = ArticleParser.JSON_LD_RE.findall(ArticleParser._to_bytes(html))
+        parsed_any = False
+        for block in blocks:
+            if not block.strip():
+                continue
+            try:
+                data = json.loads(block.decode('utf-8'))
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                logger.debug(f"JSON-LD parse error (fast path): {e}")
+                continue
+            parsed_any = True
+            item = ArticleParser._select_blog_posting(data)
+            if item is not None:
+                return item
+
+        if parsed_any:
+            return {}
+        return ArticleParser.extract_json_ld_dom(html)
+
+    @staticmethod
+    def extract_json_ld_dom(html) -> dict:
+        """JSON-LDスキーマデータを抽出（BeautifulSoupによるフォールバック）"""
         soup = BeautifulSoup(html, 'lxml')
         scripts = soup.find_all('script', {'type': 'application/ld+json'})
 
@@ -70,19 +509,9 @@ class ArticleParser:
                 continue
             try:
                 data = json.loads(script.string)
-                if isinstance(data, dict):
-                    # @graphがある場合（Schema.org構造）
-                    if '@graph' in data:
-                        for item in data['@graph']:
-                            if isinstance(item, dict) and item.get('@type') == 'BlogPosting':
-                                return item
-                    # 直接BlogPostingの場合
-                    elif data.get('@type') == 'BlogPosting':
-                        return data
-                elif isinstance(data, list):
-                    for item in data:
-                        if isinstance(item, dict) and item.get('@type') == 'BlogPosting':
-                            return item
+                item = ArticleParser._select_blog_posting(data)
+                if item is not None:
+                    return item
             except json.JSONDecodeError as e:
                 logger.debug(f"JSON-LD parse error: {e}")
                 continue
@@ -90,16 +519,20 @@ class ArticleParser:
         return {}
 
     @staticmethod
-    def extract_article_list_from_profile(html: str) -> List[dict]:
-        """プロフィールページから記事リストを抽出"""
-        soup = BeautifulSoup(html, 'lxml')
+    def extract_article_list_from_profile(html) -> List[dict]:
+        """プロフィールページから記事リストを抽出
+
+        noteKeys と __NEXT_DATA__ は生のHTMLから直接探し、どちらも無い場合のみ
+        DOMを組み立ててリンクを走査する。
+        """
+        raw = ArticleParser._to_bytes(html)
         articles = []
 
         # initialLatestNoteDataからnoteKeysを抽出（優先：確実に取得できる）
         # パターン: initialLatestNoteData\":{\"noteKeys\":[\"na3f6f4e2138e\",...]
-        match = re.search(r'initialLatestNoteData\\":\{\\"noteKeys\\":\[([^\]]+)\]', html)
+        match = re.search(rb'initialLatestNoteData\\":\{\\"noteKeys\\":\[([^\]]+)\]', raw)
         if match:
-            note_keys_str = match.group(1)
+            note_keys_str = match.group(1).decode('ascii', 'ignore')
             # [\"na3f6f4e2138e\",\"n344e56a81c58\",...] から抽出
             note_keys = re.findall(r'\\"([a-z0-9]+)\\"', note_keys_str)
 
@@ -118,12 +551,11 @@ class ArticleParser:
                 return articles
 
         # Next.jsの __NEXT_DATA__ から抽出を試みる
-        scripts = soup.find_all('script', {'id': '__NEXT_DATA__'})
-        for script in scripts:
-            if not script.string:
+        for block in ArticleParser.NEXT_DATA_RE.findall(raw):
+            if not block.strip():
                 continue
             try:
-                data = json.loads(script.string)
+                data = json.loads(block.decode('utf-8'))
                 props = data.get('props', {}).get('pageProps', {})
 
                 # 記事リストを探す
@@ -143,9 +575,17 @@ class ArticleParser:
                 if articles:
                     return articles
 
-            except json.JSONDecodeError as e:
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
                 logger.debug(f"__NEXT_DATA__ parse error: {e}")
 
+        return ArticleParser.extract_article_list_from_profile_dom(html)
+
+    @staticmethod
+    def extract_article_list_from_profile_dom(html) -> List[dict]:
+        """プロフィールページの記事リンクから記事リストを抽出（BeautifulSoupによるフォールバック）"""
+        soup = BeautifulSoup(html, 'lxml')
+        articles = []
+
         # フォールバック: HTMLから記事リンクを抽出
         article_links = soup.select('a[href*="/n/"]')
         seen_keys = set()
@@ -190,6 +630,39 @@ class ArticleParser:
         raise ValueError("記事本文が見つかりませんでした")
 
 
+class JSONLDStreamExtractor:
+    """受信途中のHTMLを lxml のフィードパーサーに流し、BlogPosting が見つかった時点で止める
+
+    read_bounded() の until に feed を渡すと、<head> 内の JSON-LD を読んだところで
+    残りの本文を受信せずに接続を閉じられる。
+    """
+
+    def __init__(self):
+        self.result: Optional[dict] = None
+        self._parser = etree.HTMLPullParser(events=('end',), tag='script', encoding='utf-8')
+
+    def feed(self, chunk: bytes) -> bool:
+        """チャンクを解析し、BlogPosting が見つかれば True を返す"""
+        try:
+            self._parser.feed(chunk)
+            events = list(self._parser.read_events())
+        except etree.LxmlError as e:
+            logger.debug(f"JSON-LD stream parse error: {e}")
+            return False
+        for _, element in events:
+            if (element.get('type') or '').lower() != 'application/ld+json' or not element.text:
+                continue
+            try:
+                data = json.loads(element.text)
+            except json.JSONDecodeError:
+                continue
+            item = ArticleParser._select_blog_posting(data)
+            if item is not None:
+                self.result = item
+                return True
+        return False
+
+
 class HTMLToMarkdownConverter:
     """HTML→Markdown変換"""
 
@@ -229,38 +702,74 @@ class HTMLToMarkdownConverter:
                     url = urljoin('https://note.com', url)
                 images.append(url)
 
-        return list(set(images))  # 重複除去
+        return list(dict.fromkeys(images))  # 重複除去（出現順を維持）
 
 
 class ImageDownloader:
     """画像ダウンロードとローカルパス管理"""
 
-    def __init__(self, base_image_dir: Path):
+    def __init__(self, base_image_dir: Path, transport: Optional[HTTPTransport] = None):
         self.base_image_dir = base_image_dir
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-
-    def download_images(self, article_id: str, image_urls: List[str]) -> Dict[str, str]:
-        """画像をダウンロードしてURL→ローカルパスのマッピングを返す"""
-        article_dir = self.base_image_dir / article_id
+        self.transport = transport or HTTPTransport()
+
+    def reusable_images(self, article_id: str, image_urls: List[str],
+                        known_images: Optional[Dict[str, str]] = None,
+                        image_subdir: Optional[str] = None) -> Dict[str, str]:
+        """known_images のうちファイルが残っている画像の URL→ローカルパス（ダウンロードはしない）"""
+        article_dir = self.base_image_dir / (image_subdir or article_id)
+        url_map = {}
+        for url in image_urls:
+            known_path = (known_images or {}).get(url)
+            if known_path and (article_dir / Path(known_path).name).exists():
+                url_map[url] = known_path
+        return url_map
+
+    def download_images(self, article_id: str, image_urls: List[str],
+                        known_images: Optional[Dict[str, str]] = None,
+                        stop_event: Optional[threading.Event] = None,
+                        image_subdir: Optional[str] = None,
+                        link_prefix: str = '../images') -> Dict[str, str]:
+        """画像をダウンロードしてURL→ローカルパスのマッピングを返す
+
+        known_images（前回の URL→ローカルパス）に含まれ、ファイルが残っている画像は
+        再ダウンロードせずに再利用する。stop_event がセットされたら残りの画像は取得しない。
+        image_subdir は images/ 以下の保存先（省略時は記事ID）、link_prefix は記事ファイルから
+        images/ への相対リンク（sharded 配置では階層の分だけ深くなる）。
+        """
+        image_subdir = image_subdir or article_id
+        article_dir = self.base_image_dir / image_subdir
         article_dir.mkdir(parents=True, exist_ok=True)
 
         url_map = {}
+        known_images = known_images or {}
+        used_names = {Path(p).name for p in known_images.values()}
+        next_idx = 1
+
+        for url in image_urls:
+            known_path = known_images.get(url)
+            if known_path and (article_dir / Path(known_path).name).exists():
+                url_map[url] = known_path
+                logger.debug(f"  ↺ 画像再利用: {Path(known_path).name}")
+                continue
+            if stop_event is not None and stop_event.is_set():
+                break
+
+            # 既存ファイル名と衝突しない連番を選ぶ
+            while any(name.startswith(f"image_{next_idx}.") for name in used_names):
+                next_idx += 1
+            idx = next_idx
+            next_idx += 1
 
-        for idx, url in enumerate(image_urls, start=1):
             try:
-                # 画像をダウンロード
-                response = self.session.get(url, timeout=30)
-                response.raise_for_status()
+                # 画像をダウンロード（本文はメモリに溜めずに一時ファイルへ書き出す）
+                response, tmp_path = self._download_to_tempfile(url, article_dir)
 
                 # 拡張子を取得
                 parsed_url = urlparse(url)
                 ext = Path(parsed_url.path).suffix
                 if not ext or ext not in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg']:
                     # Content-Typeから推測
-                    content_type = response.headers.get('Content-Type', '')
+                    content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
                     ext_map = {
                         'image/jpeg': '.jpg',
                         'image/png': '.png',
@@ -275,10 +784,11 @@ class ImageDownloader:
                 filepath = article_dir / filename
 
                 # 保存
-                filepath.write_bytes(response.content)
+                os.replace(tmp_path, filepath)
+                used_names.add(filename)
 
-                # 相対パスを生成（articlesフォルダから見た相対パス）
-                relative_path = f"../images/{article_id}/{filename}"
+                # 相対パスを生成（記事ファイルから見た相対パス）
+                relative_path = f"{link_prefix}/{image_subdir}/{filename}"
                 url_map[url] = relative_path
 
                 logger.info(f"  ✓ 画像ダウンロード: {filename}")
@@ -290,6 +800,22 @@ class ImageDownloader:
 
         return url_map
 
+    def _download_to_tempfile(self, url: str, directory: Path):
+        """上限付きで一時ファイルにダウンロードし、(レスポンス, 一時ファイルパス) を返す"""
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.download.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                response = self.transport.read_bounded(url, sink=f)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        return response, tmp_path
+
     def replace_image_urls(self, markdown: str, url_map: Dict[str, str]) -> str:
         """Markdown内の画像URLをローカルパスに置換"""
         result = markdown
@@ -308,9 +834,12 @@ class MarkdownGenerator:
     """Markdownファイル生成"""
 
     @staticmethod
-    def create_frontmatter(article: ArticleDetail, day_number: int, fetched_at: datetime,
+    def create_frontmatter(article: ArticleDetail, day_number: int,
                           date_modified: Optional[str] = None) -> str:
-        """YAMLフロントマターを生成"""
+        """YAMLフロントマターを生成
+
+        取得日時などの揮発的な値は含めない（FetchStateStore に記録する）。
+        """
         frontmatter = {
             'type': 'article',
             'source': 'note.com',
@@ -324,8 +853,6 @@ class MarkdownGenerator:
             'status': 'published',
             'category': 'advent-calendar-2025',
             'tags': ['アドベントカレンダー'],
-            'created': datetime.now().strftime('%Y-%m-%d'),
-            'fetched_at': fetched_at.isoformat()
         }
 
         # 更新日時を追加（dateModifiedがあれば）
@@ -334,6 +861,25 @@ class MarkdownGenerator:
 
         return yaml.dump(frontmatter, allow_unicode=True, sort_keys=False)
 
+    @staticmethod
+    def compute_content_hash(article: ArticleDetail, day_number: int) -> str:
+        """本文・画像URL・安定したメタデータからコンテンツハッシュを計算
+
+        画像のローカルパス置換前の本文を対象にするため、画像ダウンロード前に判定できる。
+        """
+        payload = {
+            'article_id': article.id,
+            'day_number': day_number,
+            'title': article.title,
+            'publish_datetime': article.publish_at.isoformat() if article.publish_at else None,
+            'url': article.url,
+            'date_modified': article.date_modified,
+            'body_markdown': article.body_markdown,
+            'image_urls': sorted(article.image_urls),
+        }
+        encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
     @staticmethod
     def parse_frontmatter(filepath: Path) -> Optional[dict]:
         """既存Markdownファイルのフロントマターを解析"""
@@ -355,17 +901,21 @@ class MarkdownGenerator:
 
     @staticmethod
     def save_article(article: ArticleDetail, day_number: int, markdown_content: str,
-                    output_dir: Path, fetched_at: datetime, date_modified: Optional[str] = None):
-        """記事ファイルを保存"""
-        output_dir.mkdir(parents=True, exist_ok=True)
+                    output_dir: Path, date_modified: Optional[str] = None,
+                    filename: Optional[str] = None) -> bool:
+        """記事ファイルを保存（内容が同一なら書き込まない）
+
+        filename は output_dir からの相対パス（省略時は flat 配置のファイル名）。
 
-        filename = MarkdownGenerator.generate_filename(day_number, article.title, article.id)
+        Returns:
+            実際にファイルを書き込んだ場合 True
+        """
+        filename = filename or MarkdownGenerator.generate_filename(day_number, article.title, article.id)
         filepath = output_dir / filename
+        filepath.parent.mkdir(parents=True, exist_ok=True)
 
         # フロントマター
-        frontmatter = MarkdownGenerator.create_frontmatter(
-            article, day_number, fetched_at, date_modified
-        )
+        frontmatter = MarkdownGenerator.create_frontmatter(article, day_number, date_modified)
 
         # フッター
         footer = f"\n\n---\n\n**原文URL**: [{article.url}]({article.url})\n"
@@ -377,39 +927,234 @@ class MarkdownGenerator:
                 footer += f"**更新日**: {mod_dt.strftime('%Y年%-m月%-d日')}\n"
             except:
                 pass
-        footer += f"**取得日**: {fetched_at.strftime('%Y年%-m月%-d日')}\n"
 
         # 完全なMarkdown
         full_content = f"---\n{frontmatter}---\n\n# {article.title}\n\n{markdown_content}{footer}"
 
-        filepath.write_text(full_content, encoding='utf-8')
+        if filepath.exists() and filepath.read_text(encoding='utf-8') == full_content:
+            logger.info(f"✓ 変更なし: {filename}")
+            return False
+
+        atomic_write_text(filepath, full_content)
         logger.info(f"✓ 保存完了: {filename}")
+        return True
+
+
+def build_article_detail(article: Article, html: bytes,
+                         converter: HTMLToMarkdownConverter) -> ArticleDetail:
+    """記事ページの HTML から記事詳細を作る（通信しない。--rebuild-from-archive でも使う）"""
+    soup = BeautifulSoup(html, 'lxml', from_encoding='utf-8')
+
+    # JSON-LDデータを取得
+    json_ld = ArticleParser.extract_json_ld(html)
+
+    # タイトルと公開日をJSON-LDから取得（Noneの場合）
+    title = article.title
+    publish_at = article.publish_at
+    eyecatch_url = article.eyecatch_url
+
+    if json_ld:
+        if not title or title == 'Untitled':
+            title = json_ld.get('headline', json_ld.get('name', 'Untitled'))
+        # 一覧に公開日が無い場合は取得時刻が入っているため、JSON-LDの公開日を優先する
+        # （取得時刻のままだとコンテンツハッシュが毎回変わってしまう）
+        date_str = json_ld.get('datePublished')
+        if date_str:
+            try:
+                publish_at = date_parser.parse(date_str)
+            except:
+                pass
+        if not eyecatch_url:
+            image = json_ld.get('image')
+            if image:
+                if isinstance(image, dict):
+                    eyecatch_url = image.get('url')
+                elif isinstance(image, list) and len(image) > 0:
+                    eyecatch_url = image[0].get('url') if isinstance(image[0], dict) else image[0]
+                elif isinstance(image, str):
+                    eyecatch_url = image
+
+    # metaタグからも取得を試みる
+    if not title or title == 'Untitled':
+        og_title = soup.find('meta', property='og:title')
+        if og_title:
+            title = og_title.get('content', 'Untitled')
+
+    # 更新日時を取得（JSON-LDから）
+    date_modified = None
+    if json_ld:
+        date_modified = json_ld.get('dateModified')
+
+    # 記事本文を取得
+    body_html = ArticleParser.extract_article_body(soup)
+
+    # HTML→Markdown変換
+    body_markdown = converter.convert(body_html)
+
+    # 画像URLを抽出
+    image_urls = converter.extract_image_urls(body_html)
+    if eyecatch_url:
+        image_urls.insert(0, eyecatch_url)
+
+    return ArticleDetail(
+        id=article.id,
+        key=article.key,
+        title=title,
+        publish_at=publish_at,
+        eyecatch_url=eyecatch_url,
+        url=article.url,
+        body_html=body_html,
+        body_markdown=body_markdown,
+        image_urls=image_urls,
+        json_ld=json_ld,
+        date_modified=date_modified
+    )
+
+
+# パイプラインの parse/convert 段・--rebuild-from-archive のワーカープロセスごとに1つ作る
+_worker_converter: Optional[HTMLToMarkdownConverter] = None
+_rebuild_downloader: Optional['ImageDownloader'] = None
+
+
+def timed_call(func, *args):
+    """(func(*args), 所要秒数) を返す（ワーカープロセス内の処理時間を測る）"""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def measured_call(func, *args):
+    """(func(*args), 所要秒数, ピークRSS) を返す（ワーカープロセス内で記事1件分のピークを測る）"""
+    reset_peak_rss()
+    result, seconds = timed_call(func, *args)
+    return result, seconds, peak_rss_bytes()
+
+
+def parse_article_page(article_data: dict, html: bytes) -> ArticleDetail:
+    """記事ページを解析・変換する（パイプラインの parse/convert 段のワーカー）"""
+    global _worker_converter
+    if _worker_converter is None:
+        _worker_converter = HTMLToMarkdownConverter()
+    return build_article_detail(article_from_metadata(article_data), html, _worker_converter)
+
+
+def rebuild_article(task: dict) -> dict:
+    """アーカイブの HTML から記事1件の Markdown を作り直す（ProcessPoolExecutor のワーカー）
+
+    画像はダウンロードせず、取得済みでファイルが残っているものだけローカルパスにする。
+    """
+    global _worker_converter, _rebuild_downloader
+    if _worker_converter is None:
+        _worker_converter = HTMLToMarkdownConverter()
+    if _rebuild_downloader is None:
+        _rebuild_downloader = ImageDownloader(Path(task['image_dir']))
+
+    html = PageArchive.read(task['entry'])
+    detail = build_article_detail(article_from_metadata(task['entry']['article']), html, _worker_converter)
+    del html
+    content_hash = MarkdownGenerator.compute_content_hash(detail, task['day_number'])
+
+    url_map = _rebuild_downloader.reusable_images(detail.id, detail.image_urls, task['known_images'],
+                                                  image_subdir=task['image_subdir'])
+    if url_map:
+        detail.body_markdown = _rebuild_downloader.replace_image_urls(detail.body_markdown, url_map)
+    filepath = Path(task['output_dir']) / task['filename']
+    previous = filepath.read_text(encoding='utf-8') if filepath.exists() else None
+    written = MarkdownGenerator.save_article(
+        detail, task['day_number'], detail.body_markdown, Path(task['output_dir']),
+        date_modified=detail.date_modified, filename=task['filename']
+    )
+    # 版の履歴は書き換え前後の内容から親プロセスで更新する
+    return {'article_id': detail.id, 'filename': task['filename'], 'content_hash': content_hash,
+            'written': written, 'previous': previous if written else None}
+
+
+def article_metadata(article: Article) -> dict:
+    """一覧から得た記事メタデータ（計画・アーカイブに保存する形式）"""
+    return {
+        'id': article.id,
+        'key': article.key,
+        'title': article.title,
+        'publish_at': article.publish_at.isoformat(),
+        'eyecatch_url': article.eyecatch_url,
+        'url': article.url,
+    }
+
+
+def article_from_metadata(data: dict) -> Article:
+    return Article(
+        id=data['id'],
+        key=data['key'],
+        title=data['title'],
+        publish_at=date_parser.parse(data['publish_at']),
+        eyecatch_url=data.get('eyecatch_url'),
+        url=data['url']
+    )
 
 
 class NoteArticleScraper:
     """メインスクレイパー"""
 
-    def __init__(self, username: str, base_dir: Path, image_dir: Path, output_dir: Path):
+    IMAGE_MODES = ('inline', 'deferred', 'skip')
+
+    def __init__(self, username: str, base_dir: Path, image_dir: Path, output_dir: Path,
+                 transport_config: Optional[TransportConfig] = None, image_mode: str = 'inline',
+                 layout: Optional[str] = None, archive_dir: Optional[Path] = None,
+                 history_dir: Optional[Path] = None, pipeline: bool = True, parse_workers: int = 2):
+        if image_mode not in self.IMAGE_MODES:
+            raise ValueError(f"不明な画像モード: {image_mode}")
         self.username = username
         self.base_dir = base_dir
         self.image_dir = image_dir
         self.output_dir = output_dir
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        # ページ・画像で1つのコネクションプールを共有する
+        self.transport = HTTPTransport(transport_config)
 
         self.parser = ArticleParser()
         self.converter = HTMLToMarkdownConverter()
-        self.image_downloader = ImageDownloader(image_dir)
-
-    def fetch_with_retry(self, url: str, max_retries: int = 3) -> requests.Response:
-        """リトライ付きHTTPリクエスト"""
+        self.image_downloader = ImageDownloader(image_dir, self.transport)
+        self.state = FetchStateStore(output_dir)
+        # inline: 本文と一緒に取得 / deferred: キューに積んで後で取得 / skip: 取得しない
+        self.image_mode = image_mode
+        self.image_queue = ImageQueue(output_dir)
+        self.scheduler = FetchScheduler(output_dir)
+        # 取得したページの生 HTML（None ならアーカイブしない）
+        self.archive = PageArchive(archive_dir) if archive_dir else None
+        # 記事ファイルの版の履歴（None なら上書き前の版を残さない）
+        self.history = RevisionStore(history_dir, output_dir) if history_dir else None
+        self.layout = CorpusLayout(output_dir, image_dir)
+        if layout and layout != self.layout.layout:
+            if self.layout.article_paths():
+                raise ValueError(f"既存の記事は {self.layout.layout} 配置です。"
+                                 f"先に corpus_layout.py migrate --layout {layout} で移行してください")
+            # 空のコーパスは指定された配置で始める
+            self.layout.layout = layout
+            self.layout.articles = {}
+        # 常駐時に変更のないファイルのフロントマターを再解析しないためのキャッシュ
+        self._frontmatter_cache: Dict[Path, tuple] = {}
+        # 直近の apply_plan で書き込んだ記事ファイル
+        self.touched_paths: List[Path] = []
+        # 直近の apply_plan での記事ごとのピークRSS [(article_id, bytes)]
+        self.memory_samples: List[tuple] = []
+        self.worker_memory_samples: List[tuple] = []
+        # セットされると apply_plan は次の記事に進まずに終了する
+        self.stop_requested = threading.Event()
+        # True: 取得・変換・画像・書き込みを段ごとに並行処理（FetchPipeline） / False: 1件ずつ順に処理
+        self.pipeline = pipeline
+        # パイプラインの parse/convert 段のプロセス数（0 ならスレッドで処理）
+        self.parse_workers = parse_workers
+        # 直近の apply_plan のパイプラインの段ごとの計測
+        self.pipeline_report: Optional[dict] = None
+
+    def fetch_with_retry(self, url: str, max_retries: int = 3,
+                         until=None) -> BoundedResponse:
+        """リトライ付きHTTPリクエスト（上限付きで読み込み、until が True を返せば途中で打ち切る）"""
         for attempt in range(max_retries):
             try:
-                response = self.session.get(url, timeout=30)
-                response.raise_for_status()
-                return response
+                return self.transport.read_bounded(url, until=until)
+            except ResponseTooLarge:
+                # 再試行しても同じサイズが返ってくるだけなのでリトライしない
+                raise
             except requests.exceptions.HTTPError as e:
                 if e.response.status_code == 404:
                     raise ValueError(f"ページが見つかりません: {url}")
@@ -433,9 +1178,8 @@ class NoteArticleScraper:
         logger.info(f"プロフィールページ取得中: {profile_url}")
 
         response = self.fetch_with_retry(profile_url)
-        html = response.text
 
-        articles_data = self.parser.extract_article_list_from_profile(html)
+        articles_data = self.parser.extract_article_list_from_profile(response.content)
 
         articles = []
         for data in articles_data:
@@ -477,85 +1221,37 @@ class NoteArticleScraper:
         logger.info(f"✓ {len(articles)}件の記事を検出")
         return articles
 
-    def scrape_article_detail(self, article: Article) -> ArticleDetail:
-        """記事詳細を取得"""
+    def fetch_page(self, article: Article) -> bytes:
+        """記事ページを取得（デコード済み文字列は作らず、バイト列のまま返す）"""
         logger.info(f"\n記事取得中: {article.title if article.title != 'Untitled' else article.id}")
         logger.info(f"  URL: {article.url}")
+        return self.fetch_with_retry(article.url).content
 
-        response = self.fetch_with_retry(article.url)
-        html = response.text
-        soup = BeautifulSoup(html, 'lxml')
-
-        # JSON-LDデータを取得
-        json_ld = self.parser.extract_json_ld(html)
-
-        # タイトルと公開日をJSON-LDから取得（Noneの場合）
-        title = article.title
-        publish_at = article.publish_at
-        eyecatch_url = article.eyecatch_url
-
-        if json_ld:
-            if not title or title == 'Untitled':
-                title = json_ld.get('headline', json_ld.get('name', 'Untitled'))
-            if not publish_at or publish_at == datetime.now():
-                date_str = json_ld.get('datePublished')
-                if date_str:
-                    try:
-                        publish_at = date_parser.parse(date_str)
-                    except:
-                        pass
-            if not eyecatch_url:
-                image = json_ld.get('image')
-                if image:
-                    if isinstance(image, dict):
-                        eyecatch_url = image.get('url')
-                    elif isinstance(image, list) and len(image) > 0:
-                        eyecatch_url = image[0].get('url') if isinstance(image[0], dict) else image[0]
-                    elif isinstance(image, str):
-                        eyecatch_url = image
-
-        # metaタグからも取得を試みる
-        if not title or title == 'Untitled':
-            og_title = soup.find('meta', property='og:title')
-            if og_title:
-                title = og_title.get('content', 'Untitled')
+    def archive_page(self, article: Article, html: bytes, date_modified: Optional[str]):
+        """変換処理を変えたときに再取得せずに作り直せるよう、生の HTML を残す"""
+        if self.archive is None:
+            return
+        try:
+            self.archive.store(article.id, html, date_modified, article=article_metadata(article))
+        except OSError as e:
+            logger.warning(f"  ページのアーカイブに失敗: {e}")
 
-        # 更新日時を取得（JSON-LDから）
-        date_modified = None
-        if json_ld:
-            date_modified = json_ld.get('dateModified')
+    @staticmethod
+    def log_article_detail(detail: ArticleDetail):
+        logger.info(f"  タイトル: {detail.title}")
+        logger.info(f"  公開日: {detail.publish_at.strftime('%Y-%m-%d') if detail.publish_at else 'Unknown'}")
+        if detail.date_modified:
+            logger.info(f"  更新日: {detail.date_modified}")
+        logger.info(f"  画像: {len(detail.image_urls)}枚検出")
 
-        logger.info(f"  タイトル: {title}")
-        logger.info(f"  公開日: {publish_at.strftime('%Y-%m-%d') if publish_at else 'Unknown'}")
-        if date_modified:
-            logger.info(f"  更新日: {date_modified}")
-
-        # 記事本文を取得
-        body_html = self.parser.extract_article_body(soup)
-
-        # HTML→Markdown変換
-        body_markdown = self.converter.convert(body_html)
-
-        # 画像URLを抽出
-        image_urls = self.converter.extract_image_urls(body_html)
-        if eyecatch_url:
-            image_urls.insert(0, eyecatch_url)
-
-        logger.info(f"  画像: {len(image_urls)}枚検出")
-
-        return ArticleDetail(
-            id=article.id,
-            key=article.key,
-            title=title,
-            publish_at=publish_at,
-            eyecatch_url=eyecatch_url,
-            url=article.url,
-            body_html=body_html,
-            body_markdown=body_markdown,
-            image_urls=image_urls,
-            json_ld=json_ld,
-            date_modified=date_modified
-        )
+    def scrape_article_detail(self, article: Article) -> ArticleDetail:
+        """記事詳細を取得"""
+        html = self.fetch_page(article)
+        detail = build_article_detail(article, html, self.converter)
+        self.archive_page(article, html, detail.date_modified)
+        del html
+        self.log_article_detail(detail)
+        return detail
 
     def load_local_articles(self) -> Dict[str, dict]:
         """ローカルの既存記事情報を読み込む（article_id -> frontmatter）"""
@@ -564,8 +1260,15 @@ class NoteArticleScraper:
         if not self.output_dir.exists():
             return local_articles
 
-        for filepath in self.output_dir.glob('*.md'):
-            frontmatter = MarkdownGenerator.parse_frontmatter(filepath)
+        # マニフェストがあればディレクトリを走査せずに列挙する
+        for filepath in self.layout.article_paths():
+            mtime_ns = filepath.stat().st_mtime_ns
+            cached = self._frontmatter_cache.get(filepath)
+            if cached and cached[0] == mtime_ns:
+                frontmatter = cached[1]
+            else:
+                frontmatter = MarkdownGenerator.parse_frontmatter(filepath)
+                self._frontmatter_cache[filepath] = (mtime_ns, frontmatter)
             if frontmatter and 'article_id' in frontmatter:
                 local_articles[frontmatter['article_id']] = {
                     'frontmatter': frontmatter,
@@ -574,15 +1277,27 @@ class NoteArticleScraper:
 
         return local_articles
 
-    def run(self, max_articles: Optional[int] = None, start_day: int = 1,
-            skip_existing: bool = False, update_check: bool = False):
-        """メイン実行"""
-        fetched_at = datetime.now()
+    def probe_article(self, article: Article) -> dict:
+        """記事ページからメタデータ（dateModified）だけを取得する軽量チェック"""
+        # 本文は不要なので、JSON-LD を読んだ時点で受信を打ち切る
+        extractor = JSONLDStreamExtractor()
+        response = self.fetch_with_retry(article.url, until=extractor.feed)
+        json_ld = extractor.result
+        if json_ld is None:
+            # フィードパーサーで見つからなかった場合は読み込んだ全体から探す
+            json_ld = self.parser.extract_json_ld(response.content)
+        return {
+            'date_modified': json_ld.get('dateModified') if json_ld else None,
+            'page_bytes': response.declared_size or response.size,
+        }
 
-        logger.info("=" * 60)
-        logger.info("note.com記事取得スクリプト")
-        logger.info("=" * 60)
+    def build_plan(self, max_articles: Optional[int] = None, start_day: int = 1,
+                   skip_existing: bool = False, update_check: bool = False,
+                   only_new: bool = False) -> dict:
+        """一覧・ローカル索引・メタデータ確認だけで処理計画を作る（本文の変換・画像取得はしない）
 
+        only_new=True の場合、既存記事は確認せずにスキップする（常駐モードの軽量ポーリング用）。
+        """
         # ローカル記事を読み込む（day_number決定のため常に必要）
         local_articles = self.load_local_articles()
         if update_check:
@@ -599,9 +1314,6 @@ class NoteArticleScraper:
 
         logger.info(f"\n{len(articles)}件の記事を処理します\n")
 
-        # 統計
-        stats = {'new': 0, 'updated': 0, 'skipped': 0}
-
         # 既存記事の最大day_numberを取得
         max_existing_day = 0
         if local_articles:
@@ -611,123 +1323,579 @@ class NoteArticleScraper:
                     max_existing_day = day_num
             logger.debug(f"既存記事の最大day番号: {max_existing_day}")
 
-        # 新規記事を特定し、date_modified順でソートしてday_numberを事前に割り当てる
-        # まず各新規記事のdate_modifiedを取得する必要がある
-        new_articles_with_date = []
-        for article in articles:
-            if article.id not in local_articles:
-                # 記事ページからdate_modifiedを取得
+        # メタデータ確認（新規記事は day_number 割り当てのため、更新チェック時は既存記事も）
+        probes: Dict[str, dict] = {}
+        deferred = set()
+        for article in self.scheduler.probe_order(articles, local_articles, self.state):
+            is_new = article.id not in local_articles
+            if not is_new and (only_new or not update_check):
+                continue
+            if not is_new and not self.scheduler.can_probe():
+                # 時間予算を本文の取得に残すため、残りの更新確認は次回に回す
+                deferred.add(article.id)
+                continue
+            if is_new:
                 logger.info(f"新規記事のメタデータ取得中: {article.id}")
-                try:
-                    response = self.fetch_with_retry(article.url)
-                    html = response.text
-                    json_ld = self.parser.extract_json_ld(html)
-                    date_modified = json_ld.get('dateModified') if json_ld else None
-                    new_articles_with_date.append({
-                        'article': article,
-                        'date_modified': date_modified
-                    })
-                    logger.debug(f"  {article.id}: date_modified = {date_modified}")
-                except Exception as e:
-                    logger.warning(f"  メタデータ取得失敗 ({article.id}): {e}")
-                    new_articles_with_date.append({
-                        'article': article,
-                        'date_modified': None
-                    })
+            else:
+                logger.info(f"\n更新チェック中: {article.id}")
+                logger.info(f"  ⚡ 軽量チェック: メタデータのみ取得（本文・画像はスキップ）")
+            try:
+                probes[article.id] = self.probe_article(article)
+                logger.debug(f"  {article.id}: date_modified = {probes[article.id]['date_modified']}")
+            except Exception as e:
+                logger.warning(f"  メタデータ取得失敗 ({article.id}): {e}")
+                probes[article.id] = {'date_modified': None, 'page_bytes': 0}
 
-        # 新規記事をdate_modified昇順でソート（Noneは最後に）
-        new_articles_with_date.sort(key=lambda x: x['date_modified'] or '9999-99-99')
+        if deferred:
+            logger.info(f"⏱ 時間予算のため{len(deferred)}件の更新確認を次回に回します")
 
-        # 新規記事にday_numberを事前割り当て（article_id -> day_number）
+        # 新規記事をdate_modified昇順でソート（Noneは最後に）し、day_numberを事前割り当て
+        new_articles = [a for a in articles if a.id not in local_articles]
+        new_articles.sort(key=lambda a: probes[a.id]['date_modified'] or '9999-99-99')
         new_article_day_map = {}
         next_day = max_existing_day + 1 if max_existing_day > 0 else start_day
-        for item in new_articles_with_date:
-            new_article = item['article']
+        for new_article in new_articles:
             new_article_day_map[new_article.id] = next_day
-            logger.debug(f"  🆕 新規記事 {new_article.id} (date_modified: {item['date_modified']}) → day{next_day:04d} に事前割り当て")
+            logger.debug(f"  🆕 新規記事 {new_article.id} (date_modified: {probes[new_article.id]['date_modified']}) → day{next_day:04d} に事前割り当て")
             next_day += 1
 
-        # 各記事を処理
+        entries = []
         for idx, article in enumerate(articles, start=start_day):
-            try:
-                # 既存ファイルチェック
-                if skip_existing:
-                    filename = MarkdownGenerator.generate_filename(idx, article.title, article.id)
-                    if (self.output_dir / filename).exists():
-                        logger.info(f"スキップ (既存): {article.title}")
-                        stats['skipped'] += 1
-                        continue
-
-                # 更新チェックモード
-                should_fetch = True
-                if update_check and article.id in local_articles:
-                    # まず記事ページにアクセスしてdateModifiedを確認
-                    logger.info(f"\n更新チェック中: {article.id}")
-                    logger.info(f"  ⚡ 軽量チェック: メタデータのみ取得（本文・画像はスキップ）")
-                    response = self.fetch_with_retry(article.url)
-                    html = response.text
-                    json_ld = self.parser.extract_json_ld(html)
-
-                    web_date_modified = json_ld.get('dateModified') if json_ld else None
-                    local_date_modified = local_articles[article.id]['frontmatter'].get('date_modified')
-
-                    if web_date_modified and local_date_modified:
-                        if web_date_modified == local_date_modified:
-                            logger.info(f"  ✓ 更新なし: {web_date_modified}")
-                            logger.info(f"  💾 スキップ（本文・画像のダウンロードを回避）")
-                            stats['skipped'] += 1
-                            should_fetch = False
-                        else:
-                            logger.info(f"  🔄 更新検出: {local_date_modified} → {web_date_modified}")
-                            logger.info(f"  📥 再取得を開始...")
-                            stats['updated'] += 1
-                    else:
-                        # dateModifiedがない場合は取得
-                        logger.info(f"  ⚠ 更新日時情報なし - 再取得します")
-                        stats['updated'] += 1
-
-                if not should_fetch:
-                    continue
-
-                # day番号の決定
-                if article.id in local_articles:
-                    # 既存記事: ローカルのday番号を保持
-                    day_number = local_articles[article.id]['frontmatter'].get('day_number', idx)
-                    logger.debug(f"  🔄 既存記事の day{day_number:04d} を保持")
-                elif article.id in new_article_day_map:
-                    # 新規記事: 事前割り当てマップから取得
-                    day_number = new_article_day_map[article.id]
-                    stats['new'] += 1
-                    logger.debug(f"  🆕 新規記事として day{day_number:04d} に割り当て")
+            local = local_articles.get(article.id)
+            web_date_modified = probes.get(article.id, {}).get('date_modified')
+            local_date_modified = local['frontmatter'].get('date_modified') if local else None
+
+            # day番号の決定
+            if local:
+                # 既存記事: ローカルのday番号を保持
+                day_number = local['frontmatter'].get('day_number', idx)
+            elif article.id in new_article_day_map:
+                # 新規記事: 事前割り当てマップから取得
+                day_number = new_article_day_map[article.id]
+            else:
+                # フォールバック: enumerateのidxを使用
+                day_number = idx
+
+            if skip_existing and (self.output_dir / self.article_location(
+                    article.id, idx, article.title, article.publish_at)[0]).exists():
+                action, reason = 'skip', 'existing-file'
+            elif not local:
+                action, reason = 'new', 'not-in-local-index'
+            elif only_new:
+                action, reason = 'skip', 'not-checked'
+            elif article.id in deferred:
+                action, reason = 'skip', 'deadline'
+            elif not update_check:
+                action, reason = 'update', 'refetch'
+            elif (self.image_mode != 'skip' and not self.state.images_complete(article.id)
+                  and article.id not in self.image_queue.articles):
+                # --images skip で残したリモート画像・取得に失敗した画像を取得し直す
+                # （画像キューにある記事は --drain-images が取得する）
+                action, reason = 'update', 'images-incomplete'
+            elif web_date_modified and local_date_modified:
+                if web_date_modified == local_date_modified:
+                    action, reason = 'skip', 'date-modified-unchanged'
                 else:
-                    # フォールバック: enumerateのidxを使用
-                    day_number = idx
-                    stats['new'] += 1
-
-                # 記事詳細を取得
-                detail = self.scrape_article_detail(article)
-
-                # 画像をダウンロード
-                if detail.image_urls:
-                    logger.info(f"  画像ダウンロード中...")
-                    url_map = self.image_downloader.download_images(detail.id, detail.image_urls)
-
-                    # MarkdownのURLを置換
-                    detail.body_markdown = self.image_downloader.replace_image_urls(
-                        detail.body_markdown, url_map
-                    )
-
-                # Markdownファイルを保存
-                MarkdownGenerator.save_article(
-                    detail, day_number, detail.body_markdown, self.output_dir, fetched_at,
-                    date_modified=detail.date_modified
-                )
+                    action, reason = 'update', 'date-modified-changed'
+            else:
+                action, reason = 'update', 'no-date-modified'
+
+            entries.append({
+                'article': article_metadata(article),
+                'action': action,
+                'reason': reason,
+                'day_number': day_number,
+                'date_modified': web_date_modified,
+                'local_date_modified': local_date_modified,
+            })
+
+        return {
+            'version': 1,
+            'created_at': datetime.now().isoformat(),
+            'username': self.username,
+            'update_check': update_check,
+            'articles': entries,
+            'estimate': self.estimate_plan(entries, probes),
+        }
 
-                time.sleep(2)  # レート制限対策
+    def estimate_plan(self, entries: List[dict], probes: Dict[str, dict]) -> dict:
+        """計画を実行した場合のリクエスト数・転送量を見積もる"""
+        page_sizes = [p['page_bytes'] for p in probes.values() if p.get('page_bytes')]
+        avg_page_bytes = sum(page_sizes) // len(page_sizes) if page_sizes else 150 * 1024
+
+        # 画像枚数・サイズはローカルの実績から推定
+        image_files = [f for f in self.image_dir.rglob('*')
+                       if f.is_file() and not f.name.startswith('.') and f.parent != self.image_dir
+                       ] if self.image_dir.exists() else []
+        image_dirs = {f.parent for f in image_files}
+        avg_images = len(image_files) / len(image_dirs) if image_dirs else 2.0
+        avg_image_bytes = (sum(f.stat().st_size for f in image_files) // len(image_files)
+                           if image_files else 300 * 1024)
+
+        pages = 0
+        images = 0.0
+        for entry in entries:
+            if entry['action'] == 'skip':
+                continue
+            pages += 1
+            known = self.state.get(entry['article']['id']).get('images')
+            # 既存画像は再利用されるため、新規記事のみ平均枚数を見込む
+            images += 0 if known is not None else avg_images
+
+        images = round(images)
+        return {
+            'articles_to_fetch': pages,
+            'requests': pages + images,
+            'bytes': pages * avg_page_bytes + images * avg_image_bytes,
+            'page_requests': pages,
+            'image_requests': images,
+            'check_requests': len(probes) + 1,
+            'check_bytes': sum(page_sizes),
+        }
+
+    @staticmethod
+    def log_plan(plan: dict):
+        """計画の概要をログ出力"""
+        counts: Dict[str, int] = {}
+        for entry in plan['articles']:
+            counts[entry['action']] = counts.get(entry['action'], 0) + 1
+            if entry['action'] != 'skip':
+                logger.info(f"  {entry['action']:6s} day{entry['day_number']:04d} {entry['article']['id']} ({entry['reason']})")
+        est = plan['estimate']
+        logger.info(f"\n📋 計画: 新規 {counts.get('new', 0)}件 / 更新 {counts.get('update', 0)}件 / スキップ {counts.get('skip', 0)}件")
+        logger.info(f"  推定リクエスト: {est['requests']}件 (ページ {est['page_requests']} + 画像 {est['image_requests']})")
+        logger.info(f"  推定転送量: ~{est['bytes'] / 1024 / 1024:.1f}MB")
+        logger.info(f"  計画作成に使ったリクエスト: {est['check_requests']}件")
+
+    def process_article(self, article: Article, day_number: int, fetched_at: datetime,
+                        stats: Dict[str, int]) -> Optional[Path]:
+        """記事1件を取得・変換・保存する（書き込んだ場合はファイルパスを返す）"""
+        detail = self.scrape_article_detail(article)
+        prepared = self.prepare_article(detail, day_number)
+        if prepared is None:
+            with self.state.transaction():
+                self.state.mark_verified(detail.id, fetched_at)
+            stats['unchanged'] += 1
+            return None
+        return self.write_article(prepared, fetched_at)
+
+    def prepare_article(self, detail: ArticleDetail, day_number: int) -> Optional[dict]:
+        """保存先を決めて画像を取得し、書き込む内容を返す（内容が前回と同じなら None）
+
+        取得状態は読むだけで更新しない（パイプラインでは画像の段から呼ぶため）。
+        """
+        # 内容ハッシュが前回と同じなら書き込み・画像ダウンロードを省略
+        filename, image_subdir = self.article_location(detail.id, day_number, detail.title, detail.publish_at)
+        link_prefix = CorpusLayout.link_prefix(filename)
+        content_hash = MarkdownGenerator.compute_content_hash(detail, day_number)
+        if self.state.is_unchanged(detail.id, content_hash, self.output_dir / filename):
+            logger.info(f"  ✓ 内容に変化なし: 書き込み・画像ダウンロードをスキップ")
+            return None
+
+        known_images = self.state.get(detail.id).get('images')
+        url_map = {}
+        pending = []
+        if detail.image_urls and self.image_mode == 'inline':
+            # 画像をダウンロード（前回取得済みの画像は再利用）
+            logger.info(f"  画像ダウンロード中...")
+            url_map = self.image_downloader.download_images(
+                detail.id, detail.image_urls, known_images=known_images,
+                image_subdir=image_subdir, link_prefix=link_prefix
+            )
+        elif detail.image_urls:
+            # 取得済みの画像だけローカルパスにし、残りはリモートURLのまま書き出す
+            url_map = self.image_downloader.reusable_images(detail.id, detail.image_urls, known_images,
+                                                            image_subdir=image_subdir)
+            if self.image_mode == 'deferred':
+                pending = [url for url in detail.image_urls if url not in url_map]
+                if pending:
+                    logger.info(f"  画像{len(pending)}枚をキューに追加（本文を先に保存）")
+
+        missing = [url for url in detail.image_urls if url not in url_map]
+        if missing and self.image_mode == 'inline':
+            logger.warning(f"  画像{len(missing)}枚を取得できませんでした（次回再試行）")
+
+        # MarkdownのURLを置換
+        if url_map:
+            detail.body_markdown = self.image_downloader.replace_image_urls(
+                detail.body_markdown, url_map
+            )
+        return {
+            'detail': detail,
+            'day_number': day_number,
+            'filename': filename,
+            'image_subdir': image_subdir,
+            'content_hash': content_hash,
+            'url_map': url_map,
+            'images_complete': not missing,
+            'pending': pending,
+        }
+
+    def write_article(self, prepared: dict, fetched_at: datetime) -> Path:
+        """prepare_article の結果を保存し、取得状態・マニフェスト・画像キューを更新する"""
+        detail = prepared['detail']
+        filename = prepared['filename']
+        # Markdownファイルを保存（--drain-images のリンク書き換えと重ならないようロック内で）
+        with self.state.transaction():
+            previous_path = self.output_dir / (self.state.get(detail.id).get('filename') or filename)
+            previous = None
+            if self.history is not None and previous_path.exists():
+                previous = previous_path.read_text(encoding='utf-8')
+                if not self.history.revisions(detail.id):
+                    # 履歴を使い始める前に保存した記事は、上書きする前の内容を最初の版にする
+                    self.record_revision(detail.id, previous_path, previous=previous)
+            written = MarkdownGenerator.save_article(
+                detail, prepared['day_number'], detail.body_markdown, self.output_dir,
+                date_modified=detail.date_modified, filename=filename
+            )
+            if written:
+                self.record_revision(detail.id, self.output_dir / filename, fetched_at, previous=previous)
+            self.state.record(detail.id, prepared['content_hash'], filename, fetched_at,
+                              image_map=prepared['url_map'], images_complete=prepared['images_complete'])
+            if self.layout.indexed:
+                self.layout.load()
+                self.layout.register(detail.id, filename, prepared['image_subdir'], self.username,
+                                     detail.publish_at)
+                self.layout.save()
+        # inline で全画像を取得し直した場合は、以前のキューの登録を取り消す
+        if self.image_mode == 'deferred' or (self.image_mode == 'inline' and detail.id in self.image_queue.articles):
+            with self.image_queue.transaction():
+                self.image_queue.enqueue(detail.id, filename, prepared['pending'], fetched_at)
+        return self.output_dir / filename
+
+    def record_revision(self, article_id: str, filepath: Path, recorded_at: Optional[datetime] = None,
+                        previous: Optional[str] = None):
+        """書き換えた記事ファイルの内容を版の履歴に残す（最新の版と同じなら何もしない）
+
+        履歴は記事ファイルを最新版として差分だけを持つため、書き換える前の内容 previous を渡す。
+        """
+        if self.history is None or not filepath.exists():
+            return
+        text = filepath.read_text(encoding='utf-8')
+        try:
+            rev = self.history.record(article_id, text, read_frontmatter(filepath).get('date_modified'),
+                                      recorded_at, previous=text if previous is None else previous,
+                                      path=filepath.relative_to(self.output_dir).as_posix())
+        except OSError as e:
+            logger.warning(f"  版の履歴の記録に失敗: {e}")
+            return
+        if rev and rev > 1:
+            logger.info(f"  版{rev}として履歴に記録")
+
+    def amend_revision(self, article_id: str, old_text: str, new_text: str):
+        """画像リンクの書き換えなど、版を変えない記事ファイルの書き換えを履歴の最新版に反映する"""
+        if self.history is None:
+            return
+        try:
+            self.history.amend(article_id, old_text, new_text)
+        except OSError as e:
+            logger.warning(f"  版の履歴の更新に失敗: {e}")
+
+    def article_location(self, article_id: str, day_number: int, title: str,
+                         publish_at) -> Tuple[str, str]:
+        """(記事ファイルの articles/ からの相対パス, 画像ディレクトリの images/ からの相対パス)"""
+        filename = MarkdownGenerator.generate_filename(day_number, title, article_id)
+        entry = (self.layout.articles or {}).get(article_id)
+        if entry and Path(entry['path']).name == filename:
+            # 公開日から求め直さず、記録済みの場所を使う
+            return entry['path'], entry['images']
+        return (self.layout.article_relpath(filename, self.username, publish_at),
+                self.layout.image_relpath(article_id, self.username, publish_at))
+
+    def drain_article(self, article_id: str) -> Dict[str, int]:
+        """キューにある記事1件の画像を取得し、記事ファイルのリンクを書き換える"""
+        self.image_queue.load()
+        entry = self.image_queue.articles.get(article_id)
+        if entry is None:
+            return {'downloaded': 0, 'remaining': 0}
+
+        self.state.load()
+        self.layout.load()
+        state = self.state.get(article_id)
+        filename = state.get('filename') or entry['filename']
+        filepath = self.output_dir / filename
+        located = (self.layout.articles or {}).get(article_id, {})
+        url_map = {}
+        if filepath.exists():
+            logger.info(f"画像取得中: {filepath.name} ({len(entry['urls'])}枚)")
+            url_map = self.image_downloader.download_images(
+                article_id, entry['urls'], known_images=state.get('images'),
+                stop_event=self.stop_requested, image_subdir=located.get('images'),
+                link_prefix=CorpusLayout.link_prefix(filename)
+            )
+            # 本文の再取得と重ならないようロック内で読み直して書き換える
+            with self.state.transaction():
+                if url_map and filepath.exists():
+                    text = filepath.read_text(encoding='utf-8')
+                    rewritten = self.image_downloader.replace_image_urls(text, url_map)
+                    if rewritten != text:
+                        atomic_write_text(filepath, rewritten)
+                        self.amend_revision(article_id, text, rewritten)
+                        self.touched_paths.append(filepath)
+                self.state.merge_images(article_id, url_map)
+        else:
+            logger.warning(f"  記事ファイルが無いため画像キューから削除: {article_id}")
+
+        with self.image_queue.transaction():
+            if not filepath.exists():
+                self.image_queue.articles.pop(article_id, None)
+                remaining = []
+            else:
+                remaining = self.image_queue.complete(article_id, list(url_map),
+                                                      attempted=not self.stop_requested.is_set())
+        if filepath.exists() and article_id not in self.image_queue.articles:
+            # 取得し終えた（または諦めた）記事は、次回から内容ハッシュでスキップしてよい
+            with self.state.transaction():
+                self.state.mark_images_complete(article_id)
+        return {'downloaded': len(url_map), 'remaining': len(remaining)}
+
+    def drain_images(self, max_articles: Optional[int] = None) -> Dict[str, int]:
+        """画像キューを取得し終えるか、停止要求を受けるまで処理する
+
+        画像は一時ファイル経由で保存し、記事のリンク書き換え・キューの更新は記事ごとに
+        アトミックに行うため、途中で中断しても次回は残りから再開できる。
+        """
+        stats = {'articles': 0, 'downloaded': 0, 'remaining': 0}
+        self.touched_paths = []
+        self.image_queue.load()
+        article_ids = sorted(self.image_queue.articles,
+                             key=lambda a: self.image_queue.articles[a].get('queued_at', ''))
+        if max_articles is not None:
+            article_ids = article_ids[:max_articles]
+        logger.info(f"画像キュー: {len(article_ids)}記事 / {self.image_queue.pending_images()}枚")
+
+        for article_id in article_ids:
+            if self.stop_requested.is_set():
+                logger.info("停止要求を受けたため画像の取得を中断します（残りは次回取得）")
+                break
+            result = self.drain_article(article_id)
+            stats['articles'] += 1
+            stats['downloaded'] += result['downloaded']
+
+        self.image_queue.load()
+        stats['remaining'] = self.image_queue.pending_images()
+        return stats
+
+    def rebuild_from_archive(self, workers: Optional[int] = None) -> Dict[str, int]:
+        """アーカイブした HTML から Markdown を並列に作り直す（ネットワークには接続しない）
+
+        day 番号・保存先は既存の記事ファイルに合わせる。アーカイブの最新版とローカルの
+        date_modified が異なる記事は、別の版で上書きしないようスキップする。
+        """
+        stats = {'rebuilt': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
+        self.touched_paths = []
+        local_articles = self.load_local_articles()
+        self.layout.load()
+
+        tasks = []
+        for article_id in self.archive.article_ids():
+            local = local_articles.get(article_id)
+            entry = self.archive.latest(article_id)
+            if local is None or entry is None:
+                logger.warning(f"  ローカルに記事が無いためスキップ: {article_id}")
+                stats['skipped'] += 1
+                continue
+            local_modified = local['frontmatter'].get('date_modified')
+            if entry['date_modified'] != local_modified:
+                logger.warning(f"  アーカイブの版 ({entry['date_modified']}) がローカル ({local_modified}) "
+                               f"と異なるためスキップ: {article_id}")
+                stats['skipped'] += 1
+                continue
+            tasks.append({
+                'entry': entry,
+                'day_number': local['frontmatter']['day_number'],
+                'filename': local['filepath'].relative_to(self.output_dir).as_posix(),
+                'image_subdir': (self.layout.articles or {}).get(article_id, {}).get('images') or article_id,
+                'known_images': self.state.get(article_id).get('images'),
+                'output_dir': str(self.output_dir),
+                'image_dir': str(self.image_dir),
+            })
+        logger.info(f"アーカイブから再生成: {len(tasks)}件（スキップ {stats['skipped']}件）")
+
+        results = []
+        if tasks:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [(task, pool.submit(rebuild_article, task)) for task in tasks]
+                for task, future in futures:
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        logger.error(f"✗ 再生成失敗 ({task['filename']}): {e}")
+                        stats['failed'] += 1
+
+        with self.state.transaction():
+            for result in results:
+                self.state.record_rebuild(result['article_id'], result['content_hash'], result['filename'])
+                if result['written']:
+                    stats['rebuilt'] += 1
+                    filepath = self.output_dir / result['filename']
+                    if result['previous'] is not None:
+                        # 変換処理の変更による作り直しは同じ版の書き換えとして扱う
+                        self.amend_revision(result['article_id'], result['previous'],
+                                            filepath.read_text(encoding='utf-8'))
+                    self.touched_paths.append(filepath)
+                else:
+                    stats['unchanged'] += 1
+        return stats
+
+    def apply_plan(self, plan: dict, fetched_at: Optional[datetime] = None) -> Dict[str, int]:
+        """計画どおりに記事を取得する（一覧取得・メタデータ確認はやり直さない）
+
+        記事は FetchScheduler の優先度順に処理し、時間切れ・停止要求で処理できなかった
+        記事は次回のために記録する。pipeline=True なら FetchPipeline で段ごとに並行して、
+        False なら1件ずつ順に処理する。
+        """
+        fetched_at = fetched_at or datetime.now()
+        stats = {'new': 0, 'updated': 0, 'skipped': 0, 'unchanged': 0, 'too_large': 0, 'remaining': 0}
+        self.touched_paths = []
+        self.memory_samples = []
+        self.worker_memory_samples = []
+        self.pipeline_report = None
+
+        ordered = self.scheduler.order(plan['articles'], self.state)
+        remaining = [entry for entry in ordered if entry['reason'] == 'deadline']
+        to_fetch = []
+        verified = []
+        for entry in ordered:
+            data = entry['article']
+            if entry['action'] != 'skip':
+                to_fetch.append(entry)
+                continue
+            if entry['reason'] == 'date-modified-unchanged':
+                logger.info(f"  ✓ 更新なし: {data['id']} ({entry['date_modified']})")
+                verified.append(data['id'])
+            elif entry['reason'] == 'not-checked':
+                logger.debug(f"  未確認のためスキップ: {data['id']}")
+            elif entry['reason'] == 'deadline':
+                logger.debug(f"  時間予算のため未確認: {data['id']}")
+            else:
+                logger.info(f"スキップ (既存): {data['title'] or data['id']}")
+            stats['skipped'] += 1
+
+        finished = []
+        if to_fetch and self.pipeline:
+            pipeline = FetchPipeline(self, parse_workers=self.parse_workers)
+            remaining.extend(pipeline.run(to_fetch, fetched_at, stats, finished))
+            self.pipeline_report = pipeline.report()
+        elif to_fetch:
+            remaining.extend(self._apply_sequential(to_fetch, fetched_at, stats, finished))
+
+        if verified:
+            # メタデータで変更なしを確認した記事は、次回の確認順を後ろにする
+            checked_at = date_parser.parse(plan['created_at'])
+            with self.state.transaction():
+                for article_id in verified:
+                    self.state.mark_verified(article_id, checked_at)
+        if remaining or self.scheduler.articles:
+            self.scheduler.record(remaining, finished + verified, fetched_at)
+        stats['remaining'] = len(remaining)
+        return stats
+
+    def should_stop(self) -> bool:
+        """停止要求・時間切れで次の記事を始めない場合 True（理由をログ出力）"""
+        if self.stop_requested.is_set():
+            logger.info("停止要求を受けたため処理を中断します")
+            return True
+        if not self.scheduler.can_start_article():
+            logger.info(f"⏱ 時間予算の残り{max(self.scheduler.time_left(), 0):.0f}秒では"
+                        f"次の記事を処理しきれないため中断します")
+            return True
+        return False
 
+    @staticmethod
+    def log_entry_reason(entry: dict):
+        if entry['reason'] == 'date-modified-changed':
+            logger.info(f"  🔄 更新検出: {entry['local_date_modified']} → {entry['date_modified']}")
+        elif entry['reason'] == 'no-date-modified':
+            logger.info(f"  ⚠ 更新日時情報なし - 再取得します")
+
+    def _apply_sequential(self, entries: List[dict], fetched_at: datetime, stats: Dict[str, int],
+                          finished: List[str]) -> List[dict]:
+        """1件ずつ取得から保存までを順に行う（記事ごとのピークRSSも測る）。処理しなかった記事を返す"""
+        for position, entry in enumerate(entries):
+            if self.should_stop():
+                return entries[position:]
+            self.log_entry_reason(entry)
+            stats['new' if entry['action'] == 'new' else 'updated'] += 1
+
+            article = article_from_metadata(entry['article'])
+            finished.append(article.id)
+            started = time.monotonic()
+            reset_peak_rss()
+            try:
+                saved_path = self.process_article(article, entry['day_number'], fetched_at, stats)
+                if saved_path:
+                    self.touched_paths.append(saved_path)
+                time.sleep(2)  # レート制限対策
+            except ResponseTooLarge as e:
+                logger.error(f"✗ サイズ上限超過のため中断 ({article.title}): {e}")
+                stats['too_large'] += 1
+                continue
             except Exception as e:
                 logger.error(f"✗ エラー ({article.title}): {e}")
                 continue
+            finally:
+                self.scheduler.observe(time.monotonic() - started)
+                peak = peak_rss_bytes()
+                if peak is not None:
+                    self.memory_samples.append((article.id, peak))
+        return []
+
+    def log_pipeline_report(self):
+        """パイプラインの段ごとの処理件数・スループット・キューの深さをログ出力"""
+        report = self.pipeline_report
+        if not report:
+            return
+        logger.info(f"\n🏭 パイプライン（{report['elapsed']:.1f}秒, parse/convert {report['parse_workers']}プロセス）:")
+        for name, stage in report['stages'].items():
+            throughput = stage['items'] / stage['busy'] if stage['busy'] else 0.0
+            line = f"  {name:7s} {stage['items']:4d}件  処理 {stage['busy']:6.1f}秒 ({throughput:5.1f}件/秒)"
+            if stage['queue_max'] is not None:
+                line += f"  出力キュー 最大{stage['queue_max']} / 平均{stage['queue_mean']:.1f}（上限{stage['queue_size']}）"
+            logger.info(line)
+
+    def log_memory_summary(self):
+        """記事ごとのピークRSSをログ出力（パイプラインでは parse/convert ワーカーの分も）"""
+        if not self.memory_samples:
+            return
+        logger.info(f"\n🧠 メモリ（記事ごとのピークRSS）:")
+        for label, samples in (('', self.memory_samples), ('parse/convert ワーカー ', self.worker_memory_samples)):
+            if not samples:
+                continue
+            peaks = sorted(peak for _, peak in samples)
+            worst_id, worst = max(samples, key=lambda x: x[1])
+            logger.info(f"  {label}中央値 {peaks[len(peaks) // 2] / 1024 / 1024:.1f}MB / "
+                        f"最大 {worst / 1024 / 1024:.1f}MB ({worst_id})")
+
+    def run(self, max_articles: Optional[int] = None, start_day: int = 1,
+            skip_existing: bool = False, update_check: bool = False,
+            plan: Optional[dict] = None, deadline: Optional[float] = None):
+        """メイン実行（plan を渡した場合は計画の作成を省略して実行のみ）
+
+        deadline（秒）を指定すると、その時間内に優先度の高い記事から処理し、
+        残りは次回に回す。
+        """
+        fetched_at = datetime.now()
+        self.scheduler.start(deadline)
+
+        logger.info("=" * 60)
+        logger.info("note.com記事取得スクリプト")
+        logger.info("=" * 60)
+
+        if plan is None:
+            with profiling.phase('plan'):
+                plan = self.build_plan(max_articles, start_day, skip_existing, update_check)
+        else:
+            update_check = plan.get('update_check', update_check)
+            logger.info(f"計画を実行: {len(plan['articles'])}件（{plan['created_at']} 作成）\n")
+
+        with profiling.phase('apply'):
+            stats = self.apply_plan(plan, fetched_at)
+        if (self.image_mode == 'inline' and self.image_queue.articles and not self.stop_requested.is_set()
+                and self.scheduler.can_start_article()):
+            # 以前 deferred で後回しにした画像が残っていれば、inline ではここで取得する
+            with profiling.phase('drain_images'):
+                self.drain_images()
 
         # 処理時間を計算
         elapsed_time = datetime.now() - fetched_at
@@ -738,12 +1906,23 @@ class NoteArticleScraper:
         logger.info(f"出力先: {self.output_dir}")
         logger.info(f"画像: {self.image_dir}")
         logger.info(f"処理時間: {elapsed_time.total_seconds():.1f}秒")
+        if stats['too_large']:
+            logger.info(f"サイズ上限超過: {stats['too_large']}件")
+        if stats['remaining']:
+            logger.info(f"⏱ 未処理: {stats['remaining']}件を {FetchScheduler.FILENAME} に記録（次回はここから処理）")
+        if self.image_mode == 'deferred' and self.image_queue.articles:
+            logger.info(f"画像キュー: {len(self.image_queue.articles)}記事 / "
+                        f"{self.image_queue.pending_images()}枚（--drain-images で取得）")
+        self.transport.log_summary()
+        self.log_pipeline_report()
+        self.log_memory_summary()
 
         if update_check:
             logger.info(f"\n📊 更新チェックモード統計:")
             logger.info(f"  🆕 新規記事: {stats['new']}件")
             logger.info(f"  🔄 更新された記事: {stats['updated']}件")
             logger.info(f"  ⏭️  スキップ: {stats['skipped']}件")
+            logger.info(f"  🟰 内容変化なし（書き込み省略）: {stats['unchanged']}件")
 
             if stats['skipped'] > 0:
                 logger.info(f"\n💡 効率化:")
@@ -755,6 +1934,311 @@ class NoteArticleScraper:
                 logger.info(f"\n📊 処理統計: {total_articles}件の記事を取得")
 
 
+class FetchPipeline:
+    """記事取得の段階パイプライン: 計画（一覧） → fetch → parse/convert → images → write
+
+    段の間は上限付きキューでつなぎ、後段が詰まると前段の put が待つ（背圧）。
+    fetch・images はスレッドで通信を待ち、parse/convert（BeautifulSoup・html2text・
+    画像URL抽出）はプロセスプールで実行して GIL で通信と直列にならないようにする。
+    書き込み（記事ファイル・取得状態・マニフェスト）は呼び出し元のスレッドだけが行う。
+    記事は計画の順のまま流れる。記事ごとのピークRSSは、メインプロセスでは書き込み段で
+    前の記事の書き込みからの区間（並行して取得中の記事の分を含む）を、parse/convert は
+    ワーカー内で記事1件の区間を測る。
+    """
+
+    STAGES = ('fetch', 'parse', 'images', 'write')
+    _DONE = object()
+
+    def __init__(self, scraper: NoteArticleScraper, parse_workers: int = 2, queue_size: int = 4):
+        self.scraper = scraper
+        self.parse_workers = parse_workers
+        # fetch → parse / parse → images（解析中の記事を含む） / images → write
+        self.queues = {
+            'fetch': queue.Queue(maxsize=queue_size),
+            'parse': queue.Queue(maxsize=max(parse_workers, 1) + queue_size),
+            'images': queue.Queue(maxsize=queue_size),
+        }
+        self.items = {name: 0 for name in self.STAGES}
+        self.busy = {name: 0.0 for name in self.STAGES}
+        self.depths: Dict[str, List[int]] = {name: [] for name in self.queues}
+        self.remaining: List[dict] = []
+        self.elapsed = 0.0
+
+    def _put(self, stage: str, item):
+        self.queues[stage].put(item)
+        if item is not self._DONE:
+            self.depths[stage].append(self.queues[stage].qsize())
+
+    def _measure(self, stage: str, seconds: float):
+        self.items[stage] += 1
+        self.busy[stage] += seconds
+
+    def _fetch_stage(self, entries: List[dict]):
+        """ページを取得する（停止要求・時間切れなら残りを記録して終了）"""
+        try:
+            for position, entry in enumerate(entries):
+                if self.scraper.should_stop():
+                    self.remaining = entries[position:]
+                    break
+                self.scraper.log_entry_reason(entry)
+                item = {'entry': entry, 'article': article_from_metadata(entry['article'])}
+                started = time.monotonic()
+                try:
+                    item['html'] = self.scraper.fetch_page(item['article'])
+                except Exception as e:
+                    item['error'] = e
+                self._measure('fetch', time.monotonic() - started)
+                self._put('fetch', item)
+                if position < len(entries) - 1:
+                    time.sleep(2)  # レート制限対策
+                self.scraper.scheduler.observe(time.monotonic() - started)
+        finally:
+            self._put('fetch', self._DONE)
+
+    def _parse_stage(self, pool: Optional[ProcessPoolExecutor]):
+        """解析・変換をプロセスプールに投入する（pool が無ければこのスレッドで実行）"""
+        while True:
+            item = self.queues['fetch'].get()
+            if item is self._DONE:
+                break
+            if 'error' not in item:
+                args = (parse_article_page, item['entry']['article'], item['html'])
+                if pool is not None:
+                    item['future'] = pool.submit(measured_call, *args)
+                else:
+                    try:
+                        item['parsed'] = timed_call(*args)
+                    except Exception as e:
+                        item['error'] = e
+            self._put('parse', item)
+        self._put('parse', self._DONE)
+
+    def _image_stage(self):
+        """解析結果を受け取り、アーカイブ・内容ハッシュの比較・画像の取得を行う"""
+        while True:
+            item = self.queues['parse'].get()
+            if item is self._DONE:
+                break
+            if 'error' not in item:
+                try:
+                    if 'future' in item:
+                        detail, seconds, item['worker_peak'] = item.pop('future').result()
+                    else:
+                        detail, seconds = item.pop('parsed')
+                    self._measure('parse', seconds)
+                    self.scraper.archive_page(item['article'], item.pop('html'), detail.date_modified)
+                    self.scraper.log_article_detail(detail)
+                    started = time.monotonic()
+                    item['prepared'] = self.scraper.prepare_article(detail, item['entry']['day_number'])
+                    self._measure('images', time.monotonic() - started)
+                except Exception as e:
+                    item['error'] = e
+            item.pop('html', None)
+            self._put('images', item)
+        self._put('images', self._DONE)
+
+    def run(self, entries: List[dict], fetched_at: datetime, stats: Dict[str, int],
+            finished: List[str]) -> List[dict]:
+        """パイプラインを実行し、処理しなかった記事を返す"""
+        started = time.monotonic()
+        pool = None
+        if self.parse_workers > 0:
+            pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+            # ワーカーはスレッドを起動する前に fork しておく（ロックを持ったまま複製しないため）
+            pool.submit(int).result()
+        reset_peak_rss()
+        threads = [
+            threading.Thread(target=self._fetch_stage, args=(entries,), name='fetch', daemon=True),
+            threading.Thread(target=self._parse_stage, args=(pool,), name='parse', daemon=True),
+            threading.Thread(target=self._image_stage, name='images', daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = self.queues['images'].get()
+                if item is self._DONE:
+                    break
+                self._write(item, fetched_at, stats, finished)
+            for thread in threads:
+                thread.join()
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        self.elapsed = time.monotonic() - started
+        return self.remaining
+
+    def _write(self, item: dict, fetched_at: datetime, stats: Dict[str, int], finished: List[str]):
+        """書き込み段（呼び出し元のスレッド）"""
+        entry = item['entry']
+        article = item['article']
+        finished.append(article.id)
+        stats['new' if entry['action'] == 'new' else 'updated'] += 1
+        error = item.get('error')
+        if isinstance(error, ResponseTooLarge):
+            logger.error(f"✗ サイズ上限超過のため中断 ({article.title}): {error}")
+            stats['too_large'] += 1
+            return
+        if error is not None:
+            logger.error(f"✗ エラー ({article.title}): {error}")
+            return
+
+        started = time.monotonic()
+        try:
+            if item['prepared'] is None:
+                with self.scraper.state.transaction():
+                    self.scraper.state.mark_verified(article.id, fetched_at)
+                stats['unchanged'] += 1
+            else:
+                self.scraper.touched_paths.append(self.scraper.write_article(item['prepared'], fetched_at))
+        except Exception as e:
+            logger.error(f"✗ エラー ({article.title}): {e}")
+        finally:
+            self._measure('write', time.monotonic() - started)
+            self._sample_memory(article.id, item.get('worker_peak'))
+
+    def _sample_memory(self, article_id: str, worker_peak: Optional[int]):
+        """前の記事の書き込みからのピークRSSを記事の値として記録し、次の区間のために戻す"""
+        peak = peak_rss_bytes()
+        if peak is not None:
+            self.scraper.memory_samples.append((article_id, peak))
+        if worker_peak is not None:
+            self.scraper.worker_memory_samples.append((article_id, worker_peak))
+        reset_peak_rss()
+
+    def report(self) -> dict:
+        """段ごとの処理件数・処理時間（parse はワーカーの合計）・出力キューの深さ"""
+        stages = {}
+        for name in self.STAGES:
+            depths = self.depths.get(name)
+            stages[name] = {
+                'items': self.items[name],
+                'busy': round(self.busy[name], 3),
+                'queue_size': self.queues[name].maxsize if name in self.queues else None,
+                'queue_max': max(depths) if depths else (0 if depths is not None else None),
+                'queue_mean': sum(depths) / len(depths) if depths else 0.0,
+            }
+        return {'elapsed': round(self.elapsed, 3), 'parse_workers': self.parse_workers, 'stages': stages}
+
+
+class WatchDaemon:
+    """常駐してプロフィールを定期ポーリングし、新規・更新記事だけを取得する
+
+    通常のポーリングは一覧取得と新規記事の確認だけを行い、既存記事の
+    dateModified 確認は recheck_interval ごとにまとめて行う。失敗時は
+    指数バックオフ（ジッタ付き）で間隔を広げる。
+    """
+
+    def __init__(self, scraper: NoteArticleScraper, interval: float = 900,
+                 recheck_interval: float = 6 * 3600, max_backoff: float = 3600,
+                 status_path: Optional[Path] = None):
+        self.scraper = scraper
+        self.interval = interval
+        self.recheck_interval = recheck_interval
+        self.max_backoff = max_backoff
+        self.status_path = status_path or scraper.output_dir / '.watch_status.json'
+        self.stop_event = scraper.stop_requested
+        self.last_recheck = 0.0
+        self.failures = 0
+        self.style_tracker = None
+        self.status = {
+            'pid': os.getpid(),
+            'started_at': datetime.now().isoformat(),
+            'polls': 0,
+            'errors': 0,
+            'new': 0,
+            'updated': 0,
+            'unchanged': 0,
+        }
+
+    def request_stop(self, signum=None, frame=None):
+        """SIGTERM / SIGINT で呼ばれる（処理中の記事が終わったら停止）"""
+        logger.info("停止シグナルを受信しました。現在の処理が終わり次第終了します")
+        self.stop_event.set()
+
+    def next_delay(self) -> float:
+        """次のポーリングまでの待ち時間（失敗時は指数バックオフ、±10%のジッタ）"""
+        base = self.interval
+        if self.failures:
+            base = min(self.interval * (2 ** self.failures), self.max_backoff)
+        return base * random.uniform(0.9, 1.1)
+
+    def poll_once(self) -> dict:
+        """1回分のポーリング"""
+        recheck = time.monotonic() - self.last_recheck >= self.recheck_interval
+        with profiling.phase('plan'):
+            plan = self.scraper.build_plan(update_check=True, only_new=not recheck)
+        with profiling.phase('apply'):
+            stats = self.scraper.apply_plan(plan)
+        if recheck and not self.stop_event.is_set():
+            self.last_recheck = time.monotonic()
+        if self.scraper.touched_paths:
+            with profiling.phase('refresh_downstream'):
+                self.refresh_downstream(self.scraper.touched_paths)
+        if (self.scraper.image_mode == 'deferred' and self.scraper.image_queue.articles
+                and not self.stop_event.is_set()):
+            # 本文を反映した後で、後回しにした画像を取得する
+            with profiling.phase('drain_images'):
+                self.scraper.drain_images()
+        return stats
+
+    def refresh_downstream(self, touched: List[Path]):
+        """更新された記事に関係する派生データだけを更新"""
+        logger.info(f"派生データを更新: {len(touched)}記事")
+        try:
+            if self.style_tracker is None:
+                from analyze_style import StyleDriftTracker
+                self.style_tracker = StyleDriftTracker(self.scraper.output_dir.parent)
+            # 更新された記事だけを照合し、mtime が変わっていればメトリクスを再計算する
+            recomputed = self.style_tracker.refresh(touched)
+            logger.info(f"  文体メトリクス: {recomputed}記事を再計算")
+        except Exception as e:
+            logger.warning(f"  文体メトリクスの更新に失敗: {e}")
+
+    def write_status(self, **fields):
+        """ステータスファイルを更新"""
+        self.status.update(fields)
+        atomic_write_text(self.status_path, json.dumps(self.status, ensure_ascii=False, indent=2) + '\n')
+
+    def run(self):
+        """停止要求まで常駐"""
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        logger.info(f"常駐モード開始: 間隔 {self.interval:.0f}秒 / 既存記事の再確認 {self.recheck_interval:.0f}秒ごと")
+        logger.info(f"ステータス: {self.status_path}")
+
+        while not self.stop_event.is_set():
+            started = time.monotonic()
+            poll_at = datetime.now()
+            try:
+                stats = self.poll_once()
+                self.failures = 0
+                for key in ('new', 'updated', 'unchanged'):
+                    self.status[key] += stats[key]
+                last_error = None
+            except Exception as e:
+                self.failures += 1
+                self.status['errors'] += 1
+                last_error = str(e)
+                logger.error(f"✗ ポーリング失敗 ({self.failures}回連続): {e}")
+
+            delay = self.next_delay()
+            self.status['polls'] += 1
+            self.write_status(
+                last_poll_at=poll_at.isoformat(),
+                last_poll_seconds=round(time.monotonic() - started, 3),
+                last_error=last_error,
+                consecutive_failures=self.failures,
+                next_poll_at=datetime.fromtimestamp(time.time() + delay).isoformat(),
+                http=self.scraper.transport.summary(),
+            )
+            self.stop_event.wait(delay)
+
+        self.write_status(stopped_at=datetime.now().isoformat(), next_poll_at=None)
+        self.scraper.transport.close()
+        logger.info("常駐モードを終了しました")
+
+
 def main():
     """メイン関数"""
     parser = argparse.ArgumentParser(
@@ -801,32 +2285,248 @@ def main():
         action='store_true',
         help='更新チェックモード: ローカルファイルとWeb側のdateModifiedを比較し、更新された記事のみ取得'
     )
+    parser.add_argument(
+        '--images',
+        choices=NoteArticleScraper.IMAGE_MODES,
+        default='inline',
+        help='画像の取得: inline=本文と一緒に取得 / deferred=本文を先に保存し画像はキューに積む / '
+             'skip=取得しない (デフォルト: inline)'
+    )
+    parser.add_argument(
+        '--layout',
+        choices=LAYOUTS,
+        default=None,
+        help='新しいコーパスの配置: flat=articles/*.md / sharded=articles/<著者>/<年>/<月>/ '
+             '(デフォルト: 既存の配置。既存コーパスは corpus_layout.py migrate で移行)'
+    )
+    parser.add_argument(
+        '--drain-images',
+        action='store_true',
+        help='deferred で積んだ画像キューを取得して記事のリンクを書き換え、終了（中断しても次回は続きから）'
+    )
+    parser.add_argument(
+        '--archive-dir',
+        type=Path,
+        default=None,
+        help='取得したページHTMLの圧縮アーカイブ (デフォルト: 出力先と同じ階層の archive)'
+    )
+    parser.add_argument(
+        '--no-archive',
+        action='store_true',
+        help='ページHTMLをアーカイブしない'
+    )
+    parser.add_argument(
+        '--history-dir',
+        type=Path,
+        default=None,
+        help='記事の版の履歴 (デフォルト: 出力先と同じ階層の history)'
+    )
+    parser.add_argument(
+        '--no-history',
+        action='store_true',
+        help='上書きする記事の版の履歴を残さない'
+    )
+    parser.add_argument(
+        '--rebuild-from-archive',
+        action='store_true',
+        help='取得せずにアーカイブのHTMLから全記事のMarkdownを並列に作り直して終了（変換処理を変えたとき用）'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='--rebuild-from-archive の並列プロセス数 (デフォルト: CPU数)'
+    )
+    parser.add_argument(
+        '--optimize-images',
+        action='store_true',
+        help='取得後に画像の軽量版（WebP・最大幅1200px）を並列生成（要Pillow）'
+    )
+    parser.add_argument(
+        '--parse-workers',
+        type=int,
+        default=2,
+        help='解析・Markdown変換のプロセス数（0 でスレッドで実行, デフォルト: 2）'
+    )
+    parser.add_argument(
+        '--sequential',
+        action='store_true',
+        help='パイプラインを使わず1件ずつ取得・変換・保存する（記事ごとのピークRSSを測る）'
+    )
+    parser.add_argument(
+        '--deadline',
+        type=float,
+        default=None,
+        metavar='SECONDS',
+        help='時間予算（秒）: 新規 → 更新 → 確認が古い順に処理し、時間内に終わらない分は次回に回す'
+    )
+    parser.add_argument(
+        '--http-backend',
+        choices=['auto', 'requests', 'http2'],
+        default='auto',
+        help='HTTPバックエンド (デフォルト: auto = httpx[http2]があればHTTP/2)'
+    )
+    parser.add_argument(
+        '--pool-size',
+        type=int,
+        default=4,
+        help='ホストごとの最大接続数 (デフォルト: 4)'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=30.0,
+        help='読み込みタイムアウト秒 (デフォルト: 30)'
+    )
+    parser.add_argument(
+        '--max-page-mb',
+        type=float,
+        default=5.0,
+        help='ページ1件あたりの読み込み上限MB（展開後） (デフォルト: 5)'
+    )
+    parser.add_argument(
+        '--max-image-mb',
+        type=float,
+        default=20.0,
+        help='画像1枚あたりの読み込み上限MB (デフォルト: 20)'
+    )
+    parser.add_argument(
+        '--plan',
+        nargs='?',
+        const='-',
+        metavar='PLAN_JSON',
+        help='ドライラン: 一覧とメタデータだけを確認して処理計画を出力（ファイル省略時は標準出力）'
+    )
+    parser.add_argument(
+        '--apply-plan',
+        type=Path,
+        metavar='PLAN_JSON',
+        help='--plan で作成した計画を確認処理なしでそのまま実行'
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='常駐モード: 定期的にポーリングし、新規・更新記事だけを取得（SIGTERMで終了）'
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=900,
+        help='常駐モードのポーリング間隔秒 (デフォルト: 900)'
+    )
+    parser.add_argument(
+        '--recheck-interval',
+        type=float,
+        default=6 * 3600,
+        help='常駐モードで既存記事の更新を確認する間隔秒 (デフォルト: 21600)'
+    )
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
         help='詳細ログを表示'
     )
+    profiling.add_arguments(parser)
 
     args = parser.parse_args()
 
     if args.verbose:
         logger.setLevel(logging.DEBUG)
 
+    with profiling.session(args, 'fetch_note_articles'):
+        run(args)
+
+
+def run(args):
+    """引数に従ってスクレイパーを実行"""
     # スクレイパーを実行
-    scraper = NoteArticleScraper(
-        username=args.username,
-        base_dir=Path.cwd(),
-        image_dir=args.image_dir,
-        output_dir=args.output_dir
-    )
+    try:
+        scraper = NoteArticleScraper(
+            username=args.username,
+            base_dir=Path.cwd(),
+            image_dir=args.image_dir,
+            output_dir=args.output_dir,
+            transport_config=TransportConfig(
+                pool_maxsize=args.pool_size,
+                read_timeout=args.timeout,
+                backend=args.http_backend,
+                max_page_bytes=int(args.max_page_mb * 1024 * 1024),
+                max_image_bytes=int(args.max_image_mb * 1024 * 1024)
+            ),
+            image_mode=args.images,
+            layout=args.layout,
+            archive_dir=None if args.no_archive else (args.archive_dir or args.output_dir.parent / 'archive'),
+            history_dir=None if args.no_history else (args.history_dir or args.output_dir.parent / 'history'),
+            pipeline=not args.sequential,
+            parse_workers=args.parse_workers
+        )
+    except ValueError as e:
+        logger.error(str(e))
+        return
+
+    if args.rebuild_from_archive:
+        if scraper.archive is None:
+            logger.error("--rebuild-from-archive と --no-archive は同時に指定できません")
+            return
+        with profiling.phase('rebuild'):
+            stats = scraper.rebuild_from_archive(workers=args.workers)
+        logger.info(f"\n♻️  アーカイブから再生成: 書き換え {stats['rebuilt']}件 / 変化なし {stats['unchanged']}件 / "
+                    f"スキップ {stats['skipped']}件 / 失敗 {stats['failed']}件")
+        return
+
+    if args.drain_images:
+        signal.signal(signal.SIGTERM, lambda signum, frame: scraper.stop_requested.set())
+        signal.signal(signal.SIGINT, lambda signum, frame: scraper.stop_requested.set())
+        with profiling.phase('drain_images'):
+            stats = scraper.drain_images(max_articles=args.max_articles)
+        logger.info(f"\n🖼  画像キュー: {stats['articles']}記事 / {stats['downloaded']}枚を反映、"
+                    f"残り {stats['remaining']}枚")
+        scraper.transport.log_summary()
+        return
+
+    if args.watch:
+        WatchDaemon(scraper, interval=args.interval,
+                    recheck_interval=args.recheck_interval).run()
+        return
+
+    if args.plan:
+        scraper.scheduler.start(args.deadline)
+        with profiling.phase('plan'):
+            plan = scraper.build_plan(
+                max_articles=args.max_articles,
+                start_day=args.start_day,
+                skip_existing=args.skip_existing,
+                update_check=args.update_check
+            )
+        scraper.log_plan(plan)
+        plan_json = json.dumps(plan, ensure_ascii=False, indent=2)
+        if args.plan == '-':
+            print(plan_json)
+        else:
+            atomic_write_text(Path(args.plan), plan_json + '\n')
+            logger.info(f"計画を保存しました: {args.plan}")
+        return
+
+    plan = None
+    if args.apply_plan:
+        plan = json.loads(args.apply_plan.read_text(encoding='utf-8'))
 
     scraper.run(
         max_articles=args.max_articles,
         start_day=args.start_day,
         skip_existing=args.skip_existing,
-        update_check=args.update_check
+        update_check=args.update_check,
+        plan=plan,
+        deadline=args.deadline
     )
 
+    if args.optimize_images:
+        from optimize_images import ImageOptimizer, PIL_AVAILABLE, print_report
+        if not PIL_AVAILABLE:
+            logger.warning("Pillow がインストールされていないため画像最適化をスキップします")
+        else:
+            with profiling.phase('optimize_images'):
+                print_report(ImageOptimizer(args.image_dir).run())
+
 
 if __name__ == '__main__':
     main()
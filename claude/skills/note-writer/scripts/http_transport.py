@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+http_transport.py - note.com 取得処理で共有する HTTP トランスポート
+
+ページ・画像のすべてのリクエストを1つのコネクションプールに集約し、
+keep-alive の再利用・gzip/brotli 圧縮・タイムアウトを一元管理する。
+httpx と h2 がインストールされていれば HTTP/2 バックエンドも選べる。
+
+ホストごとのリクエスト数・新規接続数・転送バイト数（圧縮後）を集計し、
+summary() で確認できる。
+
+read_bounded() はレスポンスをチャンク単位で読み、Content-Type ごとの
+バイト上限（展開後）を超えた時点で接続を切って ResponseTooLarge を送出する。
+
+依存パッケージ:
+    pip install requests
+    pip install brotli        # 任意: brotli 圧縮
+    pip install 'httpx[http2]'  # 任意: HTTP/2 バックエンド
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# オプション: brotli（urllib3 / httpx はインストールされていれば自動で展開する）
+try:
+    import brotli  # noqa: F401
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+
+# オプション: HTTP/2 バックエンド
+try:
+    import httpx
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+@dataclass
+class TransportConfig:
+    """トランスポート設定"""
+    pool_connections: int = 8     # プールを保持するホスト数
+    pool_maxsize: int = 4         # ホストごとの最大接続数
+    connect_timeout: float = 10.0
+    read_timeout: float = 30.0
+    backend: str = 'auto'         # auto / requests / http2
+    user_agent: str = DEFAULT_USER_AGENT
+    max_page_bytes: int = 5 * 1024 * 1024     # HTML・JSON など画像以外の上限（展開後）
+    max_image_bytes: int = 20 * 1024 * 1024   # 画像の上限
+    max_redirects: int = 5
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    """バイト上限を超えたため読み込みを中断した"""
+
+
+@dataclass
+class BoundedResponse:
+    """read_bounded() の結果（本文は上限以下であることが保証される）"""
+    url: str
+    status_code: int
+    headers: Dict[str, str]
+    content: bytes = b''
+    size: int = 0                          # 読み込んだバイト数（展開後）
+    declared_size: Optional[int] = None    # Content-Length（圧縮時は転送サイズ）
+    complete: bool = True                  # until で途中終了した場合は False
+    limit: int = 0
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', 'replace')
+
+
+@dataclass
+class HostStats:
+    """ホストごとの集計"""
+    requests: int = 0
+    connections: int = 0
+    wire_bytes: int = 0
+    body_bytes: int = 0
+    aborted: int = 0
+
+    @property
+    def reused(self) -> int:
+        return max(self.requests - self.connections, 0)
+
+
+class HTTPTransport:
+    """requests / httpx(HTTP/2) を切り替えられる共有トランスポート
+
+    get() の戻り値は requests.Response 互換（status_code, headers, text,
+    content, raise_for_status）。ステータスエラーは requests.exceptions.HTTPError
+    に揃えるため、呼び出し側はバックエンドを意識しなくてよい。
+    """
+
+    def __init__(self, config: Optional[TransportConfig] = None):
+        self.config = config or TransportConfig()
+        self.accept_encoding = 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate'
+        self._stats: Dict[str, HostStats] = defaultdict(HostStats)
+        self._lock = threading.Lock()
+
+        backend = self.config.backend
+        if backend == 'auto':
+            backend = 'http2' if HTTP2_AVAILABLE else 'requests'
+        if backend == 'http2' and not HTTP2_AVAILABLE:
+            logger.warning("httpx[http2] が見つからないため requests バックエンドを使用します")
+            backend = 'requests'
+        self.backend = backend
+
+        headers = {
+            'User-Agent': self.config.user_agent,
+            'Accept-Encoding': self.accept_encoding,
+            'Connection': 'keep-alive',
+        }
+        if self.backend == 'http2':
+            self.client = httpx.Client(
+                http2=True,
+                headers=headers,
+                follow_redirects=True,
+                max_redirects=self.config.max_redirects,
+                timeout=httpx.Timeout(self.config.read_timeout, connect=self.config.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.config.pool_connections * self.config.pool_maxsize,
+                    max_keepalive_connections=self.config.pool_connections * self.config.pool_maxsize,
+                ),
+            )
+            self.session = None
+        else:
+            self.session = requests.Session()
+            self.session.headers.update(headers)
+            self.session.max_redirects = self.config.max_redirects
+            self.adapter = HTTPAdapter(
+                pool_connections=self.config.pool_connections,
+                pool_maxsize=self.config.pool_maxsize,
+                max_retries=0,
+                pool_block=False,
+            )
+            self.session.mount('https://', self.adapter)
+            self.session.mount('http://', self.adapter)
+            self.client = None
+
+    def get(self, url: str, timeout: Optional[Tuple[float, float]] = None,
+            stream: bool = False, raise_for_status: bool = True, **kwargs):
+        """GET リクエスト（ステータスエラーは requests.exceptions.HTTPError）"""
+        timeout = timeout or self.config.timeout
+        if self.client is not None:
+            response = self._get_http2(url, timeout, stream, **kwargs)
+        else:
+            response = self.session.get(url, timeout=timeout, stream=stream, **kwargs)
+            if not stream:
+                self._record(url, response)
+        if raise_for_status:
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError:
+                if stream:
+                    response.close()
+                raise
+        return response
+
+    def limit_for(self, content_type: str) -> int:
+        """Content-Type に応じたバイト上限"""
+        if content_type.split(';')[0].strip().lower().startswith('image/'):
+            return self.config.max_image_bytes
+        return self.config.max_page_bytes
+
+    def read_bounded(self, url: str, limit: Optional[int] = None,
+                     until: Optional[Callable[[bytes], bool]] = None,
+                     sink: Optional[BinaryIO] = None,
+                     chunk_size: int = 64 * 1024,
+                     timeout: Optional[Tuple[float, float]] = None) -> BoundedResponse:
+        """上限付きでレスポンスを読む
+
+        limit を省略すると Content-Type から上限を決める。Content-Length が上限を
+        超えていれば本文を読まずに、読み込み中に超えればその時点で中断する。
+        until はチャンクごとに呼ばれ、True を返すと残りを読まずに終了する。
+        sink を渡すと本文はメモリに溜めずに書き出す。
+        """
+        response = self.get(url, timeout=timeout, stream=True)
+        result = BoundedResponse(url=url, status_code=response.status_code,
+                                 headers=dict(response.headers))
+        size = 0
+        try:
+            result.limit = limit or self.limit_for(response.headers.get('Content-Type', ''))
+            declared = response.headers.get('Content-Length', '')
+            if declared.isdigit():
+                result.declared_size = int(declared)
+                if result.declared_size > result.limit:
+                    raise ResponseTooLarge(
+                        f"Content-Length {result.declared_size} が上限 {result.limit} を超えています: {url}")
+
+            chunks = []
+            for chunk in response.iter_content(chunk_size):
+                size += len(chunk)
+                if size > result.limit:
+                    raise ResponseTooLarge(f"{result.limit}バイトを超えたため中断しました: {url}")
+                if sink is not None:
+                    sink.write(chunk)
+                else:
+                    chunks.append(chunk)
+                if until is not None and until(chunk):
+                    result.complete = False
+                    break
+            result.content = b''.join(chunks)
+            result.size = size
+        except ResponseTooLarge:
+            with self._lock:
+                self._stats[urlparse(url).netloc].aborted += 1
+            raise
+        finally:
+            response.close()
+            self.record_streamed(url, response, self._wire_bytes(response, size), size)
+        return result
+
+    def _get_http2(self, url: str, timeout, stream: bool, **kwargs):
+        try:
+            if stream:
+                request = self.client.build_request('GET', url, timeout=httpx.Timeout(timeout[1], connect=timeout[0]), **kwargs)
+                response = self.client.send(request, stream=True)
+            else:
+                response = self.client.get(url, timeout=httpx.Timeout(timeout[1], connect=timeout[0]), **kwargs)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+        wrapped = _HTTPXResponse(response)
+        if not stream:
+            self._record(url, wrapped)
+        return wrapped
+
+    def record_streamed(self, url: str, response, wire_bytes: int, body_bytes: int):
+        """stream=True で読み終えたレスポンスを集計に加える"""
+        self._add(url, wire_bytes, body_bytes)
+
+    def _record(self, url: str, response):
+        body_bytes = len(response.content)
+        self._add(url, self._wire_bytes(response, body_bytes), body_bytes)
+
+    @staticmethod
+    def _wire_bytes(response, body_bytes: int) -> int:
+        raw = getattr(response, 'raw', None)
+        if raw is not None and hasattr(raw, 'tell'):
+            try:
+                # urllib3 は展開前（ネットワーク上）のバイト数を返す
+                return raw.tell() or body_bytes
+            except Exception:
+                return body_bytes
+        if hasattr(response, 'num_bytes_downloaded'):
+            return response.num_bytes_downloaded
+        return body_bytes
+
+    def _add(self, url: str, wire_bytes: int, body_bytes: int):
+        host = urlparse(url).netloc
+        with self._lock:
+            stats = self._stats[host]
+            stats.requests += 1
+            stats.wire_bytes += wire_bytes
+            stats.body_bytes += body_bytes
+
+    def _connection_counts(self) -> Dict[str, int]:
+        """urllib3 のプールから新規接続数を取得"""
+        counts: Dict[str, int] = {}
+        if self.session is None:
+            return counts
+        pools = self.adapter.poolmanager.pools
+        for pool_key in pools.keys():
+            pool = pools[pool_key]
+            host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+            counts[host] = counts.get(host, 0) + pool.num_connections
+        return counts
+
+    def summary(self) -> Dict[str, Dict]:
+        """ホストごとの統計を返す"""
+        connections = self._connection_counts()
+        result = {}
+        with self._lock:
+            for host, stats in self._stats.items():
+                if host in connections:
+                    stats.connections = connections[host]
+                result[host] = {
+                    'requests': stats.requests,
+                    'connections': stats.connections if self.session is not None else None,
+                    'reused': stats.reused if self.session is not None else None,
+                    'wire_bytes': stats.wire_bytes,
+                    'body_bytes': stats.body_bytes,
+                    'aborted': stats.aborted,
+                }
+        return result
+
+    def log_summary(self):
+        """統計をログ出力"""
+        summary = self.summary()
+        if not summary:
+            return
+        logger.info(f"\n🌐 HTTP統計 (backend={self.backend}, Accept-Encoding={self.accept_encoding}):")
+        for host, s in sorted(summary.items()):
+            conn = f"接続 {s['connections']} / 再利用 {s['reused']}" if s['connections'] is not None else "HTTP/2 多重化"
+            logger.info(f"  {host}: {s['requests']}リクエスト, {conn}, "
+                        f"転送 {s['wire_bytes'] / 1024:.1f}KB (展開後 {s['body_bytes'] / 1024:.1f}KB)")
+            if s['aborted']:
+                logger.info(f"    ⚠ 上限超過で中断: {s['aborted']}件")
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+        if self.session is not None:
+            self.session.close()
+
+
+class _HTTPXResponse:
+    """httpx.Response を requests.Response 互換に見せるラッパー"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.encoding = response.encoding
+
+    @property
+    def content(self) -> bytes:
+        return self._response.content
+
+    @property
+    def text(self) -> str:
+        return self._response.text
+
+    @property
+    def num_bytes_downloaded(self) -> int:
+        return self._response.num_bytes_downloaded
+
+    def iter_content(self, chunk_size: int = 65536):
+        return self._response.iter_bytes(chunk_size)
+
+    def close(self):
+        self._response.close()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} Error for url: {self.url}", response=self
+            )
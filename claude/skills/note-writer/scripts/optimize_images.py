@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+optimize_images.py - corpus/images の画像を縮小・再圧縮した軽量版を生成
+
+使用方法:
+    python3 optimize_images.py [--image-dir corpus/images] [--max-width 1200]
+                               [--format webp|jpeg] [--quality 80]
+                               [--workers N] [--remove-originals]
+
+出力:
+    corpus/images/<article_id>/image_N.w<幅>.<拡張子> を生成
+    corpus/images/manifest.json に寸法・バイト数・ハッシュを記録
+
+    軽量版が元画像より小さい画像は、記事内のリンクと .fetch_state.json の画像パスを
+    軽量版に書き換える。元画像は既定では参照されないバックアップとして残し、
+    --remove-originals で削除する。
+
+    再実行時は元画像のハッシュが manifest と一致し、生成物が残っていれば
+    処理をスキップする（冪等）。
+
+依存パッケージ:
+    pip install Pillow
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from corpus_layout import FETCH_STATE_FILENAME, list_articles, read_frontmatter, state_lock
+from revision_store import RevisionStore
+
+# オプション: 画像処理用（インストールされていない場合は処理不可）
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+SOURCE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+MANIFEST_FILENAME = 'manifest.json'
+# 生成物（image_1.w1200.webp など）は元画像として扱わない
+VARIANT_PATTERN = re.compile(r'\.w\d+$')
+FORMAT_EXTENSIONS = {'webp': '.webp', 'jpeg': '.jpg'}
+
+
+def file_sha256(filepath: Path) -> str:
+    """ファイル内容のSHA-256を計算"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def uses_variant(entry: Dict) -> bool:
+    """記事から生成物を参照するか（元画像より小さい場合だけ）"""
+    return entry['variant']['bytes'] < entry['bytes']
+
+
+def variant_path(source: Path, max_width: int, fmt: str) -> Path:
+    """生成物のパスを返す"""
+    return source.with_name(f"{source.stem}.w{max_width}{FORMAT_EXTENSIONS[fmt]}")
+
+
+def optimize_one(task: Dict) -> Dict:
+    """1枚の画像を縮小・再圧縮する（プロセスプールのワーカーで実行）"""
+    source = Path(task['source'])
+    target = Path(task['target'])
+    fmt = task['format']
+
+    with Image.open(source) as img:
+        width, height = img.size
+        if getattr(img, 'is_animated', False):
+            # アニメーションGIFなどは変換すると崩れるため対象外
+            return {'source': task['source'], 'skipped': 'animated'}
+
+        if width > task['max_width']:
+            new_height = max(1, round(height * task['max_width'] / width))
+            img = img.resize((task['max_width'], new_height), Image.LANCZOS)
+
+        if fmt == 'jpeg':
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            save_kwargs = {'quality': task['quality'], 'optimize': True, 'progressive': True}
+        else:
+            if img.mode not in ('RGB', 'RGBA', 'L'):
+                img = img.convert('RGBA')
+            save_kwargs = {'quality': task['quality'], 'method': 6}
+
+        # 途中で中断しても壊れたファイルを残さない
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix='.tmp')
+        os.close(fd)
+        try:
+            img.save(tmp_path, format=fmt.upper(), **save_kwargs)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        out_width, out_height = img.size
+
+    return {
+        'source': task['source'],
+        'sha256': task['sha256'],
+        'width': width,
+        'height': height,
+        'bytes': source.stat().st_size,
+        'variant': {
+            'path': target.name,
+            'format': fmt,
+            'width': out_width,
+            'height': out_height,
+            'bytes': target.stat().st_size,
+        },
+    }
+
+
+class ImageOptimizer:
+    """画像の軽量版を並列生成し、manifest で管理するクラス"""
+
+    def __init__(self, image_dir: Path, max_width: int = 1200, fmt: str = 'webp',
+                 quality: int = 80, workers: Optional[int] = None):
+        self.image_dir = Path(image_dir)
+        self.max_width = max_width
+        self.format = fmt
+        self.quality = quality
+        self.workers = workers
+        self.manifest_path = self.image_dir / MANIFEST_FILENAME
+        self.manifest: Dict[str, dict] = self.load_manifest()
+
+    def load_manifest(self) -> Dict[str, dict]:
+        """manifest.json を読み込む"""
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            return json.loads(self.manifest_path.read_text(encoding='utf-8')).get('images', {})
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save_manifest(self):
+        """manifest.json をアトミックに保存"""
+        data = json.dumps({'version': 1, 'images': self.manifest},
+                          ensure_ascii=False, indent=2, sort_keys=True) + '\n'
+        tmp_path = self.manifest_path.with_suffix('.json.tmp')
+        tmp_path.write_text(data, encoding='utf-8')
+        os.replace(tmp_path, self.manifest_path)
+
+    def find_sources(self, article_ids: Optional[List[str]] = None) -> List[Path]:
+        """元画像の一覧を返す（生成物は除く）"""
+        if article_ids is not None:
+            # sharded 配置では images/<著者>/<年>/<月>/<記事ID>/
+            dirs = [d for a in article_ids
+                    for d in ([self.image_dir / a] if (self.image_dir / a).is_dir()
+                              else sorted(self.image_dir.glob(f"*/*/*/{a}")))]
+        else:
+            dirs = sorted({p.parent for p in self.image_dir.rglob('*')
+                           if p.is_file() and p.parent != self.image_dir})
+
+        sources = []
+        for d in dirs:
+            for p in sorted(d.iterdir()):
+                if (p.is_file() and p.suffix.lower() in SOURCE_EXTENSIONS
+                        and not VARIANT_PATTERN.search(p.stem)):
+                    sources.append(p)
+        return sources
+
+    def plan(self, sources: List[Path]) -> List[Dict]:
+        """未処理・変更された画像のみをタスク化"""
+        tasks = []
+        for source in sources:
+            key = source.relative_to(self.image_dir).as_posix()
+            target = variant_path(source, self.max_width, self.format)
+            sha256 = file_sha256(source)
+            entry = self.manifest.get(key)
+            if (entry and entry.get('sha256') == sha256 and target.exists()
+                    and entry.get('variant', {}).get('path') == target.name):
+                continue
+            tasks.append({
+                'key': key,
+                'source': str(source),
+                'target': str(target),
+                'sha256': sha256,
+                'format': self.format,
+                'max_width': self.max_width,
+                'quality': self.quality,
+            })
+        return tasks
+
+    def run(self, article_ids: Optional[List[str]] = None,
+            keep_originals: bool = True) -> Dict:
+        """軽量版を生成し、集計レポートを返す"""
+        if not PIL_AVAILABLE:
+            raise RuntimeError("Pillow がインストールされていません (pip install Pillow)")
+
+        sources = self.find_sources(article_ids)
+        tasks = self.plan(sources)
+        report = {'total': len(sources), 'processed': 0, 'skipped': len(sources) - len(tasks),
+                  'failed': 0, 'removed_originals': 0, 'keep_originals': keep_originals}
+
+        if tasks:
+            keys = {t['source']: t['key'] for t in tasks}
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [(t, pool.submit(optimize_one, t)) for t in tasks]
+                for task, future in futures:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"  ✗ 変換失敗 ({task['key']}): {e}")
+                        report['failed'] += 1
+                        continue
+                    if 'skipped' in result:
+                        report['skipped'] += 1
+                        continue
+                    key = keys.pop(result.pop('source'))
+                    self.manifest[key] = result
+                    report['processed'] += 1
+            self.save_manifest()
+
+        if not keep_originals:
+            report['removed_originals'] = self.remove_originals(sources)
+            self.save_manifest()
+
+        report.update(self.summarize())
+        return report
+
+    def remove_originals(self, sources: List[Path]) -> int:
+        """生成物がある元画像を削除（manifest には元の寸法・サイズを残す）
+
+        生成物が元画像より小さくない場合は元画像を残し、記事のリンクも書き換えない。
+        """
+        removed = 0
+        for source in sources:
+            key = source.relative_to(self.image_dir).as_posix()
+            entry = self.manifest.get(key)
+            if not entry or not uses_variant(entry):
+                continue
+            target = source.with_name(entry['variant']['path'])
+            if target.exists() and source.exists():
+                source.unlink()
+                entry['original_removed'] = True
+                removed += 1
+        return removed
+
+    def summarize(self) -> Dict:
+        """manifest 全体の、記事が参照する画像の削減バイト数を集計
+
+        軽量版が元画像より小さくない画像はリンクを書き換えないため、元画像のサイズで数える。
+        """
+        original_bytes = sum(e['bytes'] for e in self.manifest.values())
+        variant_bytes = sum(e['variant']['bytes'] for e in self.manifest.values())
+        linked_bytes = sum(e['variant']['bytes'] if uses_variant(e) else e['bytes']
+                           for e in self.manifest.values())
+        return {
+            'original_bytes': original_bytes,
+            'variant_bytes': variant_bytes,
+            'linked_bytes': linked_bytes,
+            'saved_bytes': original_bytes - linked_bytes,
+        }
+
+    @staticmethod
+    def rewrite_article_links(articles_dir: Path, manifest: Dict[str, dict]) -> int:
+        """記事内のリンクと取得状態の画像パスを、元画像より小さい生成物へ置換
+
+        元画像を残す場合もリンクは生成物に向け、元画像は参照されないバックアップにする。
+        .fetch_state.json の URL→ローカルパスも書き換えないと、元画像を削除したときに
+        次回の取得で再利用できずに再ダウンロードしてしまう。
+        """
+        articles_dir = Path(articles_dir)
+        replacements = {}
+        for key, entry in manifest.items():
+            if uses_variant(entry):
+                variant_key = str(Path(key).with_name(entry['variant']['path']).as_posix())
+                # 記事の階層によって ../ の数が変わるため images/ 以降で置換する
+                replacements[f"images/{key}"] = f"images/{variant_key}"
+
+        def replace_all(text: str) -> str:
+            for old, new in replacements.items():
+                text = text.replace(old, new)
+            return text
+
+        changed = 0
+        history = RevisionStore(articles_dir.parent / 'history', articles_dir)
+        with state_lock(articles_dir):
+            for filepath in list_articles(articles_dir):
+                content = filepath.read_text(encoding='utf-8')
+                new_content = replace_all(content)
+                if new_content != content:
+                    # 中断しても記事が途中で切れないよう一時ファイル経由で置き換える
+                    tmp_path = filepath.with_suffix('.md.tmp')
+                    tmp_path.write_text(new_content, encoding='utf-8')
+                    os.replace(tmp_path, filepath)
+                    # リンクの書き換えは版を変えないため、履歴の最新版を差し替える
+                    article_id = read_frontmatter(filepath).get('article_id')
+                    if article_id:
+                        history.amend(str(article_id), content, new_content)
+                    changed += 1
+
+            state_path = articles_dir / FETCH_STATE_FILENAME
+            if not replacements or not state_path.exists():
+                return changed
+            state = json.loads(state_path.read_text(encoding='utf-8'))
+            state_changed = False
+            for entry in state.get('articles', {}).values():
+                images = entry.get('images')
+                if not images:
+                    continue
+                rewritten = {url: replace_all(path) for url, path in images.items()}
+                if rewritten != images:
+                    entry['images'] = rewritten
+                    state_changed = True
+            if state_changed:
+                tmp_path = state_path.with_suffix('.json.tmp')
+                tmp_path.write_text(json.dumps(state, ensure_ascii=False, indent=2, sort_keys=True) + '\n',
+                                    encoding='utf-8')
+                os.replace(tmp_path, state_path)
+        return changed
+
+
+def format_bytes(n: int) -> str:
+    """バイト数を読みやすく整形"""
+    for unit in ('B', 'KB', 'MB'):
+        if abs(n) < 1024:
+            return f"{n:.1f}{unit}" if unit != 'B' else f"{n}B"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+
+def print_report(report: Dict):
+    """最適化レポートを表示"""
+    print("\n" + "=" * 60)
+    print("画像最適化レポート")
+    print("=" * 60)
+    print(f"対象画像: {report['total']}枚")
+    print(f"  変換: {report['processed']}枚 / スキップ: {report['skipped']}枚 / 失敗: {report['failed']}枚")
+    if report['removed_originals']:
+        print(f"  元画像削除: {report['removed_originals']}枚")
+    print(f"元画像合計: {format_bytes(report['original_bytes'])}")
+    print(f"軽量版合計: {format_bytes(report['variant_bytes'])}")
+    print(f"記事が参照する画像: {format_bytes(report['linked_bytes'])}"
+          f"（削減量: {format_bytes(report['saved_bytes'])}）")
+    if report['keep_originals']:
+        print("  元画像はバックアップとして残しているため、ディスク使用量は減っていません"
+              "（--remove-originals で削除）")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='corpus/images の画像を縮小・再圧縮')
+    script_dir = Path(__file__).parent.parent
+    parser.add_argument('--image-dir', type=Path, default=script_dir / 'corpus' / 'images',
+                        help='画像ディレクトリ (デフォルト: corpus/images)')
+    parser.add_argument('--articles-dir', type=Path, default=script_dir / 'corpus' / 'articles',
+                        help='リンクを軽量版に書き換える記事ディレクトリ (デフォルト: corpus/articles)')
+    parser.add_argument('--max-width', type=int, default=1200, help='最大幅 (デフォルト: 1200)')
+    parser.add_argument('--format', choices=sorted(FORMAT_EXTENSIONS), default='webp',
+                        help='出力形式 (デフォルト: webp)')
+    parser.add_argument('--quality', type=int, default=80, help='圧縮品質 (デフォルト: 80)')
+    parser.add_argument('--workers', type=int, default=None, help='並列プロセス数 (デフォルト: CPU数)')
+    parser.add_argument('--remove-originals', action='store_true',
+                        help='軽量版生成後に、リンクを書き換えた元画像を削除する')
+    args = parser.parse_args()
+
+    if not PIL_AVAILABLE:
+        print("Error: Pillow not installed.")
+        print("Install with: pip install Pillow")
+        return
+
+    optimizer = ImageOptimizer(args.image_dir, args.max_width, args.format,
+                               args.quality, args.workers)
+    report = optimizer.run(keep_originals=not args.remove_originals)
+    changed = ImageOptimizer.rewrite_article_links(args.articles_dir, optimizer.manifest)
+    print(f"リンク書き換え: {changed}記事")
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+page_archive.py - 取得した記事ページ（生HTML）の圧縮アーカイブ
+
+記事ID と dateModified ごとに1版を保存する。変換処理（HTMLToMarkdownConverter・
+画像URL抽出・フロントマター）を変えたときに、ページを再取得せずに Markdown を
+作り直すために使う（fetch_note_articles.py --rebuild-from-archive）。
+
+    archive/<article_id>/<dateModified>.html.zst   # zstandard が無ければ .html.gz
+    archive/<article_id>/index.json                # 版ごとのファイル名・ハッシュ・一覧のメタデータ
+
+使用方法:
+    from page_archive import PageArchive
+
+    archive = PageArchive(corpus_dir / 'archive')
+    archive.store(article_id, html_bytes, date_modified, article={'title': ..., ...})
+    entry = archive.latest(article_id)
+    html = archive.read(entry)
+
+依存パッケージ:
+    pip install zstandard  # 任意: zstd で圧縮（無ければ gzip）
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# オプション: zstd 圧縮（インストールされていない場合は gzip）
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+INDEX_FILENAME = 'index.json'
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+
+
+def _atomic_write_bytes(filepath: Path, data: bytes):
+    """一時ファイルに書き込んでから置き換える"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def compress(data: bytes) -> tuple:
+    """(圧縮後のバイト列, 拡張子)"""
+    if ZSTD_AVAILABLE:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), '.zst'
+    # mtime を固定し、同じ HTML からは同じファイルを作る
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0), '.gz'
+
+
+def decompress(data: bytes, suffix: str) -> bytes:
+    if suffix == '.zst':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstd で圧縮されたアーカイブの展開には zstandard が必要です (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if suffix == '.gz':
+        return gzip.decompress(data)
+    raise ValueError(f"不明な圧縮形式: {suffix}")
+
+
+def revision_key(date_modified: Optional[str], digest: str) -> str:
+    """ファイル名に使う版のキー（dateModified が無い版は内容のハッシュで区別する）"""
+    if not date_modified:
+        return f"undated-{digest[:12]}"
+    return re.sub(r'[^0-9A-Za-z+.-]', '', date_modified.replace(':', ''))
+
+
+class PageArchive:
+    """記事ページの版を圧縮して保存・読み出す"""
+
+    def __init__(self, archive_dir: Path):
+        self.archive_dir = Path(archive_dir)
+
+    def _index_path(self, article_id: str) -> Path:
+        return self.archive_dir / article_id / INDEX_FILENAME
+
+    def revisions(self, article_id: str) -> Dict[str, dict]:
+        """版のキー -> 版の情報（壊れた索引は空として扱う）"""
+        try:
+            return json.loads(self._index_path(article_id).read_text(encoding='utf-8'))['revisions']
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def article_ids(self) -> List[str]:
+        if not self.archive_dir.exists():
+            return []
+        return sorted(p.parent.name for p in self.archive_dir.glob(f"*/{INDEX_FILENAME}"))
+
+    def store(self, article_id: str, html: bytes, date_modified: Optional[str],
+              article: Optional[dict] = None, archived_at: Optional[datetime] = None) -> bool:
+        """ページを保存する（同じ版が同じ内容で保存済みなら何もしない）
+
+        Returns:
+            書き込んだ場合 True
+        """
+        digest = hashlib.sha256(html).hexdigest()
+        key = revision_key(date_modified, digest)
+        revisions = self.revisions(article_id)
+        previous = revisions.get(key)
+        if previous and previous['sha256'] == digest and (self.archive_dir / article_id / previous['file']).exists():
+            return False
+
+        data, suffix = compress(html)
+        filename = f"{key}.html{suffix}"
+        _atomic_write_bytes(self.archive_dir / article_id / filename, data)
+        if previous and previous['file'] != filename:
+            # 圧縮形式が変わった場合は古いファイルを残さない
+            (self.archive_dir / article_id / previous['file']).unlink(missing_ok=True)
+
+        revisions[key] = {
+            'file': filename,
+            'date_modified': date_modified,
+            'archived_at': (archived_at or datetime.now()).isoformat(),
+            'sha256': digest,
+            'size': len(html),
+            'compressed_size': len(data),
+            'article': article or {},
+        }
+        index = {'version': 1, 'article_id': article_id, 'revisions': revisions}
+        _atomic_write_bytes(self._index_path(article_id),
+                            (json.dumps(index, ensure_ascii=False, indent=2, sort_keys=True) + '\n').encode('utf-8'))
+        return True
+
+    def latest(self, article_id: str) -> Optional[dict]:
+        """最後に保存した版（'path' にアーカイブファイルのパスを加えて返す）"""
+        revisions = self.revisions(article_id)
+        if not revisions:
+            return None
+        entry = max(revisions.values(), key=lambda r: r['archived_at'])
+        return dict(entry, path=str(self.archive_dir / article_id / entry['file']))
+
+    @staticmethod
+    def read(entry: dict) -> bytes:
+        """latest() が返した版の HTML を展開して返す"""
+        path = Path(entry['path'])
+        return decompress(path.read_bytes(), path.suffix)
+
+    def summary(self) -> Dict[str, int]:
+        """記事数・版数・元のサイズ・圧縮後のサイズ"""
+        totals = {'articles': 0, 'revisions': 0, 'bytes': 0, 'compressed_bytes': 0}
+        for article_id in self.article_ids():
+            revisions = self.revisions(article_id)
+            totals['articles'] += 1
+            totals['revisions'] += len(revisions)
+            totals['bytes'] += sum(r['size'] for r in revisions.values())
+            totals['compressed_bytes'] += sum(r['compressed_size'] for r in revisions.values())
+        return totals
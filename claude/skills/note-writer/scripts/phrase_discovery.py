@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+phrase_discovery.py - コーパスから特徴的なフレーズ・文頭・文末表現を自動抽出
+
+文字 n-gram（2〜8文字）を Count-Min Sketch で数えるため、記事数が増えても
+メモリ使用量は一定（幅 × 深さ × 4バイト × 2表）に収まる。
+
+    1パス目: 記事ごとの n-gram 出現数（tf）と出現記事数（df）をスケッチに加算
+    2パス目: 各 n-gram を背景頻度と比べた対数尤度比でスコア付けし、上位だけを保持
+
+背景頻度表（--background）を渡すとその表との対数尤度比を、渡さない場合は
+2つに分けた部分の独立な組み合わせで説明できる出現数（分け方のうち最大のもの、
+例: 「経営者」なら c(経営)c(者) と c(経)c(営者)）との対数尤度比を使う。後者は
+「偶然の並びより明らかに多い」まとまりを拾う。背景頻度表が無いと「ています」
+「ありません」のような助詞・助動詞・活用語尾の並びが上位に来てしまうため、
+ひらがなだけのフレーズは候補にしない（背景頻度表がある場合は4文字以上に限る）。
+文末の言い回しは文末表現として別に抽出する。
+
+n-gram のハッシュは blake2b で計算し、プロセスごとに変わる hash() は使わない
+（スケッチを保存・別プロセスと突き合わせても同じバケットになる）。
+
+使用方法:
+    python3 phrase_discovery.py [--top 30] [--min-df 2] [--background bg.tsv] [--json out.json]
+
+    from phrase_discovery import PhraseDiscovery
+    discovery = PhraseDiscovery()
+    result = discovery.run(lambda: iter(texts))
+
+    背景頻度表は「n-gram<TAB>出現数」の行（先頭の "#total<TAB>総文字数" は任意）。
+
+依存パッケージ:
+    なし（標準ライブラリのみ）
+    pip install numpy  # 任意: スケッチ更新のベクトル計算
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import re
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# オプション: スケッチ更新のベクトル計算用（無ければ純Pythonで同じ値を計算）
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+MASK64 = (1 << 64) - 1
+# 行ごとの乗算ハッシュ用の定数（奇数）
+HASH_MULTIPLIERS = [
+    0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+    0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9,
+]
+OPENER_MARK = '\x02'
+ENDING_MARK = '\x03'
+
+# 本文から除く Markdown 記法
+CODE_BLOCK_RE = re.compile(r'```.*?```', re.DOTALL)
+# fetch_note_articles.py が付ける原文URL・公開日などのフッター
+FOOTER_RE = re.compile(r'\n---\s*\n+\*\*原文URL\*\*.*\Z', re.DOTALL)
+IMAGE_RE = re.compile(r'!\[[^\]]*\]\([^)]*\)')
+LINK_RE = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+URL_RE = re.compile(r'<?https?://\S+>?')
+MARKUP_RE = re.compile(r'^\s*(?:#{1,6}|>|[-*+]|\d+\.)\s*|\*\*|__', re.MULTILINE)
+# n-gram は句読点・空白・記号をまたがない
+RUN_RE = re.compile(r'[\w〜]+')
+SENTENCE_RE = re.compile(r'([^。！？!?\n]+)[。！？!?]')
+
+
+def clean_text(content: str) -> str:
+    """Markdown の記法・URL を除いた本文を返す"""
+    content = FOOTER_RE.sub('', content)
+    content = CODE_BLOCK_RE.sub('', content)
+    content = IMAGE_RE.sub('', content)
+    content = LINK_RE.sub(r'\1', content)
+    content = URL_RE.sub('', content)
+    return MARKUP_RE.sub('', content)
+
+
+HIRAGANA_RE = re.compile(r'^[\u3041-\u309f〜ー]+$')
+DIGIT_RE = re.compile(r'\d')
+
+
+def stable_hash(key: str) -> int:
+    """プロセスをまたいで同じ値になる64ビットのハッシュ"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class CountMinSketch:
+    """固定サイズの Count-Min Sketch（推定値は真の出現数以上になる）"""
+
+    def __init__(self, width_bits: int = 20, depth: int = 4, seed: int = 0):
+        if not 1 <= depth <= len(HASH_MULTIPLIERS):
+            raise ValueError(f"depth は 1〜{len(HASH_MULTIPLIERS)} で指定してください")
+        self.width = 1 << width_bits
+        self.depth = depth
+        self.shift = 64 - width_bits
+        self.seeds = [(seed * 0x632BE59BD9B4E019 + i * 0x85EBCA77C2B2AE63) & MASK64 for i in range(depth)]
+        self.multipliers = HASH_MULTIPLIERS[:depth]
+        if NUMPY_AVAILABLE:
+            self.table = np.zeros((depth, self.width), dtype=np.uint32)
+        else:
+            self.table = [array('I', bytes(4 * self.width)) for _ in range(depth)]
+
+    @property
+    def nbytes(self) -> int:
+        return self.depth * self.width * 4
+
+    def _rows(self, keys: List[str]):
+        """行ごとのバケット番号（numpy 配列またはリスト）を返す"""
+        if NUMPY_AVAILABLE:
+            hashes = np.fromiter((stable_hash(k) for k in keys), dtype=np.uint64, count=len(keys))
+            with np.errstate(over='ignore'):
+                return [((hashes ^ np.uint64(seed)) * np.uint64(mult)) >> np.uint64(self.shift)
+                        for seed, mult in zip(self.seeds, self.multipliers)]
+        hashes = [stable_hash(k) for k in keys]
+        return [[(((h ^ seed) * mult) & MASK64) >> self.shift for h in hashes]
+                for seed, mult in zip(self.seeds, self.multipliers)]
+
+    def add_many(self, keys: List[str], counts: List[int]):
+        if not keys:
+            return
+        rows = self._rows(keys)
+        if NUMPY_AVAILABLE:
+            values = np.asarray(counts, dtype=np.uint32)
+            for i, idx in enumerate(rows):
+                np.add.at(self.table[i], idx, values)
+            return
+        for row, idx in zip(self.table, rows):
+            for j, count in zip(idx, counts):
+                row[j] += count
+
+    def estimate_many(self, keys: List[str]) -> List[int]:
+        if not keys:
+            return []
+        rows = self._rows(keys)
+        if NUMPY_AVAILABLE:
+            return np.min([self.table[i][idx] for i, idx in enumerate(rows)], axis=0).tolist()
+        return [min(row[j] for row, j in zip(self.table, column)) for column in zip(*rows)]
+
+
+def load_background(filepath: Path) -> Tuple[Dict[str, int], int]:
+    """背景頻度表（n-gram<TAB>出現数）を読み込む"""
+    counts: Dict[str, int] = {}
+    total = 0
+    with open(filepath, encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) != 2 or not parts[1].isdigit():
+                continue
+            if parts[0] == '#total':
+                total = int(parts[1])
+            else:
+                counts[parts[0]] = int(parts[1])
+    return counts, total or sum(c for g, c in counts.items() if len(g) == 1) or sum(counts.values())
+
+
+class PhraseDiscovery:
+    """ハッシュ化した n-gram 計数による特徴フレーズ抽出"""
+
+    def __init__(self, min_n: int = 2, max_n: int = 8, edge_max_n: int = 6,
+                 min_phrase_n: int = 3, min_hiragana_n: int = 4,
+                 width_bits: int = 20, depth: int = 4, capacity: int = 2000,
+                 min_df: int = 2, min_count: int = 3, evaluated_limit: int = 1_000_000,
+                 background: Optional[Tuple[Dict[str, int], int]] = None):
+        self.min_n = min_n
+        self.max_n = max_n
+        self.edge_max_n = edge_max_n
+        self.min_phrase_n = min_phrase_n
+        self.min_hiragana_n = min_hiragana_n
+        self.capacity = capacity
+        self.min_df = min_df
+        self.min_count = min_count
+        self.evaluated_limit = evaluated_limit
+        self.background = background
+        self.tf = CountMinSketch(width_bits, depth, seed=1)
+        self.df = CountMinSketch(width_bits, depth, seed=2)
+        # 1文字の出現数は文字種の数しかないので正確に数える
+        self.chars: Counter = Counter()
+        self.total_chars = 0
+        self.num_docs = 0
+        self.num_sentences = 0
+
+    def article_grams(self, content: str) -> Tuple[Counter, int]:
+        """1記事分の n-gram・文頭・文末の出現数と文数を返す"""
+        text = clean_text(content)
+        # Counter(iterable) は C 実装で数えるため、添字での加算より速い
+        grams = Counter(run[i:i + n]
+                        for run in RUN_RE.findall(text)
+                        for n in range(self.min_n, min(self.max_n, len(run)) + 1)
+                        for i in range(len(run) - n + 1))
+
+        sentences = 0
+        for m in SENTENCE_RE.finditer(text):
+            sentence = m.group(1).strip()
+            if not sentence:
+                continue
+            sentences += 1
+            for n in range(2, min(self.edge_max_n, len(sentence)) + 1):
+                grams[OPENER_MARK + sentence[:n]] += 1
+                grams[sentence[-n:] + ENDING_MARK] += 1
+        return grams, sentences
+
+    def count(self, texts: Iterable[str]):
+        """1パス目: スケッチに tf・df を加算"""
+        for content in texts:
+            grams, sentences = self.article_grams(content)
+            keys = list(grams)
+            self.tf.add_many(keys, [grams[k] for k in keys])
+            self.df.add_many(keys, [1] * len(keys))
+            for ch in RUN_RE.findall(clean_text(content)):
+                self.chars.update(ch)
+            self.num_docs += 1
+            self.num_sentences += sentences
+        self.total_chars = sum(self.chars.values())
+
+    def is_phrase_candidate(self, gram: str) -> bool:
+        """英数字だけのもの・助詞や活用語尾の並びはフレーズとして扱わない"""
+        if len(gram) < self.min_phrase_n or all(ord(ch) < 128 for ch in gram):
+            return False
+        if DIGIT_RE.search(gram):
+            # 日付・数値は書き癖ではない
+            return False
+        if HIRAGANA_RE.match(gram):
+            # 背景頻度表が無いと、どの書き手にもある「ています」「りません」が上位に来る
+            return self.background is not None and len(gram) >= self.min_hiragana_n
+        return True
+
+    def _count(self, gram: str, estimates: Dict[str, int]) -> int:
+        return self.chars[gram] if len(gram) == 1 else estimates.get(gram, 0)
+
+    def _expected(self, gram: str, estimates: Dict[str, int]) -> float:
+        """前後2つに分けた部分が独立に並んだ場合の期待出現数（分け方のうち最大）"""
+        total = max(self.total_chars, 1)
+        return max(self._count(gram[:k], estimates) * self._count(gram[k:], estimates) / total
+                   for k in range(1, len(gram)))
+
+    def _llr(self, gram: str, observed: int, estimates: Dict[str, int]) -> float:
+        """背景に対する対数尤度比（背景より少ない場合は0）"""
+        if self.background is not None:
+            bg_counts, bg_total = self.background
+            a, b = observed, bg_counts.get(gram, 0)
+            c1, c2 = max(self.total_chars, 1), max(bg_total, 1)
+            if a / c1 <= b / c2:
+                return 0.0
+            e1 = c1 * (a + b) / (c1 + c2)
+            e2 = c2 * (a + b) / (c1 + c2)
+            score = a * math.log(a / e1)
+            if b:
+                score += b * math.log(b / e2)
+            return 2 * score
+        expected = self._expected(gram, estimates)
+        if expected <= 0:
+            expected = 0.5
+        if observed <= expected:
+            return 0.0
+        return 2 * (observed * math.log(observed / expected) - (observed - expected))
+
+    def select(self, texts: Iterable[str]) -> Dict[str, Dict[str, Tuple]]:
+        """2パス目: スコア上位の候補を種類ごとに capacity 件まで保持"""
+        heaps: Dict[str, List] = {'phrases': [], 'openers': [], 'endings': []}
+        # スコアは1パス目の結果だけで決まり、ヒープの最小値は下がらないため、
+        # 一度評価したキーは再評価しなくてよい（上限を超えたら捨てて評価し直す）
+        evaluated = set()
+
+        for content in texts:
+            grams, _ = self.article_grams(content)
+            if len(evaluated) > self.evaluated_limit:
+                evaluated.clear()
+            keys = [k for k in grams if k not in evaluated]
+            evaluated.update(keys)
+            keys = [k for k in keys
+                    if k[0] == OPENER_MARK or k[-1] == ENDING_MARK or self.is_phrase_candidate(k)]
+            keys = [k for k, tf in zip(keys, self.tf.estimate_many(keys)) if tf >= self.min_count]
+            tf_values = self.tf.estimate_many(keys)
+            df_values = self.df.estimate_many(keys)
+            candidates = [(k, tf, df) for k, tf, df in zip(keys, tf_values, df_values)
+                          if df >= self.min_df]
+
+            # 期待値の計算に使う前半・後半の部分 n-gram をまとめて引く
+            subgrams = set()
+            for k, _, _ in candidates:
+                if k[0] != OPENER_MARK and k[-1] != ENDING_MARK:
+                    subgrams.update(k[:i] for i in range(2, len(k)))
+                    subgrams.update(k[i:] for i in range(1, len(k) - 1))
+            subgrams = list(subgrams)
+            estimates = dict(zip(subgrams, self.tf.estimate_many(subgrams)))
+
+            for k, tf, df in candidates:
+                if k[0] == OPENER_MARK:
+                    kind, score = 'openers', float(tf)
+                elif k[-1] == ENDING_MARK:
+                    kind, score = 'endings', float(tf)
+                else:
+                    # 多くの記事に現れるものほど「書き癖」とみなす
+                    kind = 'phrases'
+                    score = self._llr(k, tf, estimates) * df / max(self.num_docs, 1)
+                if score <= 0:
+                    continue
+                heap = heaps[kind]
+                entry = (score, k, tf, df)
+                if len(heap) < self.capacity:
+                    heapq.heappush(heap, entry)
+                elif score > heap[0][0]:
+                    heapq.heapreplace(heap, entry)
+
+        return {kind: {k.strip(OPENER_MARK + ENDING_MARK): (score, k.strip(OPENER_MARK + ENDING_MARK), tf, df)
+                       for score, k, tf, df in heap}
+                for kind, heap in heaps.items()}
+
+    def stitch_overlaps(self, entries: Dict[str, Tuple], ratio: float = 0.75) -> Dict[str, Tuple]:
+        """1文字ずつずれた長さ上限の候補（「実装型コンサルタ」「装型コンサルタン」）をつなげる
+
+        max_n より長いフレーズは長さ max_n の窓に分かれて現れるため、
+        1文字ずれで重なり、出現数も近いものを1つのフレーズに戻す。
+        """
+        def overlap(left: str, right: str) -> int:
+            # left の末尾と right の先頭が max_n - 1 文字以上重なる長さ（重ならなければ0）
+            for size in range(min(len(left), len(right)) - 1, self.max_n - 2, -1):
+                if left.endswith(right[:size]):
+                    return size
+            return 0
+
+        entries = dict(entries)
+        while True:
+            windows = sorted((e for e in entries.values() if len(e[1]) >= self.max_n),
+                             key=lambda e: -e[0])
+            pair = next(((left, right, size) for left in windows for right in windows
+                         if right is not left
+                         and min(left[2], right[2]) >= ratio * max(left[2], right[2])
+                         for size in [overlap(left[1], right[1])] if size), None)
+            if pair is None:
+                return entries
+            left, right, size = pair
+            phrase = left[1] + right[1][size:]
+            del entries[left[1]], entries[right[1]]
+            entries[phrase] = (max(left[0], right[0]), phrase,
+                               min(left[2], right[2]), min(left[3], right[3]))
+
+    @staticmethod
+    def suppress_fragments(entries: Dict[str, Tuple], ratio: float = 0.75) -> List[Tuple]:
+        """より長い候補にほぼ含まれてしまう断片（「んです」に対する「なんです」等）を除く"""
+        kept: List[Tuple] = []
+        for entry in sorted(entries.values(), key=lambda e: (-len(e[1]), -e[0])):
+            gram, tf = entry[1], entry[2]
+            if any(gram in longer[1] and longer[2] >= ratio * tf for longer in kept):
+                continue
+            kept.append(entry)
+        return sorted(kept, key=lambda e: -e[0])
+
+    def run(self, texts: Callable[[], Iterator[str]], top: int = 30) -> Dict:
+        """texts() は毎回先頭から本文を返すイテレータ（2回呼ばれる）"""
+        self.count(texts())
+        selected = self.select(texts())
+        result = {
+            'articles': self.num_docs,
+            'sentences': self.num_sentences,
+            'scoring': 'background' if self.background is not None else 'markov',
+            'sketch_bytes': self.tf.nbytes + self.df.nbytes,
+        }
+        selected['phrases'] = self.stitch_overlaps(selected['phrases'])
+        for kind, entries in selected.items():
+            result[kind] = [
+                {'text': gram, 'score': round(score, 2), 'count': tf, 'articles': df}
+                for score, gram, tf, df in self.suppress_fragments(entries)[:top]
+            ]
+        return result
+
+
+def iter_corpus(articles_dir: Path) -> Callable[[], Iterator[str]]:
+    """corpus/articles/*.md の本文を1件ずつ返す関数を作る"""
+    from analyze_style import split_frontmatter
+    from corpus_layout import list_articles
+
+    def texts() -> Iterator[str]:
+        for filepath in list_articles(Path(articles_dir)):
+            yield split_frontmatter(filepath.read_text(encoding='utf-8'))[1]
+    return texts
+
+
+def print_result(result: Dict):
+    """抽出結果を表示"""
+    print("\n" + "=" * 60)
+    print(f"特徴フレーズ抽出 ({result['articles']}記事 / {result['sentences']}文, "
+          f"スコア: {result['scoring']}, スケッチ {result['sketch_bytes'] / 1024 / 1024:.0f}MB)")
+    print("=" * 60)
+    for kind, label in (('phrases', '特徴的なフレーズ'), ('openers', '文頭表現'), ('endings', '文末表現')):
+        print(f"\n## {label}")
+        for item in result[kind]:
+            print(f"  {item['text']:<16s} {item['count']:6d}回 {item['articles']:4d}記事  score={item['score']}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='コーパスから特徴的なフレーズ・文頭・文末表現を抽出')
+    script_dir = Path(__file__).parent.parent
+    parser.add_argument('--articles-dir', type=Path, default=script_dir / 'corpus' / 'articles',
+                        help='記事ディレクトリ (デフォルト: corpus/articles)')
+    parser.add_argument('--top', type=int, default=30, help='種類ごとの表示件数 (デフォルト: 30)')
+    parser.add_argument('--min-df', type=int, default=2, help='最低出現記事数 (デフォルト: 2)')
+    parser.add_argument('--max-n', type=int, default=8, help='n-gram の最大文字数 (デフォルト: 8)')
+    parser.add_argument('--width-bits', type=int, default=20,
+                        help='スケッチの幅（2のべき乗の指数, デフォルト: 20 = 約100万）')
+    parser.add_argument('--background', type=Path, help='背景頻度表（n-gram<TAB>出現数）')
+    parser.add_argument('--json', type=Path, help='結果をJSONで保存')
+    args = parser.parse_args()
+
+    background = load_background(args.background) if args.background else None
+    discovery = PhraseDiscovery(max_n=args.max_n, width_bits=args.width_bits,
+                                min_df=args.min_df, background=background)
+    result = discovery.run(iter_corpus(args.articles_dir), top=args.top)
+    print_result(result)
+    if args.json:
+        args.json.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"結果を保存しました: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
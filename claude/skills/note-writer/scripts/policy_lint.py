@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+policy_lint.py - content_policy.md・style_guide.md のNG表現で下書きを検査する
+
+ルールは次の3種類で、すべてを名前付きグループの1つの正規表現にまとめて
+下書きを1回走査する。
+
+    policy:NG例#N       content_policy.md の NG例（同じ番号の OK例 を言い換え案にする）
+    policy:blame-*      人を責める言い回し（「〇〇した人は失敗した」など）。批判的視点のルールから
+    style:<見出し>#N    style_guide.md の「避けるべき」節の「」内の表現・NG/OK の組・
+                        「〜は1記事N回まで」（上限を超えた分だけ報告）
+
+ルールの抽出結果は .cache/policy_lint.pickle に保存し、2つのファイルの mtime・サイズが
+変わるまで使い回す（同じプロセス内ではコンパイル済みの正規表現も使い回す）。
+
+使用方法:
+    python3 policy_lint.py draft.md [--json]
+    python3 policy_lint.py --rules          # 抽出したルールの一覧
+
+    from policy_lint import PolicyEngine
+    engine = PolicyEngine.load(references_dir)
+    result = engine.lint(text)   # {'findings': [{rule, start, end, line, column, text, message, suggestion}], ...}
+
+依存パッケージ:
+    なし（標準ライブラリのみ）
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from reference_docs import load_policy_examples, load_reference, strip_markup
+
+DEFAULT_REFERENCES_DIR = Path(__file__).parent.parent / "references"
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / ".cache" / "policy_lint.pickle"
+POLICY_FILES = ('content_policy.md', 'style_guide.md')
+
+# 人ではなく仕組み・構造に向けるための、人を責める言い回し
+PERSON = (r'(?:コンサルタント|コンサル|ベンダー|SIer|エンジニア|マネージャー|管理職|経営者|社長|上司|'
+          r'担当者|情シス|IT部門|あの人|彼ら|[^\s、。！？「」]{1,10}?(?:た|る|ない)人(?:たち)?)')
+BLAME_PATTERNS = [
+    ('blame-person', '人や職種を主語にした否定',
+     PERSON + r'(?:は|が|って|なんて)[^。！？\n]{0,20}?'
+     r'(?:失敗(?:した|する|します)|ダメ|だめ|無能|(?:分か|わか)って(?:い)?ない|理解して(?:い)?ない|'
+     r'丸投げ|使えない|役に立たない|勉強不足|怠慢)'),
+    ('blame-contempt', '特定の人を見下す表現',
+     r'(?:(?:分か|わか)らない|(?:分か|わか)ってない|できない|使えない)' + PERSON + r'(?:には|に)?(?:なりたくない|は要らない|はいらない)'),
+]
+# style_guide.md に言い換えが書かれていない表現の言い換え案
+DEFAULT_SUGGESTIONS = {
+    '絶対に': '「多くの場合」「私の経験では〜」',
+    '必ず': '「〜の場合が多い」「基本的には」',
+    'すごく': '「とても」「大きく」',
+    'めっちゃ': '「かなり」',
+    'やばい': '「深刻です」「危険です」',
+    'な気がします': '「と考えています」',
+    '私なんかが言うのもなんですが': '前置きを削り「私の経験では〜」と限定する',
+    '間違っているかもしれませんが': '「私の経験では〜」「少なくとも〜では」と範囲を限定する',
+}
+# 「多用」と書かれた表現は、この回数を超えたら報告する
+DEFAULT_MAX_REPEAT = 3
+RULES_VERSION = hashlib.sha1(repr((PERSON, BLAME_PATTERNS, DEFAULT_SUGGESTIONS,
+                                   DEFAULT_MAX_REPEAT)).encode('utf-8')).hexdigest()[:12]
+
+QUOTED_RE = re.compile(r'「([^「」]+)」')
+LIMIT_RE = re.compile(r'「([^「」]+)」は1記事(\d+)回まで')
+PAIR_RE = re.compile(r'^(NG|OK):\s*(.*)$')
+# 文頭（行頭・句点や括弧の直後）
+SENTENCE_START = r'(?<![^\s。！？「（])'
+
+_memory_cache: Dict[str, tuple] = {}
+
+
+def _quoted_terms(text: str) -> List[str]:
+    """「」内の表現（「〜」の 〜 は除く。「でも→でも」のような並びは表現として使わない）"""
+    terms = []
+    for term in QUOTED_RE.findall(text):
+        term = term.replace('〜', '').strip()
+        if term and '→' not in term:
+            terms.append(term)
+    return terms
+
+
+def _quoted(text: str) -> str:
+    """言い換え案として「」内の表現をそのまま並べる"""
+    return ''.join(f"「{t}」" for t in QUOTED_RE.findall(text))
+
+
+def policy_rules(references_dir: Path) -> List[Dict]:
+    """content_policy.md のルール: NG例（対応する OK例）と人を責める言い回し"""
+    rules = []
+    examples = load_policy_examples(references_dir)
+    for i, ng in enumerate(examples['ng']):
+        ok = examples['ok'][i] if i < len(examples['ok']) else ''
+        rules.append({'id': f"policy:NG例#{i + 1}", 'terms': [ng], 'message': f"NG例「{ng}」",
+                      'suggestion': f"「{ok}」" if ok else ''})
+
+    doc = load_reference(Path(references_dir) / "content_policy.md")
+    section = doc.find('批判的視点')
+    principle = '人ではなく「仕組み」「構造」に向ける'
+    suggestion = ''
+    if section:
+        text = next((strip_markup(l) for l in section.lines if l.strip() and not l.startswith('-')), '')
+        principle = text.replace('**', '') or principle
+        oks = [PAIR_RE.match(item).group(2) for item in section.items
+               if PAIR_RE.match(item) and item.startswith('OK')]
+        suggestion = '、'.join(oks)
+    for rule_id, label, pattern in BLAME_PATTERNS:
+        rules.append({'id': f"policy:{rule_id}", 'pattern': pattern, 'message': f"{label}: {principle}",
+                      'suggestion': suggestion})
+    return rules
+
+
+def style_rules(references_dir: Path) -> List[Dict]:
+    """style_guide.md のルール: 「避けるべき」節の表現・NG/OK の組・1記事あたりの上限"""
+    filepath = Path(references_dir) / "style_guide.md"
+    if not filepath.exists():
+        return []
+    rules = []
+    for section in load_reference(filepath).sections:
+        number = 0
+        pending_ng: Optional[Dict] = None
+        for item in section.items:
+            text = item.replace('**', '')
+            rule = None
+            limit = LIMIT_RE.search(text)
+            pair = PAIR_RE.match(text)
+            if limit:
+                # 「でも」などの接続詞は文頭だけ数える
+                rest = text[limit.end():].lstrip('。')
+                rule = {'pattern': SENTENCE_START + re.escape(limit.group(1)), 'max_count': int(limit.group(2)),
+                        'suggestion': _quoted(rest)}
+            elif pair and pair.group(1) == 'OK':
+                if pending_ng is not None:
+                    pending_ng['suggestion'] += _quoted(pair.group(2))
+                continue
+            elif (pair or '避けるべき' in ''.join(section.path)) and _quoted_terms(text):
+                arrow = text.split('→', 1)[1].strip(' ）)') if '→' in text else ''
+                rule = {'terms': _quoted_terms(text.split('→', 1)[0]), 'suggestion': arrow}
+                if '多用' in text:
+                    rule['max_count'] = DEFAULT_MAX_REPEAT
+            if rule is None:
+                pending_ng = None
+                continue
+            number += 1
+            rule.update(id=f"style:{'/'.join(section.path[-2:])}#{number}", message=text)
+            rules.append(rule)
+            pending_ng = rule if pair else None
+    return rules
+
+
+def compile_rules(rules: List[Dict]) -> str:
+    """ルールを名前付きグループ（r0, r1, ...）の1つの正規表現にする"""
+    groups = []
+    for i, rule in enumerate(rules):
+        if 'pattern' in rule:
+            body = rule['pattern']
+        else:
+            # 長い表現を先に試す（「絶対に」と「絶対」など）
+            body = '|'.join(re.escape(t) for t in sorted(rule['terms'], key=len, reverse=True))
+        groups.append(f"(?P<r{i}>{body})")
+    return '|'.join(groups)
+
+
+class PolicyEngine:
+    """NG表現のルールを1つの正規表現にまとめて下書きを検査する"""
+
+    def __init__(self, rules: List[Dict], pattern: str):
+        self.rules = rules
+        self.regex = re.compile(pattern) if pattern else None
+
+    @classmethod
+    def build(cls, references_dir: Path) -> 'PolicyEngine':
+        rules = []
+        owners: Dict[str, Dict] = {}
+        for rule in policy_rules(references_dir) + style_rules(references_dir):
+            # 複数の節に書かれた表現は最初のルールにまとめ、言い換え案だけ引き継ぐ
+            terms = [t for t in rule.get('terms', []) if t not in owners]
+            for term in rule.get('terms', []):
+                owner = owners.get(term)
+                if owner is not None and rule['suggestion'] and rule['suggestion'] not in owner['suggestion']:
+                    owner['suggestion'] += rule['suggestion']
+            if 'terms' in rule and not terms:
+                continue
+            if 'terms' in rule:
+                rule['terms'] = terms
+                owners.update((t, rule) for t in terms)
+            rules.append(rule)
+        return cls(rules, compile_rules(rules))
+
+    @classmethod
+    def load(cls, references_dir: Path = DEFAULT_REFERENCES_DIR,
+             cache_path: Optional[Path] = DEFAULT_CACHE_PATH) -> 'PolicyEngine':
+        """ポリシーファイルが変わっていなければキャッシュしたルールを使う"""
+        references_dir = Path(references_dir)
+        stamps = []
+        for name in POLICY_FILES:
+            path = references_dir / name
+            st = path.stat() if path.exists() else None
+            stamps.append((name, st.st_mtime_ns, st.st_size) if st else (name, None, None))
+        stamp = (RULES_VERSION, tuple(stamps))
+        key = str(references_dir.resolve())
+
+        cached = _memory_cache.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        engine = None
+        if cache_path and cache_path.exists():
+            try:
+                with open(cache_path, 'rb') as f:
+                    entry = pickle.load(f)
+                if entry.get('stamp') == stamp and entry.get('references_dir') == key:
+                    engine = cls(entry['rules'], entry['pattern'])
+            except Exception:
+                engine = None
+        if engine is None:
+            engine = cls.build(references_dir)
+            if cache_path:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = cache_path.with_suffix('.tmp')
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump({'stamp': stamp, 'references_dir': key, 'rules': engine.rules,
+                                 'pattern': engine.regex.pattern if engine.regex else ''},
+                                f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, cache_path)
+
+        _memory_cache[key] = (stamp, engine)
+        return engine
+
+    def lint(self, text: str) -> Dict:
+        """下書きを検査し、該当箇所（文字位置・行・桁）とルール・言い換え案を返す"""
+        started = time.perf_counter()
+        line_starts = [0] + [m.end() for m in re.finditer('\n', text)]
+        hits: Dict[int, List[re.Match]] = {}
+        if self.regex is not None:
+            for match in self.regex.finditer(text):
+                hits.setdefault(int(match.lastgroup[1:]), []).append(match)
+
+        findings = []
+        counts = {}
+        for index, matches in hits.items():
+            rule = self.rules[index]
+            counts[rule['id']] = len(matches)
+            max_count = rule.get('max_count')
+            if max_count is not None:
+                if len(matches) <= max_count:
+                    continue
+                # 上限を超えた分だけ報告する
+                matches = matches[max_count:]
+            for match in matches:
+                line = bisect.bisect_right(line_starts, match.start())
+                finding = {
+                    'rule': rule['id'],
+                    'start': match.start(),
+                    'end': match.end(),
+                    'line': line,
+                    'column': match.start() - line_starts[line - 1] + 1,
+                    'text': match.group(0),
+                    'message': rule['message'],
+                    'suggestion': rule['suggestion'] or DEFAULT_SUGGESTIONS.get(match.group(0), ''),
+                }
+                if max_count is not None:
+                    finding['message'] = f"{rule['message']}（{len(hits[index])}回）"
+                findings.append(finding)
+        findings.sort(key=lambda f: (f['start'], f['rule']))
+        return {
+            'findings': findings,
+            'counts': counts,
+            'chars': len(text),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 3),
+        }
+
+
+def print_findings(result: Dict, name: str = ''):
+    for f in result['findings']:
+        print(f"{name}:{f['line']}:{f['column']}: [{f['rule']}] 「{f['text']}」 {f['message']}")
+        if f['suggestion']:
+            print(f"    → {f['suggestion']}")
+    print(f"{len(result['findings'])}件（{result['chars']}文字, {result['elapsed_ms']:.2f}ms）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='content_policy.md・style_guide.md のNG表現で下書きを検査')
+    parser.add_argument('draft', nargs='?', help='下書きファイル（- で標準入力）')
+    parser.add_argument('--references-dir', type=Path, default=DEFAULT_REFERENCES_DIR,
+                        help='ポリシーファイルのディレクトリ (デフォルト: references)')
+    parser.add_argument('--rules', action='store_true', help='抽出したルールを表示')
+    parser.add_argument('--json', action='store_true', help='結果をJSONで出力')
+    args = parser.parse_args()
+
+    engine = PolicyEngine.load(args.references_dir)
+    if args.rules:
+        for rule in engine.rules:
+            target = rule.get('pattern') or '、'.join(rule['terms'])
+            limit = f"（{rule['max_count']}回まで）" if rule.get('max_count') is not None else ''
+            print(f"[{rule['id']}]{limit} {target}")
+        return 0
+    if not args.draft:
+        parser.error('下書きファイルを指定してください')
+
+    text = sys.stdin.read() if args.draft == '-' else Path(args.draft).read_text(encoding='utf-8')
+    result = engine.lint(text)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print_findings(result, args.draft)
+    return 1 if result['findings'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+profiling.py - note-writer の各スクリプトで共有する --profile の実装
+
+フェーズ（一覧取得・分析・検索など）ごとに次を記録し、
+.cache/profiles/<スクリプト名>_<日時>/ に書き出す。
+
+    stacks.folded           サンプリングした呼び出しスタック（flamegraph.pl / speedscope 用）
+    cprofile_<phase>.pstats cProfile の統計（python3 -m pstats で開ける）
+    cprofile_<phase>.txt    累積時間順の上位関数
+    memory_<phase>.txt      tracemalloc によるフェーズ中の割り当て増加の上位
+    summary.json            フェーズごとの経過時間・CPU時間・メモリピーク
+
+スタックのサンプリングは別スレッドで一定間隔ごとにフレームを覗くだけなので、
+通常の実行でも有効にしたままにできる（--profile light）。cProfile と tracemalloc は
+関数呼び出し・割り当てごとにコストがかかるため、遅い原因を調べるときに使う。
+
+使用方法:
+    import profiling
+
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    with profiling.session(args, 'analyze_style'):
+        with profiling.phase('load_articles'):
+            ...
+
+    python3 analyze_style.py --profile               # すべて（cprofile,stacks,memory）
+    python3 analyze_style.py --profile light         # スタックのサンプリングのみ
+    python3 analyze_style.py --profile cprofile,memory
+
+依存パッケージ:
+    なし（標準ライブラリのみ）
+"""
+
+import argparse
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+MODES = ('cprofile', 'stacks', 'memory')
+MODE_ALIASES = {'all': set(MODES), 'light': {'stacks'}}
+DEFAULT_PROFILE_DIR = Path(__file__).parent.parent / ".cache" / "profiles"
+DEFAULT_INTERVAL = 0.005
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+
+def parse_modes(value: str) -> Set[str]:
+    """--profile の値（all / light / カンマ区切り）をモードの集合にする"""
+    modes: Set[str] = set()
+    for part in value.split(','):
+        part = part.strip()
+        if part in MODE_ALIASES:
+            modes |= MODE_ALIASES[part]
+        elif part in MODES:
+            modes.add(part)
+        elif part:
+            raise argparse.ArgumentTypeError(
+                f"不明なプロファイルモード: {part}（{', '.join(MODES)} / all / light）")
+    return modes
+
+
+def add_arguments(parser):
+    """--profile 関連のオプションを argparse に追加"""
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const=MODE_ALIASES['all'],
+        type=parse_modes,
+        metavar='MODES',
+        help='フェーズごとのプロファイルを記録（all / light / cprofile,stacks,memory。省略時は all）'
+    )
+    parser.add_argument(
+        '--profile-dir',
+        type=Path,
+        default=DEFAULT_PROFILE_DIR,
+        help='プロファイルの出力先 (デフォルト: .cache/profiles)'
+    )
+    parser.add_argument(
+        '--profile-interval',
+        type=float,
+        default=DEFAULT_INTERVAL,
+        help=f'スタックのサンプリング間隔秒 (デフォルト: {DEFAULT_INTERVAL})'
+    )
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+class StackSampler(threading.Thread):
+    """一定間隔で全スレッドのスタックを採取し、折り畳み形式で集計する"""
+
+    def __init__(self, profiler: 'Profiler', interval: float):
+        super().__init__(name='profiling-sampler', daemon=True)
+        self.profiler = profiler
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.overhead = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            started = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            root = self.profiler.current_phase_path()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.reverse()
+                thread_name = names.get(thread_id, str(thread_id))
+                prefix = root if thread_name == 'MainThread' else root + [f"[{thread_name}]"]
+                self.stacks[';'.join(prefix + labels)] += 1
+            self.samples += 1
+            self.overhead += time.perf_counter() - started
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class PhaseRecord:
+    """フェーズ1つ分の集計（同じ名前のフェーズが繰り返されたら累積する）"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.memory_peak = 0
+        # 直近の実行の開始・終了時のスナップショット（差分は stop() でまとめて計算する）
+        self.snapshots: Optional[tuple] = None
+        self.profile: Optional[cProfile.Profile] = None
+
+
+class Profiler:
+    """フェーズ単位で cProfile・スタックサンプリング・tracemalloc を記録する"""
+
+    def __init__(self, script_name: str, modes: Set[str], output_dir: Path,
+                 interval: float = DEFAULT_INTERVAL):
+        self.script_name = script_name
+        self.modes = modes
+        self.output_dir = Path(output_dir) / f"{script_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.interval = interval
+        self.phases: Dict[str, PhaseRecord] = {}
+        self._stack: List[PhaseRecord] = []
+        self._lock = threading.Lock()
+        self.sampler: Optional[StackSampler] = None
+        self.snapshot_seconds = 0.0
+
+    def current_phase_path(self) -> List[str]:
+        with self._lock:
+            return [p.name for p in self._stack]
+
+    def start(self):
+        if 'memory' in self.modes:
+            tracemalloc.start()
+        if 'stacks' in self.modes:
+            self.sampler = StackSampler(self, self.interval)
+            self.sampler.start()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """フェーズを計測する（入れ子の場合、cProfile の統計に子フェーズの時間は含まない）"""
+        record = self.phases.get(name)
+        if record is None:
+            record = self.phases[name] = PhaseRecord(name)
+        outer = self._stack[-1] if self._stack else None
+
+        if 'cprofile' in self.modes:
+            if outer is not None and outer.profile is not None:
+                outer.profile.disable()
+            if record.profile is None:
+                record.profile = cProfile.Profile()
+            record.profile.enable()
+        before = None
+        if 'memory' in self.modes:
+            if outer is not None:
+                # ピークをリセットする前に外側のフェーズへ反映しておく
+                outer.memory_peak = max(outer.memory_peak, tracemalloc.get_traced_memory()[1])
+            before = self._snapshot()
+            tracemalloc.reset_peak()
+        with self._lock:
+            self._stack.append(record)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_seconds += time.perf_counter() - wall_start
+            record.cpu_seconds += time.process_time() - cpu_start
+            record.calls += 1
+            with self._lock:
+                self._stack.pop()
+            if 'cprofile' in self.modes:
+                record.profile.disable()
+                if outer is not None and outer.profile is not None:
+                    outer.profile.enable()
+            if before is not None:
+                record.memory_peak = max(record.memory_peak, tracemalloc.get_traced_memory()[1])
+                if outer is not None:
+                    outer.memory_peak = max(outer.memory_peak, record.memory_peak)
+                record.snapshots = (before, self._snapshot())
+
+    def _snapshot(self):
+        # 差分の計算・フィルタはコストが大きいため、ここでは取得だけ行う
+        started = time.perf_counter()
+        snapshot = tracemalloc.take_snapshot()
+        self.snapshot_seconds += time.perf_counter() - started
+        return snapshot
+
+    @staticmethod
+    def _top_allocations(snapshots: tuple) -> List[str]:
+        before, after = snapshots
+        ignored = (tracemalloc.__file__, __file__, '<unknown>')
+        lines = []
+        for stat in after.compare_to(before, 'lineno'):
+            if stat.traceback[0].filename in ignored:
+                continue
+            lines.append(str(stat))
+            if len(lines) >= TOP_ALLOCATIONS:
+                break
+        return lines
+
+    def stop(self) -> Path:
+        """計測を終了して結果を書き出し、出力先ディレクトリを返す"""
+        if self.sampler is not None:
+            self.sampler.stop()
+        if 'memory' in self.modes:
+            tracemalloc.stop()
+            summary_overhead = {'snapshot_seconds': round(self.snapshot_seconds, 4)}
+        else:
+            summary_overhead = {}
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        summary = {
+            'script': self.script_name,
+            'argv': sys.argv[1:],
+            'modes': sorted(self.modes),
+            'phases': {},
+            **summary_overhead,
+        }
+        for record in self.phases.values():
+            filename = re.sub(r'[^\w.-]', '_', record.name)
+            summary['phases'][record.name] = {
+                'calls': record.calls,
+                'wall_seconds': round(record.wall_seconds, 4),
+                'cpu_seconds': round(record.cpu_seconds, 4),
+            }
+            if record.profile is not None:
+                record.profile.dump_stats(str(self.output_dir / f"cprofile_{filename}.pstats"))
+                out = io.StringIO()
+                pstats.Stats(record.profile, stream=out).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+                (self.output_dir / f"cprofile_{filename}.txt").write_text(out.getvalue(), encoding='utf-8')
+            if record.snapshots is not None:
+                summary['phases'][record.name]['memory_peak_bytes'] = record.memory_peak
+                (self.output_dir / f"memory_{filename}.txt").write_text(
+                    f"# {record.name}: peak {record.memory_peak / 1024 / 1024:.1f}MB（直近の実行での増加上位）\n"
+                    + '\n'.join(self._top_allocations(record.snapshots)) + '\n', encoding='utf-8')
+
+        if self.sampler is not None:
+            with open(self.output_dir / 'stacks.folded', 'w', encoding='utf-8') as f:
+                for stack, count in sorted(self.sampler.stacks.items()):
+                    f.write(f"{stack} {count}\n")
+            summary['sampler'] = {
+                'interval': self.interval,
+                'samples': self.sampler.samples,
+                'overhead_seconds': round(self.sampler.overhead, 4),
+            }
+
+        (self.output_dir / 'summary.json').write_text(
+            json.dumps(summary, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+        return self.output_dir
+
+
+_active: Optional[Profiler] = None
+
+
+@contextlib.contextmanager
+def session(args, script_name: str):
+    """--profile が指定されていればスクリプト全体を 'main' フェーズとして計測する"""
+    global _active
+    modes = getattr(args, 'profile', None)
+    if not modes:
+        yield None
+        return
+
+    profiler = Profiler(script_name, modes, args.profile_dir, args.profile_interval)
+    _active = profiler
+    profiler.start()
+    try:
+        with profiler.phase('main'):
+            yield profiler
+    finally:
+        _active = None
+        output_dir = profiler.stop()
+        # 標準出力は --plan - などで使うため、結果の場所は標準エラーに出す
+        print(f"プロファイル結果: {output_dir}", file=sys.stderr)
+
+
+@contextlib.contextmanager
+def phase(name: str):
+    """計測中ならフェーズとして記録する（--profile なしでは何もしない）
+
+    フェーズはメインスレッドから開始する。ワーカースレッドの処理は
+    スタックのサンプリングで、呼び出し元のフェーズの下に記録される。
+    """
+    if _active is None:
+        yield None
+        return
+    with _active.phase(name) as record:
+        yield record
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+readability_metrics.py - 文字種の構成と読みやすさの指標を文ごと・記事ごとに計算
+
+日本語の読みやすさに効く次の指標を計算する。
+
+    漢字・ひらがな・カタカナ・英字・数字の比率（空白と文区切りを除いた文字数に対する割合）
+    漢字の連続（文ごとの最長、4文字以上の連続の 1000字あたりの数）
+    読点（、，）の文ごとの数
+    英字を含む文の割合
+
+記事は Markdown の記法・URL を除いたうえで1回だけコードポイントの配列に変換し、
+文字種は範囲の比較（マスク）で判定する。文ごとの集計は文番号を添字にした
+bincount で行うため、1文字ずつの Python ループにはならない。numpy が無い場合は
+同じ定義の純Python実装で同じ値を計算する。
+
+文の区切りは analyze_style.sentence_lengths と同じ「。！？」と改行で、空白を除いた
+文字数が5を超える文だけを対象にする。
+
+使用方法:
+    python3 readability_metrics.py [--articles-dir corpus/articles] [--json out.json]
+
+    from readability_metrics import text_metrics, corpus_metrics
+    result = text_metrics(content)         # {'sentences': {...}, 'article': {...}}
+    stats = corpus_metrics(iter(texts))    # 指標ごとの平均・パーセンタイル
+
+依存パッケージ:
+    なし（標準ライブラリのみ）
+    pip install numpy  # 任意: 文字種判定・集計のベクトル計算
+"""
+
+import argparse
+import bisect
+import json
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from phrase_discovery import clean_text, iter_corpus
+
+# オプション: 文字種判定のベクトル計算用（無ければ純Pythonで同じ値を計算）
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# 文字種（0 はその他: 記号・句点以外の約物など）
+OTHER, KANJI, HIRAGANA, KATAKANA, LATIN, DIGIT, COMMA = range(7)
+CLASS_COUNT = 7
+
+# (開始, 終了, 文字種) のコードポイント範囲（終了を含む、開始順・重なりなし）
+CHAR_RANGES = [
+    (0x0030, 0x0039, DIGIT),
+    (0x0041, 0x005A, LATIN),
+    (0x0061, 0x007A, LATIN),
+    (0x3001, 0x3001, COMMA),      # 、
+    (0x3005, 0x3007, KANJI),      # 々〆〇
+    (0x3041, 0x309F, HIRAGANA),
+    (0x30A1, 0x30FA, KATAKANA),
+    (0x30FC, 0x30FF, KATAKANA),   # ー など（中黒は除く）
+    (0x31F0, 0x31FF, KATAKANA),   # 小書きカタカナ拡張
+    (0x3400, 0x4DBF, KANJI),
+    (0x4E00, 0x9FFF, KANJI),
+    (0xF900, 0xFAFF, KANJI),
+    (0xFF0C, 0xFF0C, COMMA),      # ，
+    (0xFF10, 0xFF19, DIGIT),
+    (0xFF21, 0xFF3A, LATIN),
+    (0xFF41, 0xFF5A, LATIN),
+    (0xFF66, 0xFF9F, KATAKANA),   # 半角カタカナ
+    (0x20000, 0x2FA1F, KANJI),
+]
+_RANGE_STARTS = [start for start, _, _ in CHAR_RANGES]
+
+# 文の区切り（。！？と改行）と、文字数に数えない空白
+BOUNDARY_CODES = (0x000A, 0x3002, 0xFF01, 0xFF1F)
+WHITESPACE_CODES = (0x0009, 0x000B, 0x000C, 0x000D, 0x0020, 0x00A0, 0x3000)
+MIN_SENTENCE_CHARS = 6
+LONG_KANJI_RUN = 4
+
+PERCENTILES = [10, 25, 50, 75, 90]
+
+# 文ごとの指標と記事ごとの指標（キー, 表示名, 書式）
+SENTENCE_METRICS = [
+    ('kanji_ratio', '漢字率', '{:.0%}'),
+    ('hiragana_ratio', 'ひらがな率', '{:.0%}'),
+    ('katakana_ratio', 'カタカナ率', '{:.0%}'),
+    ('commas', '読点の数', '{:.1f}'),
+    ('max_kanji_run', '最長の漢字連続', '{:.1f}'),
+]
+ARTICLE_METRICS = [
+    ('kanji_ratio', '漢字率', '{:.1%}'),
+    ('hiragana_ratio', 'ひらがな率', '{:.1%}'),
+    ('katakana_ratio', 'カタカナ率', '{:.1%}'),
+    ('latin_ratio', '英字率', '{:.1%}'),
+    ('digit_ratio', '数字率', '{:.1%}'),
+    ('commas_per_sentence', '読点（1文あたり）', '{:.2f}'),
+    ('long_kanji_runs_per_1k', f'{LONG_KANJI_RUN}字以上の漢字連続（1000字あたり）', '{:.1f}'),
+    ('latin_sentence_ratio', '英字を含む文の割合', '{:.0%}'),
+]
+
+
+def to_codepoints(text: str):
+    """文字列をコードポイントの配列にする（numpy があれば uint32 の ndarray）"""
+    if NUMPY_AVAILABLE:
+        return np.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+    return array('I', text.encode('utf-32-le'))
+
+
+def _sentence_table_numpy(codepoints) -> Tuple[Dict[str, List], List[int], int]:
+    """文ごとの指標・文字種別の合計文字数・長い漢字連続の数を numpy で計算"""
+    classes = np.zeros(len(codepoints), dtype=np.int64)
+    for start, end, char_class in CHAR_RANGES:
+        classes[(codepoints >= start) & (codepoints <= end)] = char_class
+
+    boundary = np.isin(codepoints, BOUNDARY_CODES)
+    counted = ~(boundary | np.isin(codepoints, WHITESPACE_CODES))
+    # 区切り文字の位置で文番号が1つ進む（区切り文字自体は数えない）
+    sentence_ids = np.cumsum(boundary)
+    sentence_count = int(sentence_ids[-1]) + 1 if len(codepoints) else 0
+
+    ids = sentence_ids[counted]
+    counts = np.bincount(ids * CLASS_COUNT + classes[counted],
+                         minlength=sentence_count * CLASS_COUNT).reshape(sentence_count, CLASS_COUNT)
+
+    # 漢字の連続: 0/1 の差分から連続の開始・終了位置を求める（区切り文字は漢字ではないので文をまたがない）
+    is_kanji = (classes == KANJI).astype(np.int8)
+    edges = np.diff(np.concatenate(([0], is_kanji, [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_lengths = np.flatnonzero(edges == -1) - run_starts
+    run_sentences = sentence_ids[run_starts]
+    max_run = np.zeros(sentence_count, dtype=np.int64)
+    np.maximum.at(max_run, run_sentences, run_lengths)
+    long_runs = np.bincount(run_sentences[run_lengths >= LONG_KANJI_RUN], minlength=sentence_count)
+
+    chars = counts.sum(axis=1)
+    keep = chars >= MIN_SENTENCE_CHARS
+    counts, chars = counts[keep], chars[keep]
+    sentences = {
+        'kanji_ratio': (counts[:, KANJI] / chars).tolist(),
+        'hiragana_ratio': (counts[:, HIRAGANA] / chars).tolist(),
+        'katakana_ratio': (counts[:, KATAKANA] / chars).tolist(),
+        'commas': counts[:, COMMA].tolist(),
+        'max_kanji_run': max_run[keep].tolist(),
+        'latin': (counts[:, LATIN] > 0).tolist(),
+    }
+    return sentences, counts.sum(axis=0).tolist(), int(long_runs[keep].sum())
+
+
+def _sentence_table_python(codepoints) -> Tuple[Dict[str, List], List[int], int]:
+    """_sentence_table_numpy と同じ値を純Pythonで計算"""
+    boundary = set(BOUNDARY_CODES)
+    whitespace = set(WHITESPACE_CODES)
+    sentences = {key: [] for key in ('kanji_ratio', 'hiragana_ratio', 'katakana_ratio',
+                                     'commas', 'max_kanji_run', 'latin')}
+    totals = [0] * CLASS_COUNT
+    total_long_runs = 0
+    counts = [0] * CLASS_COUNT
+    run = max_run = long_runs = 0
+
+    def close_sentence():
+        nonlocal total_long_runs
+        chars = sum(counts)
+        if chars < MIN_SENTENCE_CHARS:
+            return
+        sentences['kanji_ratio'].append(counts[KANJI] / chars)
+        sentences['hiragana_ratio'].append(counts[HIRAGANA] / chars)
+        sentences['katakana_ratio'].append(counts[KATAKANA] / chars)
+        sentences['commas'].append(counts[COMMA])
+        sentences['max_kanji_run'].append(max_run)
+        sentences['latin'].append(counts[LATIN] > 0)
+        for i, count in enumerate(counts):
+            totals[i] += count
+        total_long_runs += long_runs
+
+    for cp in codepoints:
+        if cp in boundary:
+            close_sentence()
+            counts = [0] * CLASS_COUNT
+            run = max_run = long_runs = 0
+            continue
+        i = bisect.bisect_right(_RANGE_STARTS, cp) - 1
+        char_class = CHAR_RANGES[i][2] if i >= 0 and cp <= CHAR_RANGES[i][1] else OTHER
+        if char_class == KANJI:
+            run += 1
+            max_run = max(max_run, run)
+            if run == LONG_KANJI_RUN:
+                long_runs += 1
+        else:
+            run = 0
+        if cp not in whitespace:
+            counts[char_class] += 1
+    close_sentence()
+    return sentences, totals, total_long_runs
+
+
+def text_metrics(content: str) -> Dict[str, Dict]:
+    """1記事分の文ごとの指標（リスト）と記事全体の指標を返す"""
+    codepoints = to_codepoints(clean_text(content))
+    if NUMPY_AVAILABLE:
+        sentences, totals, long_runs = _sentence_table_numpy(codepoints)
+    else:
+        sentences, totals, long_runs = _sentence_table_python(codepoints)
+
+    latin_sentences = sum(sentences.pop('latin'))
+    sentence_count = len(sentences['kanji_ratio'])
+    chars = sum(totals)
+    ratio = (lambda n: n / chars) if chars else (lambda n: 0.0)
+    article = {
+        'sentences': sentence_count,
+        'chars': chars,
+        'kanji_ratio': ratio(totals[KANJI]),
+        'hiragana_ratio': ratio(totals[HIRAGANA]),
+        'katakana_ratio': ratio(totals[KATAKANA]),
+        'latin_ratio': ratio(totals[LATIN]),
+        'digit_ratio': ratio(totals[DIGIT]),
+        'commas_per_sentence': totals[COMMA] / sentence_count if sentence_count else 0.0,
+        'long_kanji_runs_per_1k': long_runs * 1000 / chars if chars else 0.0,
+        'latin_sentence_ratio': latin_sentences / sentence_count if sentence_count else 0.0,
+    }
+    return {'sentences': sentences, 'article': article}
+
+
+def summarize(values: Sequence[float]) -> Dict:
+    """平均とパーセンタイル（numpy.percentile と同じ線形補間）"""
+    if not values:
+        return {'mean': 0.0, 'percentiles': {p: 0.0 for p in PERCENTILES}}
+    if NUMPY_AVAILABLE:
+        data = np.asarray(values, dtype=np.float64)
+        return {'mean': float(data.mean()),
+                'percentiles': {p: float(v) for p, v in zip(PERCENTILES, np.percentile(data, PERCENTILES))}}
+
+    data = sorted(values)
+    result = {}
+    for p in PERCENTILES:
+        pos = (len(data) - 1) * p / 100
+        lo = int(pos)
+        hi = min(lo + 1, len(data) - 1)
+        result[p] = data[lo] + (data[hi] - data[lo]) * (pos - lo)
+    return {'mean': sum(data) / len(data), 'percentiles': result}
+
+
+def corpus_metrics(texts: Iterable[str]) -> Dict:
+    """コーパス全体の指標の分布（文ごとの指標は全記事の文をまとめて集計）"""
+    sentence_values = {key: [] for key, _, _ in SENTENCE_METRICS}
+    article_values = {key: [] for key, _, _ in ARTICLE_METRICS}
+    articles = 0
+    for content in texts:
+        result = text_metrics(content)
+        if not result['article']['sentences']:
+            continue
+        articles += 1
+        for key, values in result['sentences'].items():
+            sentence_values[key].extend(values)
+        for key in article_values:
+            article_values[key].append(result['article'][key])
+
+    return {
+        'articles': articles,
+        'sentences': len(sentence_values['kanji_ratio']),
+        'sentence': {key: summarize(values) for key, values in sentence_values.items()},
+        'article': {key: summarize(values) for key, values in article_values.items()},
+    }
+
+
+def format_table(stats: Dict) -> str:
+    """corpus_metrics の結果を Markdown の表にする"""
+    header = '| 指標 | 平均 | ' + ' | '.join('中央' if p == 50 else f"p{p}" for p in PERCENTILES) + ' |'
+    lines = [header, '|------|' + '------|' * (len(PERCENTILES) + 1)]
+    for scope, metrics, suffix in (('sentence', SENTENCE_METRICS, '（文ごと）'),
+                                   ('article', ARTICLE_METRICS, '（記事ごと）')):
+        for key, label, fmt in metrics:
+            summary = stats[scope][key]
+            cells = [fmt.format(summary['mean'])] + [fmt.format(summary['percentiles'][p]) for p in PERCENTILES]
+            lines.append(f"| {label}{suffix} | " + ' | '.join(cells) + ' |')
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='文字種の構成と読みやすさの指標を計算')
+    script_dir = Path(__file__).parent.parent
+    parser.add_argument('--articles-dir', type=Path, default=script_dir / 'corpus' / 'articles',
+                        help='記事ディレクトリ (デフォルト: corpus/articles)')
+    parser.add_argument('--json', type=Path, help='結果をJSONで保存')
+    args = parser.parse_args()
+
+    stats = corpus_metrics(iter_corpus(args.articles_dir)())
+    print(f"文字種・読みやすさ ({stats['articles']}記事 / {stats['sentences']}文)\n")
+    print(format_table(stats))
+    if args.json:
+        args.json.write_text(json.dumps(stats, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"結果を保存しました: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
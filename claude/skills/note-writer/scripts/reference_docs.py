@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+reference_docs.py - references/*.md を構造化して読み込む共通モジュール
+
+見出し階層ごとのセクション・箇条書き・表の行に分解し、解析結果を
+.cache/references/ に保存する。ファイルの mtime・サイズが変わらなければ
+キャッシュをそのまま返し、変わっていても内容のハッシュが同じなら再解析しない。
+
+使用方法:
+    from reference_docs import load_reference, load_trend_keywords
+
+    doc = load_reference(references_dir / "target_audience.md")
+    for section in doc.sections:
+        print(section.level, section.title, section.items)
+
+    python3 reference_docs.py target_audience.md   # 解析結果をJSONで表示
+
+依存パッケージ:
+    なし（標準ライブラリのみ）
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / ".cache" / "references"
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+LIST_ITEM_RE = re.compile(r'^(\s*)(?:[-*+]|\d+\.)\s+(.*)$')
+TABLE_SEPARATOR_RE = re.compile(r'^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$')
+
+
+@dataclass
+class Table:
+    """Markdownの表"""
+    headers: List[str]
+    rows: List[Dict[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class Section:
+    """見出し1つ分のセクション（子見出しの内容は含まない）"""
+    level: int
+    title: str
+    path: List[str]
+    items: List[str] = field(default_factory=list)
+    tables: List[Table] = field(default_factory=list)
+    lines: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ReferenceDocument:
+    """解析済みのリファレンス文書"""
+    path: str
+    title: str
+    sections: List[Section] = field(default_factory=list)
+
+    def find(self, title: str) -> Optional[Section]:
+        """タイトルに title を含む最初のセクションを返す"""
+        for section in self.sections:
+            if title in section.title:
+                return section
+        return None
+
+    def children(self, parent_title: str) -> List[Section]:
+        """parent_title を含む見出しの配下にあるセクションを返す"""
+        return [s for s in self.sections
+                if any(parent_title in p for p in s.path[:-1])]
+
+
+def strip_markup(text: str) -> str:
+    """強調記号と前後の鉤括弧（後ろの（注記）も含む）を取り除く"""
+    text = re.sub(r'\*\*(.+?)\*\*', r'\1', text).strip()
+    annotated = re.match(r'^「([^「」]+)」（[^）]*）$', text)
+    if annotated:
+        return annotated.group(1)
+    if text.startswith('「') and text.endswith('」') and text.count('「') == 1:
+        text = text[1:-1]
+    return text
+
+
+def _split_row(line: str) -> List[str]:
+    return [c.strip() for c in line.strip().strip('|').split('|')]
+
+
+def parse_markdown(text: str, path: str = '') -> ReferenceDocument:
+    """Markdown テキストをセクション・箇条書き・表に分解"""
+    root = Section(level=0, title='', path=[])
+    sections = [root]
+    stack: List[Section] = []
+    current = root
+    in_code = False
+    table_lines: List[str] = []
+
+    def flush_table():
+        if len(table_lines) >= 2 and TABLE_SEPARATOR_RE.match(table_lines[1]):
+            headers = _split_row(table_lines[0])
+            table = Table(headers=headers)
+            for row_line in table_lines[2:]:
+                cells = _split_row(row_line)
+                table.rows.append(dict(zip(headers, cells + [''] * (len(headers) - len(cells)))))
+            current.tables.append(table)
+        table_lines.clear()
+
+    for line in text.splitlines():
+        if line.strip().startswith('```'):
+            in_code = not in_code
+            current.lines.append(line)
+            continue
+
+        if not in_code and line.lstrip().startswith('|'):
+            table_lines.append(line)
+            current.lines.append(line)
+            continue
+        if table_lines:
+            flush_table()
+
+        heading = None if in_code else HEADING_RE.match(line)
+        if heading:
+            level = len(heading.group(1))
+            title = heading.group(2)
+            while stack and stack[-1].level >= level:
+                stack.pop()
+            current = Section(level=level, title=title,
+                              path=[s.title for s in stack] + [title])
+            stack.append(current)
+            sections.append(current)
+            continue
+
+        current.lines.append(line)
+        if not in_code:
+            item = LIST_ITEM_RE.match(line)
+            if item:
+                current.items.append(item.group(2).strip())
+
+    if table_lines:
+        flush_table()
+
+    if not root.lines or not any(l.strip() for l in root.lines):
+        sections.pop(0)
+    title = next((s.title for s in sections if s.level == 1), Path(path).stem)
+    return ReferenceDocument(path=path, title=title, sections=sections)
+
+
+_memory_cache: Dict[str, tuple] = {}
+
+
+def _cache_file(filepath: Path, cache_dir: Path) -> Path:
+    digest = hashlib.sha1(str(filepath.resolve()).encode('utf-8')).hexdigest()[:16]
+    return cache_dir / f"{filepath.stem}_{digest}.pickle"
+
+
+def load_reference(filepath: Path, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR) -> ReferenceDocument:
+    """リファレンス文書を読み込む（プロセス内とディスクの2段キャッシュ）"""
+    filepath = Path(filepath)
+    st = filepath.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = str(filepath.resolve())
+
+    cached = _memory_cache.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    cache_path = _cache_file(filepath, cache_dir) if cache_dir else None
+    entry = None
+    if cache_path and cache_path.exists():
+        try:
+            with open(cache_path, 'rb') as f:
+                entry = pickle.load(f)
+            if entry.get('version') != CACHE_VERSION:
+                entry = None
+        except Exception:
+            entry = None
+
+    if entry and (entry['mtime_ns'], entry['size']) == stamp:
+        doc = entry['doc']
+    else:
+        raw = filepath.read_bytes()
+        sha256 = hashlib.sha256(raw).hexdigest()
+        if entry and entry['sha256'] == sha256:
+            # touch されただけで内容は同じ
+            doc = entry['doc']
+        else:
+            doc = parse_markdown(raw.decode('utf-8'), str(filepath))
+        if cache_path:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({'version': CACHE_VERSION, 'mtime_ns': stamp[0], 'size': stamp[1],
+                             'sha256': sha256, 'doc': doc}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+
+    _memory_cache[key] = (stamp, doc)
+    return doc
+
+
+def load_trend_keywords(references_dir: Path) -> Dict[str, List[str]]:
+    """target_audience.md のトレンドリサーチキーワードをグループ別に返す"""
+    filepath = Path(references_dir) / "target_audience.md"
+    if not filepath.exists():
+        return {}
+
+    doc = load_reference(filepath)
+    groups: Dict[str, List[str]] = {}
+    for section in doc.children('トレンドリサーチキーワード'):
+        keywords = [strip_markup(item) for item in section.items]
+        if keywords:
+            groups[section.title] = keywords
+    return groups
+
+
+def load_backlog_themes(references_dir: Path) -> List[Dict[str, str]]:
+    """backlog_themes.md のテーマ一覧を [{'title', '言及元', '内容', ...}] で返す"""
+    doc = load_reference(Path(references_dir) / "backlog_themes.md")
+    themes = []
+    for section in doc.children('テーマ一覧'):
+        theme = {'title': re.sub(r'^\d+\.\s*', '', section.title)}
+        for item in section.items:
+            m = re.match(r'\*\*(.+?)\*\*:\s*(.*)', item)
+            if m:
+                theme[m.group(1)] = m.group(2)
+        themes.append(theme)
+    return themes
+
+
+def load_policy_examples(references_dir: Path) -> Dict[str, List[str]]:
+    """content_policy.md の NG/OK 例を返す"""
+    doc = load_reference(Path(references_dir) / "content_policy.md")
+    result = {'ng': [], 'ok': []}
+    for key, title in (('ng', 'NG例'), ('ok', 'OK例')):
+        section = doc.find(title)
+        if section:
+            result[key] = [strip_markup(item) for item in section.items]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='references/*.md の解析結果を表示')
+    parser.add_argument('file', type=Path, help='references/ からの相対パス、または任意のMarkdownファイル')
+    args = parser.parse_args()
+
+    filepath = args.file
+    if not filepath.exists():
+        filepath = Path(__file__).parent.parent / "references" / args.file
+    doc = load_reference(filepath)
+    print(json.dumps(asdict(doc), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
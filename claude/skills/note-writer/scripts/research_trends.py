@@ -4,6 +4,10 @@ research_trends.py - ターゲット層の関心トレンドを調査
 
 使用方法:
     python3 research_trends.py [--keywords "キーワード1,キーワード2"]
+    python3 research_trends.py --run     # 同梱のサンプル検索結果 (fixtures/search) で動作確認
+    python3 research_trends.py --run --backend file --backend-path <検索結果JSONのディレクトリ>
+    python3 research_trends.py --run --backend http --backend-path https://search.example/api
+    python3 research_trends.py --run --profile [all|light|cprofile,stacks,memory]
 
 注意:
     Claude CLI では web_search ツールを直接使用可能なため、
@@ -14,41 +18,31 @@ research_trends.py - ターゲット層の関心トレンドを調査
 """
 
 import os
+import re
+import json
+import time
+import hashlib
 import yaml
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
+from urllib.parse import urlparse, urlunparse
 import argparse
 
+import profiling
+from reference_docs import load_trend_keywords
+
 
 def load_target_audience(references_dir: Path) -> Dict:
     """target_audience.md からターゲット情報を読み込む"""
-    filepath = references_dir / "target_audience.md"
-
-    if not filepath.exists():
-        return {}
-
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # トレンドリサーチキーワードを抽出
-    keywords = []
-    in_keywords_section = False
-
-    for line in content.split('\n'):
-        if 'トレンドリサーチキーワード' in line:
-            in_keywords_section = True
-            continue
-        if in_keywords_section:
-            if line.startswith('#'):
-                break
-            if line.strip().startswith('-'):
-                # 「」内のキーワードを抽出
-                keyword = line.strip().lstrip('- ').strip('「」')
-                if keyword:
-                    keywords.append(keyword)
+    # トレンドリサーチキーワードを抽出（### の小見出しごとのグループ）
+    keyword_groups = load_trend_keywords(references_dir)
+    keywords = [kw for group in keyword_groups.values() for kw in group]
 
     return {
-        'keywords': keywords
+        'keywords': keywords,
+        'keyword_groups': keyword_groups
     }
 
 
@@ -63,6 +57,229 @@ def generate_search_queries(keywords: List[str]) -> List[str]:
     return queries
 
 
+class SearchBackend(ABC):
+    """検索バックエンドの基底クラス
+
+    search() は [{'title', 'url', 'snippet'}, ...] を順位順に返す。
+    identity はキャッシュキーに使う識別子で、参照先（ディレクトリ・エンドポイント）ごとに異なる。
+    """
+
+    name = 'base'
+
+    @property
+    def identity(self) -> str:
+        return self.name
+
+    @abstractmethod
+    def search(self, query: str) -> List[Dict]:
+        """query の検索結果を順位順に返す"""
+
+
+class FileSearchBackend(SearchBackend):
+    """ローカルの JSON ファイルを検索結果として返すバックエンド（テスト・オフライン用）
+
+    <directory>/<query のSHA-1>.json または <directory>/<query_slug(query)>.json を読み込む。
+    ファイルが無いクエリは結果0件として扱うが、ディレクトリ自体が無い場合は
+    FileNotFoundError を送出する（存在しない参照先の0件をキャッシュしないため）。
+    """
+
+    name = 'file'
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory).resolve()
+
+    @property
+    def identity(self) -> str:
+        return f"{self.name}:{self.directory}"
+
+    def search(self, query: str) -> List[Dict]:
+        if not self.directory.is_dir():
+            raise FileNotFoundError(f"検索結果ディレクトリがありません: {self.directory}")
+        for filename in (f"{query_key(query)}.json", f"{query_slug(query)}.json"):
+            filepath = self.directory / filename
+            if filepath.exists():
+                data = json.loads(filepath.read_text(encoding='utf-8'))
+                return data.get('results', data) if isinstance(data, dict) else data
+        return []
+
+
+class HTTPSearchBackend(SearchBackend):
+    """GET <endpoint>?q=<query> で JSON を返す検索APIのバックエンド
+
+    レスポンスは {"results": [{"title", "url", "snippet"}, ...]} を想定。
+    API キーは環境変数 SEARCH_API_KEY があれば Authorization ヘッダに付与する。
+    """
+
+    name = 'http'
+
+    def __init__(self, endpoint: str, timeout: float = 15.0):
+        import requests
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.session = requests.Session()
+        api_key = os.environ.get('SEARCH_API_KEY')
+        if api_key:
+            self.session.headers['Authorization'] = f"Bearer {api_key}"
+
+    @property
+    def identity(self) -> str:
+        return f"{self.name}:{self.endpoint}"
+
+    def search(self, query: str) -> List[Dict]:
+        response = self.session.get(self.endpoint, params={'q': query}, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        return data.get('results', []) if isinstance(data, dict) else data
+
+
+def query_key(query: str) -> str:
+    """クエリのキャッシュキー"""
+    return hashlib.sha1(query.strip().encode('utf-8')).hexdigest()
+
+
+def query_slug(query: str) -> str:
+    """クエリをファイル名に使える形にする（英数字・かな漢字以外は _ に置換）
+
+    / や .. を含むクエリで backend ディレクトリの外を読まないようにする。
+    """
+    slug = re.sub(r'[^\w-]+', '_', query.strip()).strip('_')
+    return slug or query_key(query)
+
+
+class SearchCache:
+    """TTL とサイズ上限付きのディスクキャッシュ（1クエリ1ファイル）
+
+    backend には SearchBackend.identity を渡す。同じクエリでも参照先が違えば別エントリになる。
+    """
+
+    def __init__(self, cache_dir: Path, ttl: float = 24 * 3600, max_bytes: int = 20 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, backend: str, query: str) -> Path:
+        return self.cache_dir / f"{query_key(backend + chr(0) + query.strip())}.json"
+
+    def get(self, backend: str, query: str) -> Optional[List[Dict]]:
+        """TTL 内のキャッシュがあれば結果を返す"""
+        path = self._path(backend, query)
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if time.time() - data.get('stored_at', 0) > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        return data['results']
+
+    def put(self, backend: str, query: str, results: List[Dict]):
+        """結果を保存し、サイズ上限を超えたら古い順に削除"""
+        path = self._path(backend, query)
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({'query': query, 'stored_at': time.time(), 'results': results},
+                                       ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """期限切れを削除し、合計サイズが上限以下になるまで古い順に削除"""
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob('*.json'):
+            st = path.stat()
+            if now - st.st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def normalize_url(url: str) -> str:
+    """重複判定用にURLを正規化（フラグメント・末尾スラッシュ・utm系パラメータを除去）"""
+    parsed = urlparse(url.strip())
+    query = '&'.join(q for q in parsed.query.split('&') if q and not q.startswith('utm_'))
+    path = parsed.path.rstrip('/') or '/'
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), path, '', query, ''))
+
+
+def run_searches(groups: Dict[str, List[str]], backend: SearchBackend,
+                 cache: Optional[SearchCache] = None, max_workers: int = 4) -> Dict:
+    """キーワードグループごとの検索を並列実行し、グループ単位で統合・順位付けする
+
+    同じクエリは複数グループにまたがっても1回だけ実行する。順位は
+    Reciprocal Rank Fusion（各クエリでの順位の逆数の和）で決める。
+    """
+    unique_queries = list(dict.fromkeys(q for queries in groups.values() for q in queries))
+    results: Dict[str, List[Dict]] = {}
+    stats = {'queries': len(unique_queries), 'cache_hits': 0, 'requests': 0, 'errors': 0}
+
+    pending = []
+    for q in unique_queries:
+        cached = cache.get(backend.identity, q) if cache else None
+        if cached is not None:
+            results[q] = cached
+            stats['cache_hits'] += 1
+        else:
+            pending.append(q)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {q: pool.submit(backend.search, q) for q in pending}
+            for q, future in futures.items():
+                stats['requests'] += 1
+                try:
+                    results[q] = future.result()
+                except Exception as e:
+                    print(f"  ✗ 検索失敗 ({q}): {e}")
+                    stats['errors'] += 1
+                    results[q] = []
+                    continue
+                if cache:
+                    cache.put(backend.identity, q, results[q])
+
+    merged = {}
+    for group, queries in groups.items():
+        by_url: Dict[str, Dict] = {}
+        for q in dict.fromkeys(queries):
+            for rank, item in enumerate(results.get(q, []), start=1):
+                url = item.get('url')
+                if not url:
+                    continue
+                key = normalize_url(url)
+                entry = by_url.setdefault(key, {
+                    'title': item.get('title', ''),
+                    'url': url,
+                    'snippet': item.get('snippet', ''),
+                    'score': 0.0,
+                    'queries': [],
+                })
+                entry['score'] += 1.0 / (60 + rank)
+                entry['queries'].append(q)
+        merged[group] = sorted(by_url.values(), key=lambda e: (-e['score'], e['url']))
+
+    return {'groups': merged, 'stats': stats}
+
+
+def print_search_results(report: Dict, top_n: int = 5):
+    """統合済みの検索結果を表示"""
+    stats = report['stats']
+    print("## 検索結果\n")
+    print(f"クエリ: {stats['queries']}件 / キャッシュ: {stats['cache_hits']}件 / "
+          f"リクエスト: {stats['requests']}件 / エラー: {stats['errors']}件\n")
+    for group, items in report['groups'].items():
+        print(f"### {group}（{len(items)}件）")
+        for item in items[:top_n]:
+            print(f"- {item['title']} ({item['url']})")
+        print()
+
+
 def print_research_guide(keywords: List[str]):
     """リサーチガイドを表示"""
     print("\n" + "=" * 60)
@@ -97,17 +314,66 @@ def main():
         type=str,
         help='カンマ区切りのキーワード（指定しない場合はtarget_audience.mdから取得）'
     )
+    parser.add_argument(
+        '--run',
+        action='store_true',
+        help='生成したクエリで検索を実行し、キーワードごとに統合した結果を表示'
+    )
+    parser.add_argument(
+        '--backend',
+        choices=['file', 'http'],
+        default='file',
+        help='検索バックエンド (デフォルト: file)'
+    )
+    parser.add_argument(
+        '--backend-path',
+        type=str,
+        help='file: 検索結果JSONのディレクトリ / http: 検索APIのエンドポイントURL'
+    )
+    parser.add_argument(
+        '--max-workers',
+        type=int,
+        default=4,
+        help='同時実行する検索数 (デフォルト: 4)'
+    )
+    parser.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=24 * 3600,
+        help='検索結果キャッシュの有効期間（秒, デフォルト: 86400）'
+    )
+    parser.add_argument(
+        '--cache-max-mb',
+        type=float,
+        default=20,
+        help='検索結果キャッシュの最大サイズ（MB, デフォルト: 20）'
+    )
+    parser.add_argument(
+        '--output',
+        type=Path,
+        help='統合した検索結果をJSONで保存'
+    )
+    profiling.add_arguments(parser)
     args = parser.parse_args()
 
+    with profiling.session(args, 'research_trends'):
+        run(args)
+
+
+def run(args):
+    """引数に従ってクエリ生成・検索を実行"""
     # スクリプトのディレクトリからの相対パスでreferencesを探す
     script_dir = Path(__file__).parent.parent
     references_dir = script_dir / "references"
 
+    keyword_groups = {}
     if args.keywords:
         keywords = [k.strip() for k in args.keywords.split(',')]
     else:
-        target_data = load_target_audience(references_dir)
+        with profiling.phase('load_references'):
+            target_data = load_target_audience(references_dir)
         keywords = target_data.get('keywords', [])
+        keyword_groups = target_data.get('keyword_groups', {})
 
     if not keywords:
         print("キーワードが見つかりません。")
@@ -125,6 +391,37 @@ def main():
         print(f"- {q}")
     print()
 
+    if not args.run:
+        return
+
+    if args.backend == 'http':
+        if not args.backend_path:
+            print("--backend http には --backend-path でエンドポイントURLを指定してください。")
+            return
+        backend = HTTPSearchBackend(args.backend_path)
+    else:
+        backend = FileSearchBackend(Path(args.backend_path) if args.backend_path
+                                    else script_dir / 'fixtures' / 'search')
+        if not backend.directory.is_dir():
+            print(f"検索結果ディレクトリがありません: {backend.directory}")
+            print("--backend-path で検索結果JSONのディレクトリを指定してください。")
+            return
+
+    cache = SearchCache(script_dir / '.cache' / 'search', ttl=args.cache_ttl,
+                        max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    if keyword_groups:
+        groups = {name: generate_search_queries(kws) for name, kws in keyword_groups.items()}
+    else:
+        groups = {kw: generate_search_queries([kw]) for kw in keywords}
+    with profiling.phase('search'):
+        report = run_searches(groups, backend, cache, max_workers=args.max_workers)
+    with profiling.phase('report'):
+        print_search_results(report)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"検索結果を保存しました: {args.output}")
+
 
 if __name__ == "__main__":
     main()
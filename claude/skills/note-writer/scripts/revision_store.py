@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+revision_store.py - 記事の版（取得したMarkdown）を差分で保存する履歴ストア
+
+--update-check で更新された記事は上書き保存されるため、著者が過去記事に加えた
+修正の前の版は残らない。このストアは記事ごとに、1つ前の版へ戻すための行単位の逆差分を
+持つ。最新版の全文は持たず、corpus/articles/ の記事ファイルそのものを最新版として
+扱うため、ストアは修正分に近いサイズで収まり、記事と一緒に git で管理できる。
+最新版から辿る差分の合計が記事1本分を超える版は全文で残し、古い版の復元で適用する
+差分の量を抑える。
+
+    history/<article_id>.json
+        path: 記事ファイルの articles/ からの相対パス（最新版）
+        revisions: [{rev, date_modified, recorded_at, sha256, size, delta | text}, ...]
+            delta は1つ新しい版からこの版を作る操作列:
+            ["=", n] n行そのまま / ["-", n] n行削除 / ["+", [行, ...]] 挿入
+
+記事ファイルを書き換える処理は、新しい版なら record、画像リンクの書き換えのように
+版を変えない書き換えなら amend で書き換え前後の内容を渡す。渡さずに書き換えると
+最新版から差分を辿れなくなり、直近の全文の版より新しい版は復元できなくなる
+（record がそれを検出した場合は lost として記録する）。
+
+使用方法:
+    python3 revision_store.py history <article_id>          # 版の一覧と各版の差分
+    python3 revision_store.py history <article_id> --rev 2  # 版2の全文
+    python3 revision_store.py history <article_id> --diff 1 3
+    python3 revision_store.py snapshot   # 履歴の無い記事の現在の内容を最初の版として記録
+    python3 revision_store.py stats
+
+    from revision_store import RevisionStore
+    store = RevisionStore(corpus_dir / 'history', corpus_dir / 'articles')
+    store.record(article_id, markdown, date_modified, previous=old_markdown, path=relpath)
+
+依存パッケージ:
+    なし（標準ライブラリのみ）
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from corpus_layout import list_articles, read_frontmatter, state_lock
+
+
+def make_delta(source: List[str], target: List[str]) -> List[list]:
+    """source の行から target の行を作る操作列"""
+    delta = []
+    matcher = difflib.SequenceMatcher(None, source, target, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append(['=', i2 - i1])
+            continue
+        if i2 > i1:
+            delta.append(['-', i2 - i1])
+        if j2 > j1:
+            delta.append(['+', target[j1:j2]])
+    return delta
+
+
+def apply_delta(source: List[str], delta: List[list]) -> List[str]:
+    """make_delta の操作列を source に適用する"""
+    result = []
+    pos = 0
+    for op, arg in delta:
+        if op == '=':
+            result.extend(source[pos:pos + arg])
+            pos += arg
+        elif op == '-':
+            pos += arg
+        else:
+            result.extend(arg)
+    return result
+
+
+def _delta_size(delta: List[list]) -> int:
+    """差分の大きさ（挿入する文字数 + 操作数）"""
+    return sum(sum(map(len, arg)) if op == '+' else 1 for op, arg in delta)
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _atomic_write_text(filepath: Path, text: str):
+    """一時ファイルに書き込んでから置き換える"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class RevisionStore:
+    """記事ごとの版を逆差分で保存する（最新版は記事ファイル）"""
+
+    def __init__(self, history_dir: Path, articles_dir: Optional[Path] = None):
+        self.history_dir = Path(history_dir)
+        self.articles_dir = Path(articles_dir) if articles_dir else self.history_dir.parent / 'articles'
+
+    def _path(self, article_id: str) -> Path:
+        return self.history_dir / f"{article_id}.json"
+
+    def load(self, article_id: str) -> Dict:
+        path = self._path(article_id)
+        if not path.exists():
+            return {'version': 2, 'article_id': article_id, 'path': None, 'revisions': []}
+        return json.loads(path.read_text(encoding='utf-8'))
+
+    def _save(self, data: Dict):
+        # 以前の形式（version 1）が持っていた最新版の全文は、記事ファイルがあるため残さない
+        data.pop('head', None)
+        data['version'] = 2
+        _atomic_write_text(self._path(data['article_id']),
+                           json.dumps(data, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def article_ids(self) -> List[str]:
+        if not self.history_dir.exists():
+            return []
+        return sorted(p.stem for p in self.history_dir.glob('*.json'))
+
+    def revisions(self, article_id: str) -> List[Dict]:
+        """版の一覧（差分・全文は除く）"""
+        return [{k: v for k, v in r.items() if k not in ('delta', 'text')}
+                for r in self.load(article_id)['revisions']]
+
+    def article_path(self, data: Dict) -> Optional[Path]:
+        """最新版の記事ファイル（配置の移行で動いていれば探し直す）"""
+        if data.get('path'):
+            path = self.articles_dir / data['path']
+            if path.exists():
+                return path
+        return next(self.articles_dir.rglob(f"*_{data['article_id']}.md"), None)
+
+    def _head(self, data: Dict) -> str:
+        """最新版の全文（記事ファイルが最新版と異なれば ValueError）"""
+        if 'head' in data:
+            return data['head']
+        path = self.article_path(data)
+        if path is None:
+            raise ValueError(f"最新版の記事ファイルがありません: {data['article_id']}")
+        text = path.read_text(encoding='utf-8')
+        if _sha256(text) != data['revisions'][-1]['sha256']:
+            raise ValueError(f"記事ファイルが履歴の最新版と異なります（記録せずに書き換えられた）: {path}")
+        return text
+
+    def record(self, article_id: str, text: str, date_modified: Optional[str] = None,
+               recorded_at: Optional[datetime] = None, previous: Optional[str] = None,
+               path: Optional[str] = None) -> Optional[int]:
+        """記事ファイルを text に書き換える版を記録する（最新版と同じ内容なら記録せず None）
+
+        Args:
+            previous: 書き換える前の記事ファイルの内容（省略時は記事ファイルを読む。
+                      記事ファイルを書き換えてから呼ぶ場合は必ず渡す）
+            path: 記事ファイルの articles/ からの相対パス
+
+        Returns:
+            記録した版の番号（1から）
+        """
+        data = self.load(article_id)
+        if path:
+            data['path'] = path
+        sha256 = _sha256(text)
+        revisions = data['revisions']
+        if revisions and revisions[-1]['sha256'] == sha256:
+            if path:
+                self._save(data)
+            return None
+
+        if revisions:
+            if 'head' in data:
+                previous = data['head']
+            elif previous is None:
+                filepath = self.article_path(data)
+                previous = filepath.read_text(encoding='utf-8') if filepath else ''
+            if _sha256(previous) == revisions[-1]['sha256']:
+                self._push_back(revisions, text, previous)
+            else:
+                self._mark_lost(revisions)
+        rev = revisions[-1]['rev'] + 1 if revisions else 1
+        revisions.append({
+            'rev': rev,
+            'date_modified': date_modified,
+            'recorded_at': (recorded_at or datetime.now()).isoformat(),
+            'sha256': sha256,
+            'size': len(text.encode('utf-8')),
+        })
+        self._save(data)
+        return rev
+
+    @staticmethod
+    def _push_back(revisions: List[Dict], text: str, previous: str):
+        """これまでの最新版（内容 previous）を新しい版 text からの逆差分にする
+
+        1つ前の全文までの差分が記事より大きくなる場合は全文で残す。
+        """
+        latest = revisions[-1]
+        latest.pop('delta', None)
+        latest.pop('text', None)
+        delta = make_delta(text.splitlines(keepends=True), previous.splitlines(keepends=True))
+        chain = _delta_size(delta)
+        for r in reversed(revisions[:-1]):
+            if 'delta' not in r:
+                break
+            chain += _delta_size(r['delta'])
+        if chain > len(previous):
+            latest['text'] = previous
+        else:
+            latest['delta'] = delta
+
+    @staticmethod
+    def _mark_lost(revisions: List[Dict]):
+        """最新版の内容が分からなくなったため、直近の全文の版より新しい版を復元不能にする"""
+        for r in reversed(revisions):
+            if 'text' in r:
+                break
+            r.pop('delta', None)
+            r['lost'] = True
+
+    def amend(self, article_id: str, old_text: str, new_text: str, path: Optional[str] = None) -> bool:
+        """版を変えない記事ファイルの書き換え（画像リンク・配置の移行など）を最新版に反映する
+
+        最新版の内容を new_text に差し替え、1つ前の版の逆差分を new_text から作り直す。
+        履歴が無い・old_text が最新版でない場合は何もしない。
+
+        Args:
+            path: 記事ファイルを移動した場合の新しい articles/ からの相対パス
+        """
+        data = self.load(article_id)
+        revisions = data['revisions']
+        if not revisions or _sha256(data.get('head', old_text)) != revisions[-1]['sha256']:
+            return False
+        if path:
+            data['path'] = path
+        if new_text != old_text:
+            if len(revisions) > 1 and 'delta' in revisions[-2]:
+                older = apply_delta(old_text.splitlines(keepends=True), revisions[-2]['delta'])
+                revisions[-2]['delta'] = make_delta(new_text.splitlines(keepends=True), older)
+            revisions[-1]['sha256'] = _sha256(new_text)
+            revisions[-1]['size'] = len(new_text.encode('utf-8'))
+        self._save(data)
+        return True
+
+    def text(self, article_id: str, rev: Optional[int] = None) -> str:
+        """版 rev（省略時は最新版）の全文を復元する"""
+        data = self.load(article_id)
+        revisions = data['revisions']
+        if not revisions:
+            raise KeyError(f"履歴がありません: {article_id}")
+        rev = rev or revisions[-1]['rev']
+        index = next((i for i, r in enumerate(revisions) if r['rev'] == rev), None)
+        if index is None:
+            raise KeyError(f"版 {rev} はありません: {article_id}")
+        if revisions[index].get('lost'):
+            raise KeyError(f"版 {rev} は復元できません: {article_id}")
+
+        # rev 以降で最も近い全文（全文で残した版か記事ファイル）から逆差分を順に適用する
+        start = next((i for i in range(index, len(revisions) - 1) if 'text' in revisions[i]),
+                     len(revisions) - 1)
+        lines = (revisions[start]['text'] if start < len(revisions) - 1 else self._head(data)).splitlines(keepends=True)
+        for i in range(start - 1, index - 1, -1):
+            lines = apply_delta(lines, revisions[i]['delta'])
+        return ''.join(lines)
+
+    def texts(self, article_id: str) -> Dict[int, str]:
+        """復元できる全版の全文（最新版から1回ずつ逆差分を適用して復元する）"""
+        data = self.load(article_id)
+        revisions = data['revisions']
+        result = {}
+        lines = None
+        for i in range(len(revisions) - 1, -1, -1):
+            r = revisions[i]
+            if 'text' in r:
+                lines = r['text'].splitlines(keepends=True)
+            elif r.get('lost'):
+                lines = None
+            elif i == len(revisions) - 1:
+                lines = self._head(data).splitlines(keepends=True)
+            elif lines is not None:
+                lines = apply_delta(lines, r['delta'])
+            if lines is not None:
+                result[r['rev']] = ''.join(lines)
+        return result
+
+    def diff(self, article_id: str, old_rev: int, new_rev: int) -> List[str]:
+        """2つの版の unified diff"""
+        return unified_diff(article_id, old_rev, self.text(article_id, old_rev),
+                            new_rev, self.text(article_id, new_rev))
+
+    def summary(self) -> Dict[str, int]:
+        """記事数・版数・過去の版の合計サイズ・ストアのサイズ"""
+        totals = {'articles': 0, 'revisions': 0, 'past_bytes': 0, 'store_bytes': 0}
+        for article_id in self.article_ids():
+            data = self.load(article_id)
+            totals['articles'] += 1
+            totals['revisions'] += len(data['revisions'])
+            totals['past_bytes'] += sum(r['size'] for r in data['revisions'][:-1])
+            totals['store_bytes'] += self._path(article_id).stat().st_size
+        return totals
+
+
+def unified_diff(article_id: str, old_rev: int, old_text: str, new_rev: int, new_text: str) -> List[str]:
+    return list(difflib.unified_diff(old_text.splitlines(keepends=True), new_text.splitlines(keepends=True),
+                                     fromfile=f"{article_id}@{old_rev}", tofile=f"{article_id}@{new_rev}"))
+
+
+def snapshot(store: RevisionStore, articles_dir: Path) -> Dict[str, int]:
+    """現在の記事ファイルを版として記録する
+
+    履歴の無い記事は最初の版になる。記録せずに書き換えられていた記事（手で編集したなど）は
+    新しい版として記録するが、書き換え前の最新版の内容は分からないため、直近の全文の版より
+    新しい版は復元できなくなる（diverged に数える）。
+    """
+    stats = {'recorded': 0, 'diverged': 0}
+    with state_lock(articles_dir):
+        for filepath in list_articles(articles_dir):
+            meta = read_frontmatter(filepath)
+            if not meta.get('article_id'):
+                continue
+            article_id = str(meta['article_id'])
+            text = filepath.read_text(encoding='utf-8')
+            had_history = bool(store.revisions(article_id))
+            rev = store.record(article_id, text, meta.get('date_modified'), previous=text,
+                               path=filepath.relative_to(articles_dir).as_posix())
+            if rev is not None:
+                stats['recorded'] += 1
+                stats['diverged'] += had_history
+    return stats
+
+
+def print_history(store: RevisionStore, article_id: str):
+    """版の一覧と、各版で変わった内容"""
+    revisions = store.revisions(article_id)
+    if not revisions:
+        print(f"履歴がありません: {article_id}")
+        return
+    print(f"# {article_id}（{len(revisions)}版）")
+    for r in revisions:
+        lost = '  （復元不能）' if r.get('lost') else ''
+        print(f"  版{r['rev']:3d}  更新日 {r['date_modified'] or '-':25s}  記録 {r['recorded_at'][:19]}  "
+              f"{r['size']}バイト{lost}")
+    texts = store.texts(article_id)
+    for older, newer in zip(revisions, revisions[1:]):
+        if older['rev'] not in texts or newer['rev'] not in texts:
+            continue
+        print(f"\n## 版{older['rev']} → 版{newer['rev']}")
+        sys.stdout.writelines(unified_diff(article_id, older['rev'], texts[older['rev']],
+                                           newer['rev'], texts[newer['rev']])[2:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='記事の版の履歴を表示・記録')
+    script_dir = Path(__file__).parent.parent
+    parser.add_argument('command', choices=['history', 'snapshot', 'stats'])
+    parser.add_argument('article_id', nargs='?', help='history: 記事ID')
+    parser.add_argument('--rev', type=int, help='history: この版の全文を表示')
+    parser.add_argument('--diff', type=int, nargs=2, metavar=('OLD', 'NEW'), help='history: 2つの版の差分を表示')
+    parser.add_argument('--history-dir', type=Path, default=script_dir / 'corpus' / 'history',
+                        help='履歴ディレクトリ (デフォルト: corpus/history)')
+    parser.add_argument('--articles-dir', type=Path, default=script_dir / 'corpus' / 'articles',
+                        help='記事ディレクトリ (デフォルト: corpus/articles)')
+    args = parser.parse_args()
+
+    store = RevisionStore(args.history_dir, args.articles_dir)
+    if args.command == 'snapshot':
+        stats = snapshot(store, args.articles_dir)
+        print(f"{stats['recorded']}記事の版を記録しました")
+        if stats['diverged']:
+            print(f"  うち{stats['diverged']}記事は記録せずに書き換えられていたため、直前の版を復元できません")
+    elif args.command == 'stats':
+        totals = store.summary()
+        print(f"{totals['articles']}記事 / {totals['revisions']}版 / 過去の版 {totals['past_bytes'] / 1024:.1f}KB / "
+              f"ストア {totals['store_bytes'] / 1024:.1f}KB")
+    else:
+        if not args.article_id:
+            parser.error('history には記事IDを指定してください')
+        try:
+            if args.rev:
+                sys.stdout.write(store.text(args.article_id, args.rev))
+            elif args.diff:
+                sys.stdout.writelines(store.diff(args.article_id, *args.diff))
+            else:
+                print_history(store, args.article_id)
+        except (KeyError, ValueError) as e:
+            print(f"Error: {e.args[0]}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+topic_coverage.py - 未執筆テーマ・リサーチキーワードがコーパスでどれだけ書かれているかを測る
+
+backlog_themes.md のテーマと target_audience.md のキーワードグループを記事と同じ
+TF-IDF 空間の疎ベクトルにし、全記事とのコサイン類似度を1回の行列計算で求める。
+類似度上位の記事の平均を「カバー率」とし、低い順（まだ書かれていない順）に並べる。
+
+語は形態素解析を使わず、漢字の連続（2文字ずつ）・カタカナ語・英字の語から作る
+（ひらがなは助詞・助動詞が多いため使わない）。記事ごとの語の出現数は
+.cache/topic_coverage.pickle に保存し、mtime・サイズが変わった記事だけ数え直す。
+
+使用方法:
+    python3 topic_coverage.py [--top-articles 3] [--json coverage.json]
+
+    from topic_coverage import CoverageEngine, TermIndex, load_topics
+    engine = CoverageEngine(TermIndex(articles_dir))
+    ranking = engine.coverage(load_topics(references_dir))
+
+出力:
+    テーマ・キーワードグループをカバー率の低い順に表示（類似度の高い記事つき）
+
+依存パッケージ:
+    なし（標準ライブラリのみ）
+    pip install numpy  # 任意: 類似度のベクトル計算
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+import pickle
+import re
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from corpus_layout import list_articles
+from phrase_discovery import clean_text
+
+# オプション: 類似度のベクトル計算用（無ければ純Pythonで同じ値を計算）
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / ".cache" / "topic_coverage.pickle"
+
+KANJI_RUN_RE = re.compile(r'[一-鿿々〆ヶ]{2,}')
+KATAKANA_RUN_RE = re.compile(r'[ァ-ヺー]{2,}')
+LATIN_WORD_RE = re.compile(r'[A-Za-z][A-Za-z0-9]+')
+FRONTMATTER_RE = re.compile(r'\A---\n.*?\n---\n', re.DOTALL)
+TITLE_RE = re.compile(r'^title:\s*[\'"]?(.*?)[\'"]?\s*$', re.MULTILINE)
+
+
+def extract_terms(text: str) -> Counter:
+    """本文から語（漢字2文字・カタカナ語・英字の語）の出現数を数える"""
+    text = unicodedata.normalize('NFKC', text)
+    terms = Counter()
+    for run in KANJI_RUN_RE.findall(text):
+        terms.update(run[i:i + 2] for i in range(len(run) - 1))
+    terms.update(KATAKANA_RUN_RE.findall(text))
+    terms.update(word.lower() for word in LATIN_WORD_RE.findall(text))
+    return terms
+
+
+class TermIndex:
+    """記事ごとの語の出現数（語ID・出現数の配列）を保持し、変わった記事だけ数え直す"""
+
+    def __init__(self, articles_dir: Path, cache_path: Optional[Path] = DEFAULT_CACHE_PATH):
+        self.articles_dir = Path(articles_dir)
+        self.cache_path = cache_path
+        self.vocab: Dict[str, int] = {}
+        self.entries: Dict[str, Dict] = {}
+        self._load_cache()
+
+    def _load_cache(self):
+        if not self.cache_path or not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'rb') as f:
+                data = pickle.load(f)
+        except Exception:
+            return
+        if data.get('version') == CACHE_VERSION and data.get('articles_dir') == str(self.articles_dir.resolve()):
+            self.vocab = data['vocab']
+            self.entries = data['entries']
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': CACHE_VERSION, 'articles_dir': str(self.articles_dir.resolve()),
+                         'vocab': self.vocab, 'entries': self.entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_path)
+
+    def term_id(self, term: str) -> int:
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            term_id = self.vocab[term] = len(self.vocab)
+        return term_id
+
+    def refresh(self) -> Dict[str, int]:
+        """ファイルを stat で照合し、追加・変更された記事だけ数え直す"""
+        changes = {'added': 0, 'changed': 0, 'removed': 0}
+        seen = set()
+        for filepath in list_articles(self.articles_dir):
+            st = filepath.stat()
+            key = filepath.relative_to(self.articles_dir).as_posix()
+            seen.add(key)
+            entry = self.entries.get(key)
+            if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+                continue
+            changes['changed' if entry else 'added'] += 1
+            self.entries[key] = self._count(filepath, st)
+
+        for key in set(self.entries) - seen:
+            del self.entries[key]
+            changes['removed'] += 1
+
+        if any(changes.values()):
+            self._save_cache()
+        return changes
+
+    def _count(self, filepath: Path, st) -> Dict:
+        text = filepath.read_text(encoding='utf-8')
+        frontmatter = FRONTMATTER_RE.match(text)
+        title_match = TITLE_RE.search(frontmatter.group(0)) if frontmatter else None
+        body = text[frontmatter.end():] if frontmatter else text
+        counts = extract_terms(clean_text(body))
+        # 語IDの昇順で持つ（記事内で語は重複しない）
+        pairs = sorted((self.term_id(term), count) for term, count in counts.items())
+        return {
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'title': title_match.group(1) if title_match else filepath.stem,
+            'terms': array('i', (term_id for term_id, _ in pairs)),
+            'counts': array('i', (count for _, count in pairs)),
+        }
+
+
+def load_topics(references_dir: Path) -> List[Dict[str, str]]:
+    """未執筆テーマ（タイトル・内容・関連テーマ）とキーワードグループを比較対象にする"""
+    from reference_docs import load_backlog_themes, load_trend_keywords
+
+    references_dir = Path(references_dir)
+    topics = []
+    if (references_dir / "backlog_themes.md").exists():
+        for theme in load_backlog_themes(references_dir):
+            if '消化済み' in theme['title']:
+                continue
+            text = ' '.join([theme['title'], theme.get('内容', ''), theme.get('関連テーマ', '')])
+            topics.append({'kind': 'theme', 'name': theme['title'], 'text': text})
+    for group, keywords in load_trend_keywords(references_dir).items():
+        topics.append({'kind': 'keywords', 'name': group, 'text': ' '.join([group] + keywords)})
+    return topics
+
+
+class CoverageEngine:
+    """テーマと記事の TF-IDF コサイン類似度からカバー率を求める
+
+    語の重みは (1 + log tf) × idf、idf = log((1 + 記事数) / (1 + df)) + 1。
+    コーパスに無い語もテーマ側のノルムには含めるため、書かれていない語が多い
+    テーマほど類似度が下がる。
+    """
+
+    def __init__(self, index: TermIndex):
+        self.index = index
+
+    def similarities(self, texts: List[str]):
+        """各テキストと全記事のコサイン類似度（テキスト数 × 記事数）と記事キーの一覧"""
+        self.index.refresh()
+        keys = sorted(self.index.entries)
+        queries = [extract_terms(text) for text in texts]
+        if NUMPY_AVAILABLE:
+            return self._similarities_numpy(keys, queries), keys
+        return self._similarities_python(keys, queries), keys
+
+    def _similarities_numpy(self, keys: List[str], queries: List[Counter]):
+        entries = [self.index.entries[key] for key in keys]
+        n_docs = len(entries)
+        vocab_size = max(len(self.index.vocab), 1)
+        lengths = np.array([len(e['terms']) for e in entries], dtype=np.int64)
+        terms = (np.concatenate([np.frombuffer(e['terms'], dtype=np.int32) for e in entries])
+                 if entries else np.zeros(0, dtype=np.int32))
+        counts = (np.concatenate([np.frombuffer(e['counts'], dtype=np.int32) for e in entries])
+                  if entries else np.zeros(0, dtype=np.int32))
+        doc_ids = np.repeat(np.arange(n_docs), lengths)
+
+        df = np.bincount(terms, minlength=vocab_size)
+        idf = np.log((1 + n_docs) / (1 + df)) + 1
+        unseen_idf = math.log(1 + n_docs) + 1
+        weights = (1 + np.log(counts)) * idf[terms]
+        doc_norms = np.sqrt(np.bincount(doc_ids, weights=weights * weights, minlength=n_docs))
+
+        # テーマ側の語だけを列にした文書行列（記事数 × テーマの語数）
+        query_terms = sorted({self.index.vocab[t] for q in queries for t in q if t in self.index.vocab})
+        column = np.full(vocab_size, -1, dtype=np.int64)
+        column[query_terms] = np.arange(len(query_terms))
+        q_matrix = np.zeros((len(queries), len(query_terms)))
+        q_norms = np.zeros(len(queries))
+        for row, query in enumerate(queries):
+            for term, count in query.items():
+                term_id = self.index.vocab.get(term)
+                weight = (1 + math.log(count)) * (idf[term_id] if term_id is not None else unseen_idf)
+                q_norms[row] += weight * weight
+                if term_id is not None:
+                    q_matrix[row, column[term_id]] = weight
+        q_norms = np.sqrt(q_norms)
+
+        cols = column[terms]
+        hit = cols >= 0
+        d_matrix = np.zeros((n_docs, len(query_terms)))
+        d_matrix[doc_ids[hit], cols[hit]] = weights[hit]
+
+        denom = np.outer(q_norms, doc_norms)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sims = np.where(denom > 0, (q_matrix @ d_matrix.T) / denom, 0.0)
+        return sims.tolist()
+
+    def _similarities_python(self, keys: List[str], queries: List[Counter]) -> List[List[float]]:
+        entries = [self.index.entries[key] for key in keys]
+        n_docs = len(entries)
+        df = Counter()
+        for entry in entries:
+            df.update(entry['terms'])
+
+        def idf(term_id: Optional[int]) -> float:
+            return math.log((1 + n_docs) / (1 + (df[term_id] if term_id is not None else 0))) + 1
+
+        q_vectors = []
+        q_norms = []
+        for query in queries:
+            vector = {}
+            norm = 0.0
+            for term, count in query.items():
+                term_id = self.index.vocab.get(term)
+                weight = (1 + math.log(count)) * idf(term_id)
+                norm += weight * weight
+                if term_id is not None:
+                    vector[term_id] = weight
+            q_vectors.append(vector)
+            q_norms.append(math.sqrt(norm))
+
+        sims = [[0.0] * n_docs for _ in queries]
+        for col, entry in enumerate(entries):
+            norm = 0.0
+            dots = [0.0] * len(queries)
+            for term_id, count in zip(entry['terms'], entry['counts']):
+                weight = (1 + math.log(count)) * idf(term_id)
+                norm += weight * weight
+                for row, vector in enumerate(q_vectors):
+                    if term_id in vector:
+                        dots[row] += weight * vector[term_id]
+            norm = math.sqrt(norm)
+            for row in range(len(queries)):
+                if norm and q_norms[row]:
+                    sims[row][col] = dots[row] / (norm * q_norms[row])
+        return sims
+
+    def coverage(self, topics: List[Dict[str, str]], top_articles: int = 3,
+                 threshold: float = 0.1) -> List[Dict]:
+        """テーマをカバー率（類似度上位 top_articles 記事の平均）の低い順に返す"""
+        sims, keys = self.similarities([topic['text'] for topic in topics])
+        ranking = []
+        for topic, row in zip(topics, sims):
+            best = heapq.nlargest(top_articles, range(len(row)), key=row.__getitem__)
+            scores = [row[i] for i in best]
+            ranking.append({
+                'kind': topic['kind'],
+                'name': topic['name'],
+                'coverage': round(sum(scores) / top_articles, 4) if top_articles else 0.0,
+                'max_similarity': round(scores[0], 4) if scores else 0.0,
+                'articles_above_threshold': sum(1 for s in row if s >= threshold),
+                'closest': [{'path': keys[i], 'title': self.index.entries[keys[i]]['title'],
+                             'similarity': round(row[i], 4)} for i in best],
+            })
+        ranking.sort(key=lambda r: (r['coverage'], r['name']))
+        return ranking
+
+
+def print_ranking(ranking: List[Dict], articles: int, threshold: float):
+    """カバー率の低い順に表示"""
+    print("\n" + "=" * 60)
+    print(f"テーマのカバー率（{articles}記事, 低い順 = まだ書かれていない）")
+    print("=" * 60)
+    for item in ranking:
+        label = 'テーマ' if item['kind'] == 'theme' else 'キーワード'
+        print(f"\n[{label}] {item['name']}")
+        print(f"  カバー率 {item['coverage']:.3f} / 最大類似度 {item['max_similarity']:.3f} / "
+              f"類似度{threshold}以上 {item['articles_above_threshold']}記事")
+        for article in item['closest']:
+            print(f"    {article['similarity']:.3f}  {article['title']}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='未執筆テーマ・キーワードのコーパスでのカバー率を測る')
+    script_dir = Path(__file__).parent.parent
+    parser.add_argument('--articles-dir', type=Path, default=script_dir / 'corpus' / 'articles',
+                        help='記事ディレクトリ (デフォルト: corpus/articles)')
+    parser.add_argument('--references-dir', type=Path, default=script_dir / 'references',
+                        help='リファレンスディレクトリ (デフォルト: references)')
+    parser.add_argument('--top-articles', type=int, default=3,
+                        help='カバー率に使う類似度上位の記事数 (デフォルト: 3)')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='「書かれている」とみなす類似度 (デフォルト: 0.1)')
+    parser.add_argument('--no-cache', action='store_true', help='キャッシュを使わずに数え直す')
+    parser.add_argument('--json', type=Path, help='結果をJSONで保存')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = TermIndex(args.articles_dir, cache_path=None if args.no_cache else DEFAULT_CACHE_PATH)
+    ranking = CoverageEngine(index).coverage(load_topics(args.references_dir), args.top_articles, args.threshold)
+    print_ranking(ranking, len(index.entries), args.threshold)
+    print(f"({time.perf_counter() - started:.2f}秒)")
+    if args.json:
+        args.json.write_text(json.dumps(ranking, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"結果を保存しました: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""scripts/ のモジュールを import できるようにする（スクリプトは同じディレクトリ同士で import している）"""
+
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / 'scripts'
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
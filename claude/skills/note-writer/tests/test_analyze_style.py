@@ -0,0 +1,110 @@
+"""analyze_style: コーパス統計の一致・文体推移のキャッシュ更新と要約"""
+
+import re
+from collections import Counter
+from pathlib import Path
+
+from analyze_style import CONNECTORS, StyleAnalyzer, StyleDriftTracker
+from corpus_layout import list_articles
+
+
+def write_article(articles_dir, day, body):
+    path = articles_dir / f"day{day:04d}_n{day:012x}.md"
+    path.write_text(f"---\nday_number: {day}\npublish_datetime: '2025-12-{day:02d}T07:00:00'\n---\n\n{body}\n",
+                    encoding='utf-8')
+    return path
+
+
+def make_corpus(tmp_path, days):
+    articles_dir = tmp_path / 'articles'
+    articles_dir.mkdir()
+    for day in range(1, days + 1):
+        write_article(articles_dir, day, 'これは検証用の文章です。そして次の文に続きます。')
+    return articles_dir
+
+
+def test_touched_refresh_only_reads_touched_articles(tmp_path):
+    articles_dir = make_corpus(tmp_path, 3)
+    tracker = StyleDriftTracker(tmp_path)
+    assert tracker.refresh() == 3
+    cache_bytes = tracker.cache_path.read_bytes()
+
+    added = write_article(articles_dir, 4, 'だから結論はこうだ。')
+    (articles_dir / 'day0002_n000000000002.md').unlink()
+    recomputed = tracker.refresh([added, articles_dir / 'day0002_n000000000002.md'])
+
+    assert recomputed == 1
+    assert tracker.cache_path.read_bytes() == cache_bytes
+    assert tracker.journal_path.exists()
+    # キャッシュとジャーナルを読み直すと、全件を照合したのと同じ状態になる
+    reloaded = StyleDriftTracker(tmp_path)
+    reloaded.entries = reloaded._load_cache()
+    full = StyleDriftTracker(tmp_path)
+    full.refresh()
+    assert reloaded.entries == full.entries
+    assert sorted(e['day_number'] for e in full.entries.values()) == [1, 3, 4]
+    assert not full.journal_path.exists()
+
+
+def test_drift_arrow_compares_displayed_values():
+    def row(day, ratio, length):
+        return {'day_number': day, 'avg_sentence_length_rolling': length, 'desu_masu_ratio_rolling': ratio,
+                'connectors_per_1k_rolling': 1.0, 'headings_per_1k_rolling': 1.0}
+
+    series = [row(1, 0.9996, 30.0), row(2, 0.9999, 30.04), row(3, 1.0, 31.0)]
+    table = StyleAnalyzer._format_style_drift(series, 1)
+
+    assert '| です・ます率 | 100% | 100% | → |' in table
+    assert '| 平均文長（文字） | 30.0 | 31.0 | ↑ |' in table
+
+
+def test_style_guide_uses_drift_window(tmp_path):
+    make_corpus(tmp_path, 4)
+    analyzer = StyleAnalyzer(tmp_path)
+    analyzer.load_articles()
+
+    assert '直近2記事の移動平均' in analyzer.generate_style_guide(drift_window=2)
+    assert '### 文体の推移' not in analyzer.generate_style_guide(drift_window=7)
+
+
+CORPUS_DIR = Path(__file__).resolve().parent.parent / 'corpus'
+
+
+def baseline_stats(corpus_dir):
+    """配列化する前の実装（全文を保持し、連結した文字列から数える）"""
+    contents = [StyleAnalyzer.read_content(path) for path in list_articles(corpus_dir / 'articles')]
+    lengths = sorted(len(s.strip()) for c in contents for s in re.split(r'[。！？\n]', c)
+                     if s.strip() and len(s.strip()) > 5)
+    all_text = ' '.join(contents)
+    connectors = Counter({conn: all_text.count(conn) for conn in CONNECTORS if all_text.count(conn)})
+    return {
+        'sentences': {'avg': sum(lengths) / len(lengths), 'min': lengths[0], 'max': lengths[-1],
+                      'median': lengths[len(lengths) // 2], 'total_sentences': len(lengths)},
+        'connectors': dict(connectors.most_common(10)),
+        'endings': {
+            'です': len(re.findall(r'です[。\n]', all_text)),
+            'ます': len(re.findall(r'ます[。\n]', all_text)),
+            'でした': len(re.findall(r'でした[。\n]', all_text)),
+            'ました': len(re.findall(r'ました[。\n]', all_text)),
+            'だ': len(re.findall(r'[^し]だ[。\n]', all_text)),
+            'である': len(re.findall(r'である[。\n]', all_text)),
+        },
+        'first_person': {
+            '私': all_text.count('私は') + all_text.count('私の') + all_text.count('私が'),
+            '僕': all_text.count('僕は') + all_text.count('僕の') + all_text.count('僕が'),
+        },
+    }
+
+
+def test_corpus_statistics_match_baseline():
+    analyzer = StyleAnalyzer(CORPUS_DIR)
+    analyzer.load_articles()
+    baseline = baseline_stats(CORPUS_DIR)
+
+    stats = analyzer.analyze_sentence_length()
+    expressions = analyzer.analyze_frequent_expressions()
+
+    assert {k: stats[k] for k in baseline['sentences']} == baseline['sentences']
+    assert (round(stats['avg'], 4), stats['min'], stats['max'], stats['median']) == (32.0199, 6, 389, 24)
+    assert expressions == {k: baseline[k] for k in ('connectors', 'endings', 'first_person')}
+    assert all('content' not in article for article in analyzer.articles)
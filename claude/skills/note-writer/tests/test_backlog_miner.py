@@ -0,0 +1,48 @@
+"""backlog_miner.BacklogMiner: 言及元と一致した候補も人が確認するまでは candidate のままか"""
+
+import json
+
+from backlog_miner import BacklogMiner
+
+ARTICLE = """---
+title: テスト記事
+article_id: n1
+day_number: 1
+---
+
+# 見出し
+
+大規模なプロジェクトでは苦労しました。そんな話はまた今度。
+
+別の話題もそのうち書きます。
+"""
+
+THEMES = """# 未執筆テーマ
+
+## テーマ一覧
+
+### 1. 大規模プロジェクトの苦労話
+- **言及元**: Day1「そんな話はまた今度」
+"""
+
+
+def test_theme_match_stays_candidate_and_human_status_is_kept(tmp_path):
+    articles_dir, references_dir = tmp_path / 'articles', tmp_path / 'references'
+    articles_dir.mkdir()
+    references_dir.mkdir()
+    (articles_dir / 'day0001_n1.md').write_text(ARTICLE, encoding='utf-8')
+    (references_dir / 'backlog_themes.md').write_text(THEMES, encoding='utf-8')
+    backlog_path = references_dir / 'backlog_promises.json'
+
+    BacklogMiner(articles_dir, backlog_path, None, references_dir).run(full=True)
+    entries = json.loads(backlog_path.read_text(encoding='utf-8'))['entries']
+    assert {e['status'] for e in entries} == {'candidate'}
+    assert [e.get('theme') for e in entries] == ['大規模プロジェクトの苦労話', None]
+
+    # 言及元を消すと theme も外れる。人が付けた status はそのまま残る
+    entries[1]['status'] = 'rejected'
+    backlog_path.write_text(json.dumps({'version': 1, 'entries': entries}, ensure_ascii=False), encoding='utf-8')
+    (references_dir / 'backlog_themes.md').write_text('# 未執筆テーマ\n\n## テーマ一覧\n', encoding='utf-8')
+    BacklogMiner(articles_dir, backlog_path, None, references_dir).run(full=True)
+    entries = json.loads(backlog_path.read_text(encoding='utf-8'))['entries']
+    assert [(e['status'], e.get('theme')) for e in entries] == [('candidate', None), ('rejected', None)]
@@ -0,0 +1,52 @@
+"""fetch_note_articles.ArticleParser: 生のHTMLを正規表現で読む高速パスと DOM 解析の結果が一致するか"""
+
+import pytest
+
+from conftest import FIXTURES_DIR
+
+fetch_note_articles = pytest.importorskip('fetch_note_articles')
+ArticleParser = fetch_note_articles.ArticleParser
+
+PAGES_DIR = FIXTURES_DIR / 'pages'
+ARTICLE_PAGES = sorted(PAGES_DIR.glob('article_*.html'))
+PROFILE_PAGES = sorted(PAGES_DIR.glob('profile_*.html'))
+
+
+def test_fixture_pages_exist():
+    assert ARTICLE_PAGES and PROFILE_PAGES
+
+
+@pytest.mark.parametrize('page', ARTICLE_PAGES, ids=lambda p: p.name)
+def test_json_ld_fast_path_matches_dom(page):
+    raw = page.read_bytes()
+
+    assert ArticleParser.extract_json_ld(raw) == ArticleParser.extract_json_ld_dom(raw.decode('utf-8'))
+
+
+def test_json_ld_fast_path_finds_blog_posting():
+    graph = ArticleParser.extract_json_ld((PAGES_DIR / 'article_n11c83353075c.html').read_bytes())
+    listed = ArticleParser.extract_json_ld((PAGES_DIR / 'article_na3f6f4e2138e.html').read_bytes())
+
+    assert graph['dateModified'] == '2025-12-01T21:07:21.000+09:00'
+    assert listed['headline'] == '中小企業のDXは「業務の棚卸し」から始める'
+    assert ArticleParser.extract_json_ld((PAGES_DIR / 'article_no_blog_posting.html').read_bytes()) == {}
+
+
+@pytest.mark.parametrize('page', PROFILE_PAGES, ids=lambda p: p.name)
+def test_profile_fast_path_matches_dom(page):
+    raw = page.read_bytes()
+
+    fast = ArticleParser.extract_article_list_from_profile(raw)
+    dom = ArticleParser.extract_article_list_from_profile_dom(raw.decode('utf-8'))
+
+    assert fast
+    assert [a['key'] for a in fast] == [a['key'] for a in dom]
+
+
+def test_next_data_titles_match_dom():
+    raw = (PAGES_DIR / 'profile_next_data.html').read_bytes()
+
+    fast = ArticleParser.extract_article_list_from_profile(raw)
+    dom = ArticleParser.extract_article_list_from_profile_dom(raw.decode('utf-8'))
+
+    assert [a['name'] for a in fast] == [a['name'] for a in dom]
@@ -0,0 +1,41 @@
+"""optimize_images.ImageOptimizer.rewrite_article_links: 元画像を残す場合も記事が軽量版を参照するか"""
+
+import json
+
+from optimize_images import ImageOptimizer
+
+
+def entry(original_bytes, variant_name, variant_bytes):
+    return {'sha256': 'x', 'width': 2000, 'height': 1000, 'bytes': original_bytes,
+            'variant': {'path': variant_name, 'format': 'webp', 'width': 1200, 'height': 600,
+                        'bytes': variant_bytes}}
+
+
+def test_links_and_fetch_state_point_to_smaller_variants(tmp_path):
+    articles_dir = tmp_path / 'articles'
+    articles_dir.mkdir()
+    article = articles_dir / 'day0001_n1.md'
+    article.write_text('![](../images/n1/image_1.png)\n![](../images/n1/image_2.png)\n', encoding='utf-8')
+    (articles_dir / '.fetch_state.json').write_text(json.dumps({'articles': {'n1': {'images': {
+        'https://example.com/1.png': '../images/n1/image_1.png',
+        'https://example.com/2.png': '../images/n1/image_2.png',
+    }}}}), encoding='utf-8')
+    manifest = {
+        'n1/image_1.png': entry(5000, 'image_1.w1200.webp', 1000),
+        'n1/image_2.png': entry(800, 'image_2.w1200.webp', 900),   # 軽量版の方が大きい → 元画像のまま
+    }
+
+    assert ImageOptimizer.rewrite_article_links(articles_dir, manifest) == 1
+    assert article.read_text(encoding='utf-8') == ('![](../images/n1/image_1.w1200.webp)\n'
+                                                   '![](../images/n1/image_2.png)\n')
+    state = json.loads((articles_dir / '.fetch_state.json').read_text(encoding='utf-8'))
+    assert state['articles']['n1']['images'] == {
+        'https://example.com/1.png': '../images/n1/image_1.w1200.webp',
+        'https://example.com/2.png': '../images/n1/image_2.png',
+    }
+    # 再実行しても二重に書き換えない
+    assert ImageOptimizer.rewrite_article_links(articles_dir, manifest) == 0
+
+    optimizer = ImageOptimizer(tmp_path / 'images')
+    optimizer.manifest = manifest
+    assert optimizer.summarize()['saved_bytes'] == 4000
@@ -0,0 +1,45 @@
+"""phrase_discovery: プロセスをまたいで安定したハッシュ・活用語尾の除外"""
+
+import os
+import subprocess
+import sys
+
+from conftest import SCRIPTS_DIR
+from phrase_discovery import HIRAGANA_RE, CountMinSketch, PhraseDiscovery
+
+KEYS = ['経営者', 'ています', '\x02そして', 'DX推進']
+
+
+def test_sketch_buckets_do_not_depend_on_hash_seed():
+    code = ('import sys; sys.path.insert(0, sys.argv[1]); from phrase_discovery import CountMinSketch; '
+            f'print([list(map(int, r)) for r in CountMinSketch(width_bits=16)._rows({KEYS!r})])')
+    outputs = {
+        subprocess.run([sys.executable, '-c', code, str(SCRIPTS_DIR)], capture_output=True, text=True, check=True,
+                       env={**os.environ, 'PYTHONHASHSEED': seed}).stdout
+        for seed in ('1', '2')
+    }
+
+    assert len(outputs) == 1
+    assert outputs.pop().strip() == str([list(map(int, r)) for r in CountMinSketch(width_bits=16)._rows(KEYS)])
+
+
+def test_hiragana_only_grams_need_a_background_table():
+    markov = PhraseDiscovery(width_bits=8)
+    with_background = PhraseDiscovery(width_bits=8, background=({}, 1))
+
+    assert markov.is_phrase_candidate('経営者')
+    assert not markov.is_phrase_candidate('ています')
+    assert not markov.is_phrase_candidate('りません')
+    assert with_background.is_phrase_candidate('ています')
+    assert not with_background.is_phrase_candidate('ます')
+
+
+def test_inflection_fragments_do_not_top_the_phrases():
+    texts = [f"経営者の判断が大切です。私は{topic}を続けています。そう思っています。課題はありません。"
+             for topic in ('支援', '開発', '導入', '改善')]
+
+    result = PhraseDiscovery(width_bits=12).run(lambda: iter(texts))
+
+    phrases = [item['text'] for item in result['phrases']]
+    assert phrases
+    assert not any(HIRAGANA_RE.match(p) for p in phrases)
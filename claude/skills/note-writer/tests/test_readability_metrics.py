@@ -0,0 +1,40 @@
+"""readability_metrics: numpy 版と純Python版の文ごとの集計が同じ値になるか"""
+
+import pytest
+
+import readability_metrics
+from readability_metrics import text_metrics
+
+TEXT = """# 見出しは記法ごと除く
+
+中小企業診断士協会の支援制度を使い、業務改善を進めました。DXは「道具」ではなく、考え方です！
+ＡＰＩ連携で在庫管理システムを自動化しよう？　ｶﾀｶﾅと𠮷野家、ノートを１２３回
+短い。
+[リンク](https://example.com) の文字だけ残ります、 tab\tや全角　空白も数えない。
+"""
+
+
+def metrics_with(monkeypatch, use_numpy: bool):
+    monkeypatch.setattr(readability_metrics, 'NUMPY_AVAILABLE', use_numpy)
+    return text_metrics(TEXT)
+
+
+def test_python_path_counts(monkeypatch):
+    result = metrics_with(monkeypatch, False)
+
+    # 見出しの # は除いて1文に数え、「短い。」は6文字未満なので数えない
+    assert result['article']['sentences'] == 6
+    assert result['sentences']['max_kanji_run'][1] == 9  # 中小企業診断士協会
+    assert result['sentences']['commas'] == [0, 1, 1, 0, 1, 1]
+
+
+def test_numpy_and_python_paths_agree(monkeypatch):
+    pytest.importorskip('numpy')
+
+    with_numpy = metrics_with(monkeypatch, True)
+    without_numpy = metrics_with(monkeypatch, False)
+
+    assert with_numpy['sentences'].keys() == without_numpy['sentences'].keys()
+    for key, values in without_numpy['sentences'].items():
+        assert with_numpy['sentences'][key] == pytest.approx(values), key
+    assert with_numpy['article'] == pytest.approx(without_numpy['article'])
@@ -0,0 +1,146 @@
+"""research_trends.run_searches: 重複クエリの統合・RRF 順位・キャッシュ"""
+
+import json
+
+import pytest
+
+from conftest import SCRIPTS_DIR
+from reference_docs import load_trend_keywords
+from research_trends import (FileSearchBackend, SearchBackend, SearchCache, generate_search_queries, query_key,
+                             run_searches)
+
+
+class CountingBackend(FileSearchBackend):
+    """FileSearchBackend への問い合わせを記録する"""
+
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.calls = []
+
+    def search(self, query):
+        self.calls.append(query)
+        return super().search(query)
+
+
+def write_results(directory, query, urls):
+    results = [{'title': url.rsplit('/', 1)[-1], 'url': url, 'snippet': ''} for url in urls]
+    (directory / f"{query_key(query)}.json").write_text(json.dumps({'results': results}), encoding='utf-8')
+
+
+@pytest.fixture
+def backend(tmp_path):
+    directory = tmp_path / 'search'
+    directory.mkdir()
+    write_results(directory, 'DX', ['https://a.example/1', 'https://a.example/2', 'https://a.example/3'])
+    write_results(directory, 'DX 2025', ['https://a.example/3/', 'https://a.example/4',
+                                         'https://a.example/2?utm_source=x'])
+    write_results(directory, 'AI', ['https://a.example/5'])
+    return CountingBackend(directory)
+
+
+GROUPS = {'dx': ['DX', 'DX 2025'], 'mixed': ['DX', 'AI']}
+
+
+def test_search_backend_is_abstract():
+    with pytest.raises(TypeError):
+        SearchBackend()
+
+
+def test_overlapping_queries_are_searched_once(backend):
+    report = run_searches(GROUPS, backend, max_workers=2)
+
+    assert sorted(backend.calls) == ['AI', 'DX', 'DX 2025']
+    assert report['stats'] == {'queries': 3, 'cache_hits': 0, 'requests': 3, 'errors': 0}
+    # 末尾スラッシュ・utm パラメータ違いは同じ URL として1件にまとめる
+    urls = [item['url'] for item in report['groups']['dx']]
+    assert len(urls) == 4
+    assert {item['url'] for item in report['groups']['mixed']} == {
+        'https://a.example/1', 'https://a.example/2', 'https://a.example/3', 'https://a.example/5'}
+
+
+def test_results_are_ranked_by_reciprocal_rank_fusion(backend):
+    items = run_searches(GROUPS, backend)['groups']['dx']
+
+    # /3 は DX で3位・DX 2025 で1位、/2 は2位と3位。どちらも1つのクエリだけの /1 より上
+    assert [item['url'].rstrip('/') for item in items] == [
+        'https://a.example/3', 'https://a.example/2', 'https://a.example/1', 'https://a.example/4']
+    assert items[0]['score'] == pytest.approx(1 / 63 + 1 / 61)
+    assert items[0]['queries'] == ['DX', 'DX 2025']
+
+
+def test_cache_hit_skips_backend(backend, tmp_path):
+    cache = SearchCache(tmp_path / 'cache', ttl=3600)
+    first = run_searches(GROUPS, backend, cache)
+    backend.calls.clear()
+
+    second = run_searches(GROUPS, backend, cache)
+
+    assert backend.calls == []
+    assert second['stats'] == {'queries': 3, 'cache_hits': 3, 'requests': 0, 'errors': 0}
+    assert second['groups'] == first['groups']
+
+
+def test_expired_cache_is_searched_again(backend, tmp_path):
+    cache = SearchCache(tmp_path / 'cache', ttl=-1)
+    run_searches(GROUPS, backend, cache)
+    backend.calls.clear()
+
+    report = run_searches(GROUPS, backend, cache)
+
+    assert len(backend.calls) == 3
+    assert report['stats']['cache_hits'] == 0
+
+
+def test_query_is_not_used_as_a_raw_path(tmp_path):
+    directory = tmp_path / 'search'
+    directory.mkdir()
+    (tmp_path / 'secret.json').write_text(json.dumps([{'url': 'https://x.example'}]), encoding='utf-8')
+    (directory / '中小企業_DX.json').write_text(json.dumps([{'url': 'https://y.example'}]), encoding='utf-8')
+
+    backend = FileSearchBackend(directory)
+
+    assert backend.search('../secret') == []
+    assert backend.search('中小企業 DX') == [{'url': 'https://y.example'}]
+
+
+def test_cache_is_keyed_by_backend_directory(tmp_path):
+    first_dir, second_dir = tmp_path / 'first', tmp_path / 'second'
+    first_dir.mkdir()
+    second_dir.mkdir()
+    write_results(first_dir, 'DX', ['https://a.example/1'])
+    write_results(second_dir, 'DX', ['https://b.example/1'])
+    cache = SearchCache(tmp_path / 'cache', ttl=3600)
+
+    run_searches({'dx': ['DX']}, FileSearchBackend(first_dir), cache)
+    report = run_searches({'dx': ['DX']}, FileSearchBackend(second_dir), cache)
+
+    assert report['stats']['cache_hits'] == 0
+    assert [item['url'] for item in report['groups']['dx']] == ['https://b.example/1']
+
+
+def test_missing_backend_directory_is_an_error_and_not_cached(tmp_path):
+    backend = FileSearchBackend(tmp_path / 'missing')
+    cache = SearchCache(tmp_path / 'cache', ttl=3600)
+
+    with pytest.raises(FileNotFoundError):
+        backend.search('DX')
+
+    report = run_searches({'dx': ['DX']}, backend, cache)
+
+    assert report['stats']['errors'] == 1
+    assert list((tmp_path / 'cache').glob('*.json')) == []
+
+
+def test_shipped_sample_results_cover_every_keyword():
+    """--run の既定の参照先 fixtures/search に、target_audience.md の全キーワードの結果がある"""
+    skill_dir = SCRIPTS_DIR.parent
+    backend = FileSearchBackend(skill_dir / 'fixtures' / 'search')
+    groups = {name: generate_search_queries(kws)
+              for name, kws in load_trend_keywords(skill_dir / 'references').items()}
+
+    report = run_searches(groups, backend)
+
+    assert report['stats']['errors'] == 0
+    for name, kws in load_trend_keywords(skill_dir / 'references').items():
+        assert all(backend.search(kw) for kw in kws), name
+        assert report['groups'][name]
@@ -0,0 +1,78 @@
+"""revision_store.RevisionStore: 記事ファイルを最新版として、全版を逆差分・全文の区切りをまたいで復元できるか"""
+
+from revision_store import RevisionStore, snapshot
+
+
+def article(paragraphs, article_id='n1'):
+    return f'---\ntitle: test\narticle_id: {article_id}\n---\n\n' + '\n\n'.join(paragraphs) + '\n'
+
+
+def save(store, filepath, text, **kwargs):
+    """fetch_note_articles と同じく、上書き前の内容を渡して記録してから書き換える"""
+    previous = filepath.read_text(encoding='utf-8') if filepath.exists() else None
+    filepath.write_text(text, encoding='utf-8')
+    return store.record('n1', text, previous=previous, path=filepath.name, **kwargs)
+
+
+def test_record_and_restore_every_revision(tmp_path):
+    store = RevisionStore(tmp_path / 'history', tmp_path / 'articles')
+    (tmp_path / 'articles').mkdir()
+    filepath = tmp_path / 'articles' / 'day0001_n1.md'
+    base = [f"段落{i}の本文です。" for i in range(20)]
+    versions = [
+        article(base),
+        article(base[:5] + ['追記した段落です。'] + base[5:]),   # 小さな修正 → 差分
+        article(base[:5] + base[6:]),                           # 1段落削除
+        article([f"全面的に書き直した段落{i}。" * 3 for i in range(20)]),  # 書き直し → 全文で残る
+        article([f"全面的に書き直した段落{i}。" * 3 for i in range(19)]),
+        article(['最後の版です。']),
+    ]
+
+    revs = [save(store, filepath, text, date_modified=f"2025-12-0{i + 1}") for i, text in enumerate(versions)]
+
+    assert revs == [1, 2, 3, 4, 5, 6]
+    assert save(store, filepath, versions[-1]) is None
+    stored = store.load('n1')
+    assert 'head' not in stored, 'the article file is the head'
+    assert any('text' in r for r in stored['revisions'][:-1]), 'full-text checkpoint expected'
+    assert any('delta' in r for r in stored['revisions'][:-1])
+    for rev, text in enumerate(versions, start=1):
+        assert store.text('n1', rev) == text
+    assert store.text('n1') == versions[-1]
+    assert store.texts('n1') == {rev: text for rev, text in enumerate(versions, start=1)}
+
+
+def test_amend_keeps_history_after_link_rewrite(tmp_path):
+    store = RevisionStore(tmp_path / 'history', tmp_path / 'articles')
+    (tmp_path / 'articles').mkdir()
+    filepath = tmp_path / 'articles' / 'day0001_n1.md'
+    v1 = article(['![](https://example.com/a.png)', '最初の版です。'])
+    v2 = article(['![](https://example.com/a.png)', '修正した版です。'])
+    save(store, filepath, v1)
+    save(store, filepath, v2)
+
+    rewritten = v2.replace('https://example.com/a.png', '../images/n1/image_1.png')
+    filepath.write_text(rewritten, encoding='utf-8')
+    assert store.amend('n1', v2, rewritten)
+
+    assert store.texts('n1') == {1: v1, 2: rewritten}
+    assert store.revisions('n1')[-1]['size'] == len(rewritten.encode('utf-8'))
+
+
+def test_snapshot_records_unrecorded_edit_and_marks_lost_revisions(tmp_path):
+    articles_dir = tmp_path / 'articles'
+    articles_dir.mkdir()
+    store = RevisionStore(tmp_path / 'history', articles_dir)
+    filepath = articles_dir / 'day0001_n1.md'
+    base = [f"段落{i}の本文です。" for i in range(20)]
+    v1, v2 = article(base), article(base[:19])
+    save(store, filepath, v1)
+    save(store, filepath, v2)
+
+    assert snapshot(store, articles_dir) == {'recorded': 0, 'diverged': 0}
+    edited = article(base[:18] + ['手で直した段落です。'])
+    filepath.write_text(edited, encoding='utf-8')
+
+    assert snapshot(store, articles_dir) == {'recorded': 1, 'diverged': 1}
+    assert [r.get('lost', False) for r in store.revisions('n1')] == [True, True, False]
+    assert store.texts('n1') == {3: edited}